@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Reverse index from the files under `static/` to the questions (and app code) that use them,
+with a report of broken references and orphaned assets.
+
+Question JSON refers to assets through rich-text image nodes (stems, prompts, explanations),
+option images, `audio.url` / `descriptionAudio.url`, `countdown.endBeepUrl` and flow effect
+URLs. Every such string is collected with its JSON path; literal `/static/...` paths in the
+app sources (`.vue`, `.ts`, `.js`, ...) are collected too, so the sounds and demo images the
+editor itself uses are not reported as orphans. Only the app's own source trees and root
+files count as app sources (`CODE_SOURCES`), never the index itself or other generated
+reports, which would otherwise make every asset they list look referenced on the next run.
+
+    {"version": 1,
+     "assets": {"/static/audio/small_time.mp3": {"bytes": 3407, "refs": [
+         {"file": "banks/unit1.json", "index": 0, "id": "q1", "kind": "audio",
+          "path": "content.groups[0].audio.url"}]}},
+     "broken": [{"url": "/static/beep.mp3", "reason": "missing", "file": ..., ...}],
+     "broken_code": [...],
+     "orphans": ["/static/picsum/opt-05.jpg"], "external": 3,
+     "sources": {"banks/unit1.json": {"size": ..., "mtime_ns": ..., "refs": [...]}}}
+
+`kind` is one of image, option_image, audio, end_beep, sfx, video, url (any other `*url`
+key) and code. A reference is broken if it points under `/static/` at a file that does not
+exist, or is neither under `/static/` nor an absolute URL (http:, data:, ...), which are
+counted as external and not checked. Broken paths in the app sources (mostly template
+placeholders) are listed separately, in `broken_code`. Orphans are media files nobody refers
+to; directories starting with `_` or `.` (generated output) are never reported.
+
+The index is incremental: `sources` keeps the references of every scanned file with its mtime
+and size, so a rerun only parses the files that changed, in a process pool, and rewrites the
+index only if its content changed. That keeps it cheap enough to run on every save.
+
+    python3 scripts/asset_refs.py banks/                       # -> .asset-refs.json
+    python3 scripts/asset_refs.py banks/ --sweep-to ../unused-assets
+    python3 scripts/asset_refs.py 听力demo.json --no-code --workers 1
+
+The exit status is 1 if any question reference is broken. `--sweep-to DIR` moves the orphans
+there (keeping their path below `static/`) instead of deleting them, and updates the index.
+Relative `--static`, `--out` and `--sweep-to` paths are taken from the repository root; the
+question inputs from the current directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from atomic_output import OutputWriter
+from image_index import IMAGE_SUFFIXES
+from validate_question_bank import iter_files
+
+INDEX_VERSION = 1
+MEDIA_SUFFIXES = IMAGE_SUFFIXES + (".svg", ".mp3", ".wav", ".m4a", ".aac", ".ogg", ".mp4", ".webm")
+CODE_SUFFIXES = (".vue", ".ts", ".js", ".mjs", ".json", ".scss", ".css", ".html")
+# App source trees and root files, relative to the repo. Anything else (reports, indexes,
+# question banks at the root) is not app code.
+CODE_SOURCES = (
+    "app", "components", "domain", "engine", "flows", "infra", "pages", "stores", "styles", "templates", "types",
+    "App.vue", "index.html", "main.js", "manifest.json", "pages.json", "uni.promisify.adaptor.js", "uni.scss",
+)
+CODE_SKIP_DIRS = frozenset({"node_modules", "unpackage", "dist"})
+_SCHEME_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|//)", re.I)
+# A quoted asset path in source code; it must end in an extension, so "/static/..." in UI
+# copy and template strings like `/static/${name}.jpg` do not count.
+_CODE_RE = re.compile(r"(?<![\w/.-])(?:@/|\.{1,2}/|/)?static/[\w\-./%一-鿿]*\w\.[A-Za-z0-9]+")
+
+# (url, kind, question index, question id, JSON path); index/id are None for code.
+Ref = Tuple[str, str, Optional[int], Any, str]
+# (path, key, size, mtime_ns, is_code)
+Task = Tuple[str, str, int, int, bool]
+
+
+def _url_kind(node: Dict[str, Any], key: str, parent_key: str, in_options: bool) -> Optional[str]:
+    if key == "endBeepUrl":
+        return "end_beep"
+    if key == "url":
+        if node.get("type") == "image":
+            return "option_image" if in_options else "image"
+        if parent_key in ("audio", "descriptionAudio") or node.get("type") == "audio":
+            return "audio"
+        if node.get("kind") == "playSfx":
+            return "sfx"
+        if node.get("type") == "video":
+            return "video"
+        return "url"
+    if key.lower().endswith("url"):
+        return "url"
+    return None
+
+
+def extract_refs(question: Any, index: Optional[int] = None) -> List[Ref]:
+    """Every asset URL in one question, with its path in the validator's notation."""
+    qid = question.get("id") if isinstance(question, dict) else None
+    refs: List[Ref] = []
+
+    def walk(node: Any, path: str, parent_key: str, in_options: bool) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                sub = f"{path}.{key}" if path else key
+                if isinstance(value, str):
+                    kind = _url_kind(node, key, parent_key, in_options)
+                    if kind and value.strip():
+                        refs.append((value.strip(), kind, index, qid, sub))
+                elif isinstance(value, (dict, list)):
+                    walk(value, sub, key, in_options or key == "options")
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                walk(value, f"{path}[{i}]", parent_key, in_options)
+
+    walk(question, "", "", False)
+    return refs
+
+
+def extract_code_refs(text: str) -> List[Ref]:
+    refs: List[Ref] = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        for m in _CODE_RE.finditer(line):
+            refs.append((m.group(0), "code", None, None, f"line {lineno}"))
+    return refs
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def resolve(url: str) -> Tuple[str, Optional[str]]:
+    """("external", None), ("outside_static", None) or ("static", "/static/...")."""
+    if _SCHEME_RE.match(url):
+        return "external", None
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if path.startswith("@/"):
+        path = path[1:]
+    while path.startswith(("./", "../")):
+        path = path.split("/", 1)[1]
+    if path.startswith("static/"):
+        path = "/" + path
+    path = posixpath.normpath(path)
+    if not path.startswith("/static/"):
+        return "outside_static", None
+    return "static", path
+
+
+def scan_source(task: Task) -> Tuple[str, Dict[str, Any]]:
+    path, key, size, mtime_ns, is_code = task
+    entry: Dict[str, Any] = {"size": size, "mtime_ns": mtime_ns}
+    try:
+        with open(path, encoding="utf-8") as f:
+            if is_code:
+                refs = extract_code_refs(f.read())
+            else:
+                data = json.load(f)
+                questions = data if isinstance(data, list) else [data]
+                refs = [r for i, q in enumerate(questions) for r in extract_refs(q, i)]
+    except (OSError, ValueError) as exc:
+        entry["error"] = str(exc)
+        refs = []
+    entry["refs"] = [list(r) for r in refs]
+    return key, entry
+
+
+def _scan_chunk(tasks: List[Task]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [scan_source(t) for t in tasks]
+
+
+def iter_code_files(root: Path) -> Iterator[str]:
+    """The app sources under `root`: the `CODE_SOURCES` files and trees that exist."""
+    for entry in CODE_SOURCES:
+        top = os.path.join(root, entry)
+        if os.path.isfile(top):
+            yield top
+            continue
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "_")) and d not in CODE_SKIP_DIRS)
+            for name in sorted(filenames):
+                if name.endswith(CODE_SUFFIXES) and not name.startswith("."):
+                    yield os.path.join(dirpath, name)
+
+
+def scan_static(root: Path) -> Dict[str, Tuple[int, bool]]:
+    """URL -> (bytes, may be an orphan) for every file under `root`."""
+    assets: Dict[str, Tuple[int, bool]] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        generated = any(part.startswith("_") for part in Path(dirpath).relative_to(root).parts)
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            path = os.path.join(dirpath, name)
+            url = "/" + Path(path).relative_to(root.parent).as_posix()
+            assets[url] = (os.stat(path).st_size, not generated and name.lower().endswith(MEDIA_SUFFIXES))
+    return assets
+
+
+def _key(path: str, repo: str) -> str:
+    absolute = os.path.abspath(path)
+    if absolute.startswith(repo + os.sep):
+        absolute = absolute[len(repo) + 1 :]
+    return absolute.replace(os.sep, "/")
+
+
+def build_index(
+    inputs: List[Path],
+    static_root: Path,
+    out: Path,
+    repo: Path,
+    code_root: Optional[Path] = None,
+    workers: int = 0,
+    force: bool = False,
+) -> Tuple[Dict[str, Any], Dict[str, int], OutputWriter]:
+    try:
+        old = json.loads(out.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old = {}
+    reuse = not force and isinstance(old, dict) and old.get("version") == INDEX_VERSION
+    old_sources: Dict[str, Any] = old.get("sources", {}) if reuse else {}
+
+    # The index must never scan itself, e.g. `--out banks/refs.json` with `banks/` as input.
+    out_key = _key(str(out), str(repo))
+    files: List[Tuple[str, str, bool]] = [
+        (path, key, False) for path, key in ((p, _key(p, str(repo))) for p, _ in iter_files(inputs)) if key != out_key
+    ]
+    if code_root is not None:
+        seen: Set[str] = {key for _, key, _ in files}
+        seen.add(out_key)
+        for path in iter_code_files(code_root):
+            key = _key(path, str(repo))
+            if key not in seen:
+                files.append((path, key, True))
+
+    sources: Dict[str, Any] = {}
+    todo: List[Task] = []
+    for path, key, is_code in files:
+        st = os.stat(path)
+        prev = old_sources.get(key)
+        if (
+            isinstance(prev, dict)
+            and prev.get("size") == st.st_size
+            and prev.get("mtime_ns") == st.st_mtime_ns
+            and prev.get("code", False) == is_code
+        ):
+            sources[key] = prev
+        else:
+            todo.append((path, key, st.st_size, st.st_mtime_ns, is_code))
+
+    if todo:
+        n = min(workers or os.cpu_count() or 1, len(todo))
+        # A few chunks per worker keeps them busy without pickling one file at a time.
+        step = max(1, -(-len(todo) // (n * 4)))
+        chunks = [todo[i : i + step] for i in range(0, len(todo), step)]
+        if n == 1:
+            results = [_scan_chunk(c) for c in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                results = list(pool.map(_scan_chunk, chunks))
+        code_keys = {t[1] for t in todo if t[4]}
+        for key, entry in (r for chunk in results for r in chunk):
+            if key in code_keys:
+                entry["code"] = True
+            sources[key] = entry
+
+    static = scan_static(static_root)
+    writer = OutputWriter()
+    if (
+        reuse
+        and not todo
+        and sources.keys() == old_sources.keys()
+        and {url: a.get("bytes") for url, a in old.get("assets", {}).items()} == {u: b for u, (b, _) in static.items()}
+    ):
+        # Nothing was added, changed or removed: the old reverse index still holds.
+        writer.skipped += 1
+        return old, _counts(old, 0), writer
+
+    refs_by_asset: Dict[str, List[Dict[str, Any]]] = {url: [] for url in static}
+    broken: List[Dict[str, Any]] = []
+    broken_code: List[Dict[str, Any]] = []
+    external = 0
+    for key in sorted(sources):
+        for url, kind, index, qid, path in sources[key]["refs"]:
+            ref = {"file": key, "index": index, "id": qid, "kind": kind, "path": path}
+            status, asset = resolve(url)
+            if status == "external":
+                external += 1
+            elif asset is None or asset not in refs_by_asset:
+                target = broken_code if kind == "code" else broken
+                target.append({"url": url, "reason": "missing" if asset else status, **ref})
+            else:
+                refs_by_asset[asset].append(ref)
+
+    orphans = [url for url, (_, media) in static.items() if media and not refs_by_asset[url]]
+    index = {
+        "version": INDEX_VERSION,
+        "assets": {url: {"bytes": static[url][0], "refs": refs} for url, refs in sorted(refs_by_asset.items())},
+        "broken": broken,
+        "broken_code": broken_code,
+        "orphans": sorted(orphans),
+        "external": external,
+        "sources": dict(sorted(sources.items())),
+    }
+    # No indent: the pure-Python encoder that indent needs takes seconds on a big bank.
+    writer.write_text(out, json.dumps(index, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return index, _counts(index, len(todo)), writer
+
+
+def _counts(index: Dict[str, Any], parsed: int) -> Dict[str, int]:
+    sources = index["sources"]
+    return {
+        "files": len(sources),
+        "parsed": parsed,
+        "cached": len(sources) - parsed,
+        "errors": sum(1 for e in sources.values() if "error" in e),
+        "refs": sum(len(e["refs"]) for e in sources.values()),
+        "assets": len(index["assets"]),
+        "broken": len(index["broken"]),
+        "broken_code": len(index["broken_code"]),
+        "orphans": len(index["orphans"]),
+        "external": index["external"],
+    }
+
+
+def sweep(orphans: List[str], static_root: Path, dest: Path) -> int:
+    """Move orphaned assets below `dest`, keeping their path relative to `static/`'s parent."""
+    moved = 0
+    for url in orphans:
+        src = static_root.parent / url.lstrip("/")
+        target = dest / url.lstrip("/")
+        if not src.is_file():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(src), str(target))
+        moved += 1
+    return moved
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="Question JSON files or directories (searched recursively)")
+    parser.add_argument("--static", default="static", help="Asset directory (URLs are relative to its parent)")
+    parser.add_argument("--out", default=".asset-refs.json", help="Index path")
+    parser.add_argument("--no-code", action="store_true", help="Do not count /static/ paths in the app sources")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the existing index and rescan everything")
+    parser.add_argument("--sweep-to", default=None, help="Move orphaned assets into this directory")
+    parser.add_argument("--show", type=int, default=20, help="Broken references to print")
+    args = parser.parse_args()
+
+    repo = Path(__file__).resolve().parents[1]
+    inputs = [Path(p) for p in args.inputs]
+    missing = [str(p) for p in inputs if not p.exists()]
+    if missing:
+        parser.error(f"not found: {', '.join(missing)}")
+    static_root = (repo / args.static).resolve()
+    out = (repo / args.out).resolve()
+
+    t0 = time.perf_counter()
+    index, counts, writer = build_index(
+        inputs, static_root, out, repo, None if args.no_code else repo, args.workers, args.force
+    )
+    elapsed = (time.perf_counter() - t0) * 1000
+    for ref in index["broken"][: args.show]:
+        where = ref["file"] if ref["index"] is None else f"{ref['file']}#{ref['index']}"
+        print(f"broken {ref['reason']}: {ref['url']}  ({where} {ref['path']})", file=sys.stderr)
+    if len(index["broken"]) > args.show:
+        print(f"... {len(index['broken']) - args.show} more in {out}", file=sys.stderr)
+    swept = sweep(index["orphans"], static_root, (repo / args.sweep_to).resolve()) if args.sweep_to else 0
+    if swept:
+        # Every source is cached by now; this only rescans static/ and rewrites the index.
+        index, after, rewrite = build_index(inputs, static_root, out, repo, None if args.no_code else repo, 1)
+        counts.update(assets=after["assets"], orphans=after["orphans"])
+        writer.add(rewrite)
+    print(
+        f"asset-refs files={counts['files']} parsed={counts['parsed']} cached={counts['cached']} "
+        f"errors={counts['errors']} refs={counts['refs']} external={counts['external']} assets={counts['assets']} "
+        f"broken={counts['broken']} broken_code={counts['broken_code']} orphans={counts['orphans']} swept={swept} "
+        f"in {elapsed:.0f}ms {writer.summary()}"
+    )
+    return 1 if counts["broken"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
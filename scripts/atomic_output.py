@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Shared output layer for the generator scripts: atomic writes that skip identical content.
+
+Every write goes to a temp file next to the target and is renamed over it, so an interrupted
+run never leaves a half-written file. If the target already holds the same bytes (same size,
+same sha256), the temp file is dropped and the target is left alone, so its mtime does not
+change and the uni-app dev server does not rebuild or hot-reload for nothing.
+
+    writer = OutputWriter()
+    writer.write_text(path, text)
+    with writer.open(path) as fp:      # streamed output, compared once it is complete
+        fp.write(...)
+    writer.install(part_file, path)    # a file that was downloaded/assembled elsewhere
+    print(writer.summary())            # "writes written=3 skipped=19"
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+PathLike = Union[str, Path]
+
+
+def _default_mode() -> int:
+    # os.umask() can only be read by setting it; do that once, at import time.
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+_NEW_FILE_MODE = _default_mode()
+
+
+def sha256_file(path: PathLike) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class OutputWriter:
+    """Counts written and skipped files; safe to pickle back from a worker process."""
+
+    def __init__(self) -> None:
+        self.written = 0
+        self.skipped = 0
+        self.bytes_written = 0
+
+    def add(self, other: "OutputWriter") -> None:
+        self.written += other.written
+        self.skipped += other.skipped
+        self.bytes_written += other.bytes_written
+
+    def summary(self) -> str:
+        return f"writes written={self.written} skipped={self.skipped}"
+
+    def write_bytes(self, path: PathLike, data: bytes) -> bool:
+        """Write `data` to `path` unless it already holds exactly that. Returns True if written."""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            st = None
+        if st is not None and st.st_size == len(data) and sha256_file(path) == hashlib.sha256(data).hexdigest():
+            self.skipped += 1
+            return False
+        with self._temp(path, st) as (fp, _):
+            fp.write(data)
+        self.written += 1
+        self.bytes_written += len(data)
+        return True
+
+    def write_text(self, path: PathLike, text: str, encoding: str = "utf-8") -> bool:
+        return self.write_bytes(path, text.encode(encoding))
+
+    @contextlib.contextmanager
+    def open(self, path: PathLike, encoding: Optional[str] = "utf-8") -> Iterator[IO]:
+        """Stream into a temp file; on success it replaces `path` unless the content is identical.
+
+        Text mode by default; pass `encoding=None` for a binary file object. The target may be
+        read while the new content is being written, since it is only replaced at the end.
+        """
+        path = Path(path)
+        try:
+            st: Optional[os.stat_result] = path.stat()
+        except FileNotFoundError:
+            st = None
+        with self._temp(path, st, encoding, compare=True) as (fp, state):
+            yield fp
+        if state["replaced"]:
+            self.written += 1
+            self.bytes_written += state["size"]
+        else:
+            self.skipped += 1
+
+    def install(self, tmp: PathLike, path: PathLike, digest: Optional[str] = None) -> bool:
+        """Move a finished temp file (same directory as `path`) into place unless `path` already
+        holds the same bytes, in which case `tmp` is deleted. `digest` is the sha256 of `tmp`,
+        if the caller already has it. Returns True if `path` was replaced."""
+        tmp, path = Path(tmp), Path(path)
+        try:
+            st: Optional[os.stat_result] = path.stat()
+        except FileNotFoundError:
+            st = None
+        size = tmp.stat().st_size
+        if st is not None and st.st_size == size and (digest or sha256_file(tmp)) == sha256_file(path):
+            tmp.unlink()
+            self.skipped += 1
+            return False
+        os.chmod(tmp, stat.S_IMODE(st.st_mode) if st is not None else _NEW_FILE_MODE)
+        os.replace(tmp, path)
+        self.written += 1
+        self.bytes_written += size
+        return True
+
+    @contextlib.contextmanager
+    def _temp(
+        self, path: Path, st: Optional[os.stat_result], encoding: Optional[str] = None, compare: bool = False
+    ) -> Iterator[tuple]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        state = {"replaced": False, "size": 0}
+        try:
+            mode = "w" if encoding else "wb"
+            with os.fdopen(fd, mode, encoding=encoding, newline="" if encoding else None) as fp:
+                yield fp, state
+            size = os.path.getsize(tmp_name)
+            state["size"] = size
+            if compare and st is not None and st.st_size == size and sha256_file(tmp_name) == sha256_file(path):
+                os.unlink(tmp_name)
+                return
+            # mkstemp creates 0600 files; keep the target's mode, or the usual one for a new file.
+            os.chmod(tmp_name, stat.S_IMODE(st.st_mode) if st is not None else _NEW_FILE_MODE)
+            os.replace(tmp_name, path)
+            state["replaced"] = True
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the placeholder image renderers of `generate_picsum_placeholders.py`.
+
+Renders the same seeds with the PIL path (`make_image`) and the NumPy path
+(`make_image_numpy`) at each size, and reports best/median time per image, megapixels per
+second and how far the NumPy output is from the PIL output (mean absolute difference and
+PSNR over 8-bit RGB). JPEG encoding is not included; it is the same for both renderers.
+
+    python3 scripts/bench_picsum_render.py --sizes 1280x720,3840x2160 --repeat 5
+
+Needs NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from generate_picsum_placeholders import RENDERERS
+
+
+def parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in spec.split(","):
+        w, h = item.strip().lower().split("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def fidelity(reference: np.ndarray, other: np.ndarray) -> Dict[str, float]:
+    diff = np.abs(reference.astype(np.float32) - other.astype(np.float32))
+    mse = float((diff**2).mean())
+    return {
+        "mean_abs_diff": round(float(diff.mean()), 3),
+        "max_abs_diff": int(diff.max()),
+        "psnr_db": round(10 * math.log10(255**2 / mse), 2) if mse else math.inf,
+    }
+
+
+def bench_size(w: int, h: int, seeds: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    reference: Dict[int, np.ndarray] = {}
+    for name in ("pil", "numpy"):
+        render = RENDERERS[name]
+        render(w, h, seed=seeds[0])  # warm-up: imports, allocator
+        runs: List[float] = []
+        for _ in range(repeat):
+            for seed in seeds:
+                t0 = time.perf_counter()
+                img = render(w, h, seed=seed)
+                runs.append(time.perf_counter() - t0)
+        row: Dict[str, Any] = {
+            "renderer": name,
+            "size": f"{w}x{h}",
+            "best_ms": round(min(runs) * 1000, 2),
+            "median_ms": round(statistics.median(runs) * 1000, 2),
+            "mpix_per_s": round(w * h / 1e6 / statistics.median(runs), 1),
+        }
+        diffs = []
+        for seed in seeds:
+            arr = np.asarray(render(w, h, seed=seed))
+            if name == "pil":
+                reference[seed] = arr
+            else:
+                diffs.append(fidelity(reference[seed], arr))
+        if diffs:
+            row["vs_pil"] = {
+                "mean_abs_diff": round(statistics.mean(d["mean_abs_diff"] for d in diffs), 3),
+                "max_abs_diff": max(d["max_abs_diff"] for d in diffs),
+                "psnr_db": round(min(d["psnr_db"] for d in diffs), 2),
+            }
+            row["speedup"] = round(results[0]["median_ms"] / row["median_ms"], 2)
+        results.append(row)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1280x720,3840x2160", help="Comma-separated WxH sizes")
+    parser.add_argument("--seeds", type=int, default=3, help="Distinct seeds rendered per size")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the seeds per renderer")
+    args = parser.parse_args()
+
+    seeds = [20260210 + i for i in range(args.seeds)]
+    for w, h in parse_sizes(args.sizes):
+        for row in bench_size(w, h, seeds, args.repeat):
+            print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
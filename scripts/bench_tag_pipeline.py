@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the tag pipeline (`expand_knowledge_tags.py`) on seeded synthetic tag trees.
+
+Default mode compares `transform()` variants; every variant runs in a fresh interpreter so
+peak RSS is not polluted by earlier runs (the RSS column is left out where the `resource`
+module is missing, i.e. on Windows). `recursive` is the pre-iterative implementation
+kept here as a reference point.
+
+`--suite` times the pipeline phases separately (parse_placeholder, catalog_lookup, merge_children,
+transform, JSON serialize/parse) and can store the results as a baseline and compare against one:
+
+    python3 scripts/bench_tag_pipeline.py --suite --out bench-main.json
+    python3 scripts/bench_tag_pipeline.py --suite --baseline bench-main.json --tolerance 0.15
+
+Shapes:
+    balanced  `--fanout` children per node down to `--depth` (100^3 ~ 10^6 nodes)
+    wide      a handful of parents with `--nodes` leaves between them (generated vocab lists)
+    deep      one chain `--nodes` long (beyond the default recursion limit)
+
+`--placeholder-density` is the share of generated rows in the "N个子主题，例如：..." form;
+`--catalog-share` of those are grafted under replacement catalog paths (wildcard segments get
+fresh titles) so transform() resolves them from the catalog instead of the generic fallback.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+import expand_knowledge_tags as ekt
+from replacement_catalog import WILDCARD, get_catalog
+
+EXAMPLE_WORDS = ("健康饮食", "动词短语", "介词短语", "校园生活", "节日", "天气", "购物", "旅行", "运动")
+PHASES = ("parse_placeholder", "catalog_lookup", "merge_children", "transform", "json_serialize", "json_parse")
+
+
+def placeholder_title(rnd: random.Random) -> str:
+    kind = rnd.choice(("主题", "主题", "项"))
+    count = rnd.randint(2, 12)
+    examples = rnd.sample(EXAMPLE_WORDS, rnd.randint(0, 4))
+    if not examples:
+        return f"{count}个子{kind}"
+    sep = rnd.choice(("；", "、", "，"))
+    return f"{count}个子{kind}，例如：{sep.join(examples)}"
+
+
+def graft_catalog_hits(tree: List[Dict[str, Any]], count: int, rnd: random.Random) -> None:
+    """Add `count` placeholder rows under random catalog entry paths, creating the branches as needed."""
+    keys = sorted(get_catalog().entries())
+    if not keys:
+        return
+    for i in range(count):
+        titles = [f"分支{i}" if seg == WILDCARD else seg for seg in rnd.choice(keys)]
+        level = tree
+        for title in titles:
+            node = next((n for n in level if n.get("title") == title), None)
+            if node is None:
+                node = {"title": title}
+                level.append(node)
+            level = node.setdefault("children", [])
+        level.append({"title": placeholder_title(rnd)})
+
+
+def generate_tree(
+    shape: str,
+    nodes: int,
+    depth: int,
+    fanout: int,
+    placeholder_density: float,
+    seed: int,
+    catalog_share: float = 0.0,
+) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    grafts = 0
+
+    def placeholder() -> Optional[Dict[str, Any]]:
+        nonlocal grafts
+        if rnd.random() < catalog_share:
+            grafts += 1
+            return None
+        return {"title": placeholder_title(rnd)}
+
+    def leaf(i: int) -> Dict[str, Any]:
+        if rnd.random() < placeholder_density:
+            return placeholder() or {"title": f"词条{i}"}
+        return {"title": f"词条{i}"}
+
+    if shape == "deep":
+        root: Dict[str, Any] = {"title": "知识点标签"}
+        cur = root
+        for i in range(nodes - 1):
+            nxt = {"title": f"层{i}"}
+            cur["children"] = [nxt, leaf(i)] if rnd.random() < placeholder_density else [nxt]
+            cur = nxt
+        tree = [root]
+    elif shape == "wide":
+        parents = max(1, fanout // 10)
+        per_parent = max(1, nodes // parents)
+        tree = [
+            {
+                "title": "知识点标签",
+                "children": [
+                    {"title": f"词表{p}", "children": [leaf(i) for i in range(per_parent)]} for p in range(parents)
+                ],
+            }
+        ]
+    else:
+
+        def build(level: int, prefix: str) -> Dict[str, Any]:
+            if level == depth:
+                return leaf(int(prefix.rsplit(".", 1)[-1] or 0))
+            children = [build(level + 1, f"{prefix}.{i}") for i in range(fanout)]
+            if level + 1 < depth and rnd.random() < placeholder_density:
+                extra = placeholder()
+                if extra is not None:
+                    children.insert(rnd.randrange(len(children) + 1), extra)
+            return {"title": prefix or "知识点标签", "children": children}
+
+        tree = [build(0, "")]
+
+    graft_catalog_hits(tree, grafts, rnd)
+    return tree
+
+
+def placeholder_parents(tree: List[Dict[str, Any]]) -> List[Tuple[str, ...]]:
+    """Title paths of the nodes with placeholder children (the keys transform() looks up)."""
+    keys: List[Tuple[str, ...]] = []
+    stack = [(n, ()) for n in tree]
+    while stack:
+        n, path = stack.pop()
+        kids = n.get("children")
+        if kids:
+            key = path + (n["title"],)
+            if any(ekt.is_placeholder_title(k["title"]) for k in kids):
+                keys.append(key)
+            stack.extend((k, key) for k in kids)
+    return keys
+
+
+def recursive_transform(node_obj: Dict[str, Any], path: List[str], stats: ekt.Stats) -> Dict[str, Any]:
+    """The original recursive transform() (copies `path` at every node), for comparison."""
+    title = (node_obj.get("title") or "").strip()
+    next_path = path + [title]
+    children = node_obj.get("children") or []
+    if not isinstance(children, list) or not children:
+        node_obj.pop("children", None)
+        return node_obj
+    kept: List[Dict[str, Any]] = []
+    placeholder_nodes: List[Dict[str, Any]] = []
+    for ch in children:
+        if not isinstance(ch, dict):
+            continue
+        if ekt.is_placeholder_title((ch.get("title") or "").strip()):
+            stats.placeholders_found += 1
+            placeholder_nodes.append(ch)
+            continue
+        kept.append(recursive_transform(ch, next_path, stats))
+    replacements = ekt.resolve_placeholders(placeholder_nodes, tuple(next_path), stats)
+    merged = ekt.merge_children(replacements, kept)
+    if merged:
+        node_obj["children"] = merged
+    else:
+        node_obj.pop("children", None)
+    return node_obj
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_one(variant: str, args: argparse.Namespace) -> Dict[str, Any]:
+    tree = generate_tree(
+        args.shape, args.nodes, args.depth, args.fanout, args.placeholder_density, args.seed, args.catalog_share
+    )
+    catalog_hits = sum(1 for key in placeholder_parents(tree) if get_catalog().lookup(key) is not None)
+    rss_before = _peak_rss_bytes()
+    fn = recursive_transform if variant == "recursive" else ekt.transform
+    stats = ekt.Stats()
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    try:
+        for n in tree:
+            fn(n, [], stats)
+        error = None
+    except RecursionError:
+        error = "RecursionError"
+    result: Dict[str, Any] = {
+        "variant": variant,
+        "shape": args.shape,
+        "wall_s": round(time.perf_counter() - t0, 4),
+        "cpu_s": round(time.process_time() - c0, 4),
+    }
+    if rss_before is not None:  # no `resource` module on Windows: leave the column out
+        result["peak_rss_delta_mb"] = round((_peak_rss_bytes() - rss_before) / 2**20, 1)
+    result["placeholders_found"] = stats.placeholders_found
+    result["catalog_hits"] = catalog_hits
+    result["error"] = error
+    return result
+
+
+def _time_phase(fn: Callable[[], int], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Run `fn` `repeat` times (after `setup` each time, untimed); `fn` returns its op count."""
+    runs: List[float] = []
+    ops = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        ops = fn()
+        runs.append(time.perf_counter() - t0)
+    best = min(runs)
+    return {
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(runs), 6),
+        "ops": ops,
+        "per_op_us": round(best / max(ops, 1) * 1e6, 4),
+    }
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    def fresh() -> List[Dict[str, Any]]:
+        return generate_tree(
+            args.shape, args.nodes, args.depth, args.fanout, args.placeholder_density, args.seed, args.catalog_share
+        )
+
+    tree = fresh()
+    titles: List[str] = []
+    sibling_lists: List[List[Dict[str, Any]]] = []
+    stack = list(tree)
+    while stack:
+        n = stack.pop()
+        titles.append(n["title"])
+        kids = n.get("children")
+        if kids:
+            sibling_lists.append(kids)
+            stack.extend(kids)
+    parent_keys = placeholder_parents(tree)
+    rnd = random.Random(args.seed)
+    merge_pairs = [(rnd.sample(kids, min(len(kids), 5)), kids) for kids in sibling_lists]
+
+    def do_parse() -> int:
+        for t in titles:
+            ekt.parse_placeholder(t)
+        return len(titles)
+
+    def do_merge() -> int:
+        for replacements, kept in merge_pairs:
+            ekt.merge_children(replacements, kept)
+        return len(merge_pairs)
+
+    catalog = get_catalog()
+    catalog.entries()  # load outside the timed runs
+
+    def do_lookup() -> int:
+        for key in parent_keys:
+            catalog.lookup(key)
+        return len(parent_keys)
+
+    results: Dict[str, Any] = {}
+    results["parse_placeholder"] = _time_phase(do_parse, args.repeat)
+    results["catalog_lookup"] = _time_phase(do_lookup, args.repeat)
+    results["merge_children"] = _time_phase(do_merge, args.repeat)
+
+    state: Dict[str, Any] = {}
+
+    def setup_transform() -> None:
+        state["tree"] = fresh()
+
+    def do_transform() -> int:
+        stats = ekt.Stats()
+        for n in state["tree"]:
+            ekt.transform(n, [], stats)
+        return len(titles)
+
+    results["transform"] = _time_phase(do_transform, args.repeat, setup_transform)
+    out = state["tree"]
+    text_holder: Dict[str, str] = {}
+
+    def do_serialize() -> int:
+        text_holder["text"] = json.dumps(out, ensure_ascii=False, indent=2) + "\n"
+        return len(text_holder["text"])
+
+    results["json_serialize"] = _time_phase(do_serialize, args.repeat)
+
+    def do_parse_json() -> int:
+        json.loads(text_holder["text"])
+        return len(text_holder["text"])
+
+    results["json_parse"] = _time_phase(do_parse_json, args.repeat)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "shape": args.shape,
+                "nodes": args.nodes,
+                "depth": args.depth,
+                "fanout": args.fanout,
+                "placeholder_density": args.placeholder_density,
+                "catalog_share": args.catalog_share,
+                "seed": args.seed,
+                "repeat": args.repeat,
+            },
+            "tree_nodes": len(titles),
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(Path(__file__).resolve().parent),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+def compare_to_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print a per-phase comparison; return the phases slower than baseline by more than `tolerance`."""
+    if baseline.get("meta", {}).get("params") != current["meta"]["params"]:
+        print("warning: baseline was recorded with different parameters", file=sys.stderr)
+    regressions = []
+    for phase in PHASES:
+        cur = current["results"].get(phase)
+        base = baseline.get("results", {}).get(phase)
+        if not cur or not base or not base.get("best_s"):
+            continue
+        ratio = cur["best_s"] / base["best_s"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"  {phase:<18} {base['best_s']:.4f}s -> {cur['best_s']:.4f}s  x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(phase)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", choices=("balanced", "wide", "deep"), default="balanced")
+    parser.add_argument("--nodes", type=int, default=1_000_000, help="Node count for wide/deep shapes")
+    parser.add_argument("--depth", type=int, default=3, help="Levels below the root for the balanced shape")
+    parser.add_argument("--fanout", type=int, default=100, help="Children per node for the balanced shape")
+    parser.add_argument("--placeholder-density", type=float, default=0.01, help="Share of leaves that are placeholders")
+    parser.add_argument(
+        "--catalog-share",
+        type=float,
+        default=0.5,
+        help="Share of placeholders grafted under catalog paths (0 = generic fallback only)",
+    )
+    parser.add_argument("--seed", type=int, default=20260210)
+    parser.add_argument("--variants", default="recursive,iterative", help="Comma-separated: recursive, iterative")
+    parser.add_argument("--suite", action="store_true", help="Time each pipeline phase instead of comparing variants")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per phase in --suite (best is reported)")
+    parser.add_argument("--out", default=None, help="With --suite: write the results JSON here (e.g. as a baseline)")
+    parser.add_argument("--baseline", default=None, help="With --suite: compare against a stored results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown vs --baseline (0.15 = 15%%)")
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args)))
+        return 0
+
+    if args.suite:
+        current = run_suite(args)
+        print(json.dumps(current["results"], indent=2))
+        if args.out:
+            Path(args.out).write_text(json.dumps(current, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        if args.baseline:
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+            print(f"vs baseline {baseline.get('meta', {}).get('commit') or args.baseline}:")
+            if compare_to_baseline(current, baseline, args.tolerance):
+                return 1
+        return 0
+
+    passthrough = [
+        f"--shape={args.shape}",
+        f"--nodes={args.nodes}",
+        f"--depth={args.depth}",
+        f"--fanout={args.fanout}",
+        f"--placeholder-density={args.placeholder_density}",
+        f"--catalog-share={args.catalog_share}",
+        f"--seed={args.seed}",
+    ]
+    for variant in args.variants.split(","):
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), f"--run-one={variant}", *passthrough],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(json.dumps({"variant": variant, "error": proc.stderr.strip().splitlines()[-1:]}))
+            continue
+        print(proc.stdout.strip())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
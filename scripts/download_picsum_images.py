@@ -4,38 +4,298 @@ Download random photos from https://picsum.photos into `static/picsum/`.
 
 Note: this requires public internet access. The Codex sandbox may not have it,
 so this script is mainly for running on your local machine / HBuilderX env.
+
+Downloads run on --concurrency threads over pooled keep-alive connections (see
+http_pool.py), so at most that many requests are in flight and each connection is set up
+once. Requests are paced by an adaptive token bucket (see rate_limit.py) that starts at
+--rate, speeds up while responses stay fast and backs off on 429/503 or rising latency.
+The old `--sleep S` still works but is deprecated: it pins the pace at 1/S requests per second.
+429 and 5xx responses and network errors are retried up to --retries times, waiting for
+Retry-After when the server sends one and with jittered exponential backoff otherwise.
+
+Bodies are streamed to `.<name>.part` and hashed as they arrive. `<out>/.downloads.json`
+records URL, ETag/Last-Modified, size and sha256 per file: a file that still matches is
+requested with If-None-Match and left alone on 304, and a partial file (from a dropped
+connection or a Ctrl-C) is continued with Range/If-Range, so an interrupted bulk fetch picks
+up where it stopped.
+--base-url points the script at another host, e.g. the local stand-in in
+picsum_stub_server.py:
+
+    python3 scripts/picsum_stub_server.py --port 8765 &
+    python3 scripts/download_picsum_images.py --base-url http://127.0.0.1:8765 \\
+        --out /tmp/picsum --plan opt:3000:64x64 --concurrency 16
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import http.client
+import json
 import random
+import sys
+import threading
 import time
-import urllib.request
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from urllib.parse import quote
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
 
+from atomic_output import OutputWriter
+from http_pool import ConnectionPool, StreamResponse
+from picsum_plan import DEFAULT_PLAN, parse_plan
+from rate_limit import RETRY_STATUSES, AdaptiveRateLimiter, backoff_delay, is_throttle, retry_after_seconds
+
+DEFAULT_BASE_URL = "https://picsum.photos"
+MAX_RETRY_AFTER = 120.0
+MANIFEST_NAME = ".downloads.json"
+MANIFEST_VERSION = 1
+MANIFEST_SAVE_EVERY = 2.0  # seconds; bounds what an interrupted run has to re-check
+
+# (url, dest)
+Job = Tuple[str, Path]
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+class DownloadManifest:
+    """`<out>/.downloads.json`: per file, the URL, validators, size and sha256 of the last download.
+
+    Saved every few seconds while downloading, so after an interrupted run the files that did
+    finish are revalidated with a conditional request instead of fetched again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        ok = isinstance(data, dict) and data.get("version") == MANIFEST_VERSION
+        self.files: Dict[str, Dict[str, Any]] = data.get("files", {}) if ok else {}
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.files.get(name)
+
+    def set(self, name: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.files[name] = entry
+            due = time.monotonic() - self._saved_at >= MANIFEST_SAVE_EVERY
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            text = json.dumps(
+                {"version": MANIFEST_VERSION, "files": dict(sorted(self.files.items()))}, ensure_ascii=False, indent=1
+            )
+            self._saved_at = time.monotonic()
+            OutputWriter().write_text(self.path, text + "\n")
+
+
+def _validators(resp: StreamResponse) -> Dict[str, Optional[str]]:
+    return {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
 
-def download(url: str, dest: Path) -> None:
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    req = urllib.request.Request(
-        url,
-        headers={
-            # Some CDNs behave better with a UA.
-            "User-Agent": "TestPaperEditor/1.0 (+https://picsum.photos/)",
-        },
-    )
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        data = resp.read()
-    dest.write_bytes(data)
+
+def _resume_state(part: Path, meta: Path, url: str) -> Tuple[int, Optional[str]]:
+    """(bytes already on disk, If-Range validator) for a partial download, or (0, None)."""
+    try:
+        info = json.loads(meta.read_text(encoding="utf-8"))
+        size = part.stat().st_size
+    except (OSError, ValueError):
+        info, size = None, 0
+    validator = (info.get("etag") or info.get("last_modified")) if isinstance(info, dict) else None
+    if size and validator and info.get("url") == url:
+        return size, validator
+    # Without a validator a partial file cannot be safely continued.
+    part.unlink(missing_ok=True)
+    meta.unlink(missing_ok=True)
+    return 0, None
+
+
+def _receive(
+    resp: StreamResponse, part: Path, meta: Path, url: str, offset: int, stop: threading.Event, counts: Counter
+) -> Tuple[int, str]:
+    """Stream the body into `part` (appending after `offset` for a 206), hashing as it arrives."""
+    h = hashlib.sha256()
+    if resp.status == 206:
+        content_range = resp.headers.get("Content-Range", "")
+        if not content_range.startswith(f"bytes {offset}-"):
+            part.unlink(missing_ok=True)
+            raise http.client.HTTPException(f"unexpected Content-Range {content_range!r} for offset {offset}")
+        with open(part, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    else:
+        # A 200 is the whole file: the server ignored Range, or If-Range no longer matched.
+        offset = 0
+        meta.write_text(json.dumps({"url": url, **_validators(resp)}), encoding="utf-8")
+    size = offset
+    with open(part, "ab" if offset else "wb") as f:
+        for chunk in resp.iter_chunks():
+            if stop.is_set():
+                raise Interrupted()
+            f.write(chunk)
+            h.update(chunk)
+            size += len(chunk)
+            counts["bytes"] += len(chunk)
+    return size, h.hexdigest()
+
+
+def download(
+    pool: ConnectionPool,
+    limiter: AdaptiveRateLimiter,
+    url: str,
+    dest: Path,
+    writer: OutputWriter,
+    counts: Counter,
+    manifest: DownloadManifest,
+    stop: threading.Event,
+    retries: int = 4,
+) -> bool:
+    """Fetch `url` into `dest`, retrying 429/5xx and network errors. Returns True if written.
+
+    The body streams into `.<name>.part` next to `dest`; a later attempt or run continues it
+    with Range/If-Range. If `dest` matches the manifest, the request is conditional and a 304
+    leaves the file alone.
+    """
+    part = dest.with_name(f".{dest.name}.part")
+    meta = dest.with_name(f".{dest.name}.part.json")
+    for attempt in range(retries + 1):
+        if stop.is_set():
+            raise Interrupted()
+        offset, validator = _resume_state(part, meta, url)
+        headers: Dict[str, str] = {}
+        entry = manifest.get(dest.name)
+        if offset:
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator or ""}
+        elif entry and entry.get("url") == url and dest.is_file() and dest.stat().st_size == entry.get("bytes"):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            elif entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        limiter.acquire()
+        t0 = time.monotonic()
+        delay: Optional[float] = None
+        try:
+            with pool.stream("GET", url, headers) as resp:
+                latency = time.monotonic() - t0
+                if resp.status == 304 and headers and not offset:
+                    limiter.record(latency)
+                    counts["not_modified"] += 1
+                    writer.skipped += 1
+                    return False
+                if resp.status in (200, 206):
+                    limiter.record(latency)
+                    size, digest = _receive(resp, part, meta, url, offset, stop, counts)
+                    if resp.status == 206:
+                        counts["resumed"] += 1
+                        counts["resumed_bytes"] += offset
+                    entry = {"url": url, **_validators(resp), "bytes": size, "sha256": digest}
+                elif resp.status in RETRY_STATUSES and attempt < retries:
+                    resp.read()
+                    counts["throttled" if resp.status == 429 else "server_errors"] += 1
+                    limiter.record(latency, throttled=is_throttle(resp.status, resp.headers))
+                    retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+                    if retry_after is not None:
+                        # The server named a time; hold every thread until then rather than just this one.
+                        limiter.pause(min(retry_after, MAX_RETRY_AFTER))
+                        delay = 0.0
+                    else:
+                        delay = backoff_delay(attempt)
+                else:
+                    raise DownloadError(f"GET {resp.url}: HTTP {resp.status} (attempt {attempt + 1})")
+        except (OSError, http.client.HTTPException) as exc:
+            # A cut-off body stays in the .part file and is continued on the next attempt.
+            counts["network_errors"] += 1
+            if attempt == retries:
+                raise DownloadError(f"GET {url}: {exc!r}") from None
+            delay = backoff_delay(attempt)
+        if delay is None:
+            # Unchanged photos keep their mtime, so the dev server does not reload for them.
+            wrote = writer.install(part, dest, digest)
+            meta.unlink(missing_ok=True)
+            manifest.set(dest.name, entry)
+            return wrote
+        counts["retries"] += 1
+        counts["backoff_s"] += delay
+        time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _fetch(
+    pool: ConnectionPool,
+    limiter: AdaptiveRateLimiter,
+    manifest: DownloadManifest,
+    stop: threading.Event,
+    job: Job,
+    retries: int,
+) -> Tuple[OutputWriter, bool, Optional[str], Counter]:
+    writer = OutputWriter()
+    counts: Counter = Counter()
+    url, dest = job
+    try:
+        return writer, download(pool, limiter, url, dest, writer, counts, manifest, stop, retries), None, counts
+    except Interrupted:
+        counts["interrupted"] += 1
+        return writer, False, None, counts
+    except (OSError, DownloadError) as exc:
+        return writer, False, f"{dest.name}: {exc}", counts
 
 
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--out", default="static/picsum", help="Output directory")
     parser.add_argument("--seed", type=int, default=None, help="Seed for stable randomness")
-    parser.add_argument("--sleep", type=float, default=0.15, help="Sleep between downloads (seconds)")
+    parser.add_argument("--plan", default=DEFAULT_PLAN, help="Comma-separated prefix:count:WxH groups")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Image host (e.g. a local picsum_stub_server.py)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--rate", type=float, default=10.0, help="Starting request rate (per second); adapts from there")
+    parser.add_argument("--max-rate", type=float, default=100.0, help="Upper bound for the adaptive request rate")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per file on 429/5xx and network errors")
+    parser.add_argument(
+        "--sleep",
+        type=float,
+        default=None,
+        help="Deprecated: pace requests at a fixed 1/SLEEP per second (sets --rate and --max-rate)",
+    )
+    parser.add_argument(
+        "--derivatives",
+        action="store_true",
+        help="Also refresh the resized/WebP derivatives and their manifest (see image_derivatives.py)",
+    )
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.sleep is not None:
+        # Downloads used to run one at a time with --sleep seconds between them.
+        if args.sleep < 0:
+            parser.error("--sleep must not be negative")
+        if args.sleep > 0:
+            args.rate = args.max_rate = 1.0 / args.sleep
+        print(
+            f"warning: --sleep is deprecated; using --rate={args.rate:g} --max-rate={args.max_rate:g}",
+            file=sys.stderr,
+        )
+    if not 0 < args.rate <= args.max_rate:
+        parser.error("--rate must be positive and at most --max-rate")
+    try:
+        plan = parse_plan(args.plan)
+    except ValueError as exc:
+        parser.error(str(exc))
+    base_parts = urlsplit(args.base_url)
+    if base_parts.scheme.lower() not in ("http", "https") or not base_parts.hostname:
+        parser.error(f"--base-url must be an http:// or https:// URL, got {args.base_url!r}")
 
     root = Path(__file__).resolve().parents[1]
     out_dir = (root / args.out).resolve()
@@ -44,29 +304,84 @@ def main() -> int:
     seed = args.seed if args.seed is not None else int(time.time())
     rnd = random.Random(seed)
 
-    plan = []
-    plan += [("opt", 12, 512, 512)]
-    plan += [("stem", 6, 1280, 720)]
-    plan += [("tall", 4, 720, 1280)]
-
-    written = []
+    base_url = args.base_url.rstrip("/")
+    jobs: List[Job] = []
     for prefix, count, w, h in plan:
+        width = max(2, len(str(count)))
         for i in range(1, count + 1):
-            file = f"{prefix}-{i:02d}.jpg"
-            dest = out_dir / file
             # Use a per-file seed so re-running with same --seed is stable.
             file_seed = f"{seed}-{prefix}-{i}"
-            url = f"https://picsum.photos/seed/{quote(file_seed)}/{w}/{h}"
-            download(url, dest)
-            written.append(str(dest.relative_to(root)))
-            if args.sleep:
-                time.sleep(args.sleep)
+            jobs.append((f"{base_url}/seed/{quote(file_seed)}/{w}/{h}", out_dir / f"{prefix}-{i:0{width}d}.jpg"))
+
+    writer = OutputWriter()
+    written: List[str] = []
+    failed: List[str] = []
+    counts: Counter = Counter()
+    limiter = AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = DownloadManifest(out_dir / MANIFEST_NAME)
+    stop = threading.Event()
+    t0 = time.perf_counter()
+    with ConnectionPool(max_idle_per_host=args.concurrency) as pool:
+        executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        futures: List[Future] = [
+            executor.submit(_fetch, pool, limiter, manifest, stop, job, args.retries) for job in jobs
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # Let running downloads stop at their next chunk; their .part files are resumed next run.
+            stop.set()
+            for future in futures:
+                future.cancel()
+        executor.shutdown(wait=True)
+        stats = pool.stats()
+    manifest.save()
+    elapsed = time.perf_counter() - t0
 
-    print(f"download seed={seed}")
+    done = [(job, f.result()) for job, f in zip(jobs, futures) if not f.cancelled()]
+    counts["interrupted"] += len(jobs) - len(done)
+    for (_, dest), (w, wrote, error, c) in done:
+        writer.add(w)
+        counts.update(c)
+        if wrote:
+            written.append(str(dest.relative_to(root)) if dest.is_relative_to(root) else str(dest))
+        if error:
+            failed.append(error)
+
+    ok = len(jobs) - len(failed) - counts["interrupted"]
+    limits = limiter.stats()
+    print(
+        f"download seed={seed} files={len(jobs)} ok={ok} failed={len(failed)} in {elapsed:.1f}s "
+        f"({ok / elapsed:.1f} files/s) requests={stats['requests']} connections={stats['connections']} "
+        f"{writer.summary()}"
+    )
+    print(
+        f"received={counts['bytes']}B not_modified={counts['not_modified']} resumed={counts['resumed']} "
+        f"resumed_bytes={counts['resumed_bytes']}B"
+    )
+    print(
+        f"retries={counts['retries']} throttled={counts['throttled']} server_errors={counts['server_errors']} "
+        f"network_errors={counts['network_errors']} backoff={counts['backoff_s']:.1f}s "
+        f"paused={limits['paused_s']:.1f}s rate={limits['rate']:.1f}/s peak={limits['peak_rate']:.1f}/s "
+        f"cuts={limits['cuts']}"
+    )
     print("written:")
     for p in written:
         print(" -", p)
-    return 0
+    for error in failed:
+        print("failed:", error)
+    if stop.is_set():
+        print(f"interrupted: {counts['interrupted']} files left; run again to continue")
+        return 130
+
+    if args.derivatives:
+        # Needs Pillow; the download itself does not.
+        from image_derivatives import build_derivatives, summarize
+
+        print(summarize(*build_derivatives(out_dir)))
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
@@ -4,11 +4,28 @@
 
 from __future__ import annotations
 
+import argparse
+import contextlib
+import cProfile
+import glob
+import hashlib
 import json
+import os
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, TextIO, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+from atomic_output import OutputWriter
+from replacement_catalog import WILDCARD, get_catalog, use_catalogs
+from tag_tree_binary import TagTreeBinaryBuilder
 
 
 PLACEHOLDER_RE = re.compile(r"^\s*(\d+)\s*个子(主题|项)")
@@ -62,689 +79,6 @@ def node(title: str, children: Optional[List[Dict[str, Any]]] = None) -> Dict[st
     return n
 
 
-# Path-based replacements. Keys are the parent node path (titles), excluding the placeholder node itself.
-REPLACEMENTS: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {
-    # 语篇主题 - 初中
-    ("知识点标签", "语篇主题", "初中", "人与自我", "个人情况"): [
-        node("个人信息"),
-        node("个人经历"),
-        node("外貌与性格"),
-        node("兴趣与爱好"),
-        node("家庭情况"),
-        node("学习与成长"),
-        node("目标与理想"),
-        node("情绪与感受"),
-        node("国籍与语言"),
-        node("联系方式"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "个人兴趣"): [
-        node("游戏"),
-        node("爱好"),
-        node("音乐"),
-        node("运动"),
-        node("阅读"),
-        node("电影"),
-        node("旅行"),
-        node("网络与科技"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "家庭、朋友与周围的人"): [
-        node("家人和亲人"),
-        node("朋友"),
-        node("同学与邻里"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "居住环境"): [
-        node("房屋与住所"),
-        node("社区与邻里"),
-        node("城市与乡村"),
-        node("环境与设施"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "日常活动"): [
-        node("家庭生活"),
-        node("周末活动"),
-        node("休闲娱乐"),
-        node("家务与生活习惯"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "节假日活动"): [
-        node("假日活动"),
-        node("庆祝活动"),
-        node("旅行与出游"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "学校"): [
-        node("学校设施"),
-        node("学习人员"),
-        node("学习科目"),
-        node("课程安排"),
-        node("校规校纪"),
-        node("校园文化"),
-        node("考试与评价"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "学校活动"): [
-        node("社团/俱乐部"),
-        node("考试/竞赛"),
-        node("运动会"),
-        node("志愿服务/社会实践"),
-        node("校园节日与活动"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "购物"): [
-        node("商品"),
-        node("货币及理财"),
-        node("价格与折扣"),
-        node("购物场所"),
-        node("线上购物"),
-        node("退换货与售后"),
-        node("消费习惯"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "饮食"): [
-        node("食物"),
-        node("饮料"),
-        node("用餐场景"),
-        node("点餐与菜单"),
-        node("健康饮食"),
-        node("餐桌礼仪"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "健康"): [
-        node("健康饮食"),
-        node("身体部位"),
-        node("疾病与症状"),
-        node("看病与就医"),
-        node("运动与健身"),
-        node("作息与习惯"),
-        node("心理健康"),
-        node("预防与卫生"),
-        node("健康建议"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "安全与救护"): [
-        node("事故"),
-        node("安全守则"),
-        node("急救常识"),
-        node("防灾避险"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "语言"): [
-        node("学习体验"),
-        node("学习策略"),
-        node("学习习惯"),
-        node("学习资源与工具"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自我", "方法与哲理"): [
-        node("方法/策略"),
-        node("哲理感悟"),
-        node("价值观与人生启示"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "人际交往"): [
-        node("友谊"),
-        node("家庭关系"),
-        node("师生关系"),
-        node("同学与邻里"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "文学"): [
-        node("人物传记"),
-        node("寓言故事"),
-        node("童话故事"),
-        node("短篇小说"),
-        node("诗歌"),
-        node("戏剧作品"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "艺术"): [
-        node("电影与戏剧"),
-        node("音乐与舞蹈"),
-        node("绘画与雕塑"),
-        node("摄影与影像"),
-        node("建筑与设计"),
-        node("传统艺术"),
-        node("艺术展览"),
-        node("审美与评价"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "体育"): [
-        node("锻炼/健身（个人）"),
-        node("竞技/比赛"),
-        node("体育项目"),
-        node("体育精神与团队合作"),
-        node("运动健康与安全"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "历史"): [
-        node("中国历史"),
-        node("世界历史"),
-        node("历史人物"),
-        node("历史事件与影响"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "社会"): [
-        node("公共秩序"),
-        node("政治/政策"),
-        node("法律与规则"),
-        node("权利与义务"),
-        node("公共服务"),
-        node("公益与志愿服务"),
-        node("社会问题与现象"),
-        node("经济与生活"),
-        node("网络与安全"),
-        node("社会热点与观点表达"),
-        node("社会责任与公民意识"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "文化"): [
-        node("中华文化"),
-        node("外国文化"),
-        node("文化差异"),
-        node("文化交流"),
-        node("礼仪与习俗"),
-        node("传统与现代"),
-        node("文化遗产"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "节日"): [
-        node("传统节日"),
-        node("外来节日"),
-        node("节日习俗与活动"),
-        node("节日意义与文化"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "著名人物"): [
-        node("政治家"),
-        node("科学家"),
-        node("文学家"),
-        node("艺术家"),
-        node("运动员"),
-        node("发明家"),
-        node("社会活动家"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "通讯与媒体"): [
-        node("通讯工具"),
-        node("通讯技术"),
-        node("传统媒体"),
-        node("新媒体与社交网络"),
-        node("媒体内容与广告"),
-        node("媒体素养与信息甄别"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "旅游"): [
-        node("旅游"),
-        node("城市与景点"),
-        node("旅行计划"),
-        node("旅行体验与感受"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "交通"): [
-        node("交通/运输"),
-        node("交通规则"),
-        node("交通工具"),
-        node("出行方式与选择"),
-        node("交通安全"),
-        node("交通问题与环保"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "科普知识与现代技术"): [
-        node("科普知识"),
-        node("科学技术"),
-        node("互联网与信息技术"),
-        node("人工智能与机器人"),
-        node("发明与创新"),
-        node("航天与探索"),
-        node("生物科技与医学"),
-        node("环保科技"),
-        node("科技与生活影响"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "时代变迁"): [
-        node("叙事忆旧"),
-        node("家乡变化"),
-        node("城市发展"),
-        node("科技进步与生活变化"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与社会", "世界"): [
-        node("国家与民族"),
-        node("国籍与人民"),
-        node("国际组织"),
-        node("国际交流与合作"),
-        node("世界地理与文化"),
-        node("全球问题"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自然", "自然"): [
-        node("自然景观"),
-        node("自然遗产"),
-        node("地理与地貌"),
-        node("动植物与生态"),
-        node("自然资源"),
-        node("环境保护"),
-        node("自然灾害"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自然", "天气"): [
-        node("描绘天气"),
-        node("天气预报"),
-        node("天气与活动"),
-    ],
-    ("知识点标签", "语篇主题", "初中", "人与自然", "动物与植物"): [
-        node("濒危生物"),
-        node("宠物"),
-        node("野生动物"),
-        node("植物与花卉"),
-        node("生态保护"),
-        node("动植物特征与习性"),
-    ],
-    # 语篇主题 - 高中
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "个人情况"): [
-        node("个人信息"),
-        node("个人经历"),
-        node("目标与理想"),
-        node("自我认知与成长"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "外表与形象"): [
-        node("外貌描述"),
-        node("衣着与风格"),
-        node("自我形象"),
-        node("他人评价"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "兴趣与爱好"): [
-        node("阅读"),
-        node("运动"),
-        node("音乐"),
-        node("艺术"),
-        node("科技与网络"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "家庭、朋友与周围的人"): [
-        node("家庭关系"),
-        node("友谊与同伴"),
-        node("沟通与相处"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "居住环境"): [
-        node("家庭与社区"),
-        node("城市与乡村"),
-        node("居住与环境问题"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "日常活动"): [
-        node("学习与作业"),
-        node("家务与生活习惯"),
-        node("休闲娱乐"),
-        node("社交活动"),
-        node("时间管理"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "学校生活"): [
-        node("学校设施"),
-        node("学科与课程"),
-        node("师生关系"),
-        node("同学关系"),
-        node("校园活动"),
-        node("考试与评价"),
-        node("社团与实践"),
-        node("学习压力"),
-        node("校园规则"),
-        node("升学与规划"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "节假日活动"): [
-        node("庆祝活动"),
-        node("旅行出游"),
-        node("文化体验"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "生活态度"): [
-        node("积极乐观"),
-        node("自律与坚持"),
-        node("价值观与人生观"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "购物"): [
-        node("商品与品牌"),
-        node("价格与折扣"),
-        node("线上购物"),
-        node("消费与理财"),
-        node("退换货与售后"),
-        node("购物体验与评价"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "语言学习"): [
-        node("学习方法"),
-        node("学习资源"),
-        node("听说读写能力"),
-        node("考试与备考"),
-        node("跨文化交流"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "饮食"): [
-        node("饮食习惯"),
-        node("健康饮食"),
-        node("点餐与餐桌礼仪"),
-        node("食品安全"),
-        node("特色美食"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "生活与学习", "健康"): [
-        node("身体部位"),
-        node("疾病与症状"),
-        node("就医与用药"),
-        node("运动健身"),
-        node("心理健康"),
-        node("作息与睡眠"),
-        node("健康饮食"),
-        node("传染病预防"),
-        node("安全与急救"),
-        node("健康建议"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "做人与做事", "计划与愿望"): [
-        node("个人计划"),
-        node("未来愿望"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "做人与做事", "工作与职业"): [
-        node("职业选择"),
-        node("工作技能"),
-        node("职场体验"),
-        node("职业规划"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "做人与做事", "精神与品格"): [
-        node("诚实守信"),
-        node("责任担当"),
-        node("坚持与毅力"),
-        node("勇气与自信"),
-        node("合作与团队"),
-        node("尊重与包容"),
-        node("创新与探索"),
-        node("乐于助人"),
-        node("自律与反思"),
-        node("领导力"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自我", "做人与做事", "情感与情绪"): [
-        node("情绪表达"),
-        node("情绪管理"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自然", "自然生态", "天气与气候"): [
-        node("天气现象"),
-        node("气候变化"),
-        node("极端天气"),
-        node("天气预报与影响"),
-        node("低碳与环保行动"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自然", "自然生态", "地理"): [
-        node("地形地貌"),
-        node("资源分布"),
-        node("人地关系"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自然", "自然生态", "自然"): [
-        node("自然景观"),
-        node("自然资源"),
-        node("生态系统"),
-        node("环境问题"),
-        node("环境保护"),
-        node("自然灾害"),
-        node("人与自然和谐"),
-    ],
-    ("知识点标签", "语篇主题", "高中", "人与自然", "自然生态", "户外探险"): [
-        node("旅行准备"),
-        node("户外活动"),
-        node("安全与急救"),
-        node("挑战与体验"),
-    ],
-    # 情景交际用语 - 小学
-    ("知识点标签", "情景交际用语", "小学", "社会交往"): [
-        node("问候"),
-        node("介绍"),
-        node("告别"),
-        node("感谢"),
-        node("道歉"),
-        node("祝贺"),
-        node("邀请与回应"),
-        node("请求与帮助"),
-        node("建议与提醒"),
-        node("赞同与反对"),
-        node("表达喜好"),
-        node("询问与回答"),
-        node("安慰与鼓励"),
-        node("投诉与解释"),
-    ],
-    ("知识点标签", "情景交际用语", "小学", "个人情况"): [
-        node("姓名"),
-        node("年龄"),
-        node("性别"),
-        node("国籍与语言"),
-        node("家庭成员"),
-        node("外貌描述"),
-        node("性格品质"),
-        node("兴趣爱好"),
-        node("生日"),
-        node("联系方式"),
-    ],
-    ("知识点标签", "情景交际用语", "小学", "场所场景"): [
-        node("看病"),
-        node("问路"),
-        node("购物"),
-        node("点餐"),
-        node("乘车出行"),
-        node("在学校/课堂"),
-    ],
-    ("知识点标签", "情景交际用语", "小学", "日常生活"): [
-        node("颜色"),
-        node("数量"),
-        node("尺寸与形状"),
-        node("位置与方向"),
-        node("天气"),
-        node("食物与饮料"),
-        node("服装与饰品"),
-        node("家庭"),
-        node("学校"),
-        node("交通工具"),
-        node("购物与价格"),
-        node("动物"),
-        node("植物"),
-        node("身体部位"),
-        node("健康与疾病"),
-        node("节日与活动"),
-        node("兴趣与运动"),
-        node("家务与习惯"),
-        node("物品与用品"),
-        node("职业"),
-        node("城市与乡村"),
-    ],
-    # 语篇 - 初中
-    ("知识点标签", "语篇", "初中", "语篇类型"): [
-        node("记叙文"),
-        node("说明文"),
-        node("议论文"),
-        node("应用文"),
-        node("新闻报道"),
-        node("广告/海报"),
-        node("书信/邮件"),
-        node("日记/通知"),
-    ],
-    ("知识点标签", "语篇", "初中", "阅读技能"): [
-        node("细节理解"),
-        node("主旨大意"),
-        node("推理判断"),
-        node("词义猜测"),
-        node("观点态度"),
-        node("篇章结构"),
-        node("信息匹配/归纳概括"),
-    ],
-    # 语用 - 初中
-    ("知识点标签", "语用", "初中", "情景交际"): [
-        node("社会交往"),
-        node("态度"),
-        node("情感"),
-        node("请求与建议"),
-        node("赞同与反对"),
-        node("推测与判断"),
-        node("评价与评论"),
-        node("说明与解释"),
-        node("道歉与感谢"),
-        node("祝愿与祝贺"),
-    ],
-    # 语法 - 小学
-    ("知识点标签", "语法", "小学", "名词"): [
-        node("名词的数"),
-        node("名词所有格"),
-        node("可数与不可数名词"),
-        node("专有名词与普通名词"),
-        node("名词的用法"),
-    ],
-    ("知识点标签", "语法", "小学", "冠词"): [
-        node("不定冠词（a, an）"),
-        node("定冠词（the）"),
-        node("零冠词"),
-    ],
-    ("知识点标签", "语法", "小学", "代词"): [
-        node("人称代词"),
-        node("物主代词"),
-        node("指示代词"),
-        node("疑问代词"),
-        node("反身代词"),
-        node("不定代词"),
-        node("代词的用法"),
-    ],
-    ("知识点标签", "语法", "小学", "数词"): [
-        node("基数词"),
-        node("序数词"),
-        node("分数与百分数"),
-    ],
-    ("知识点标签", "语法", "小学", "形容词"): [
-        node("形容词原级"),
-        node("形容词比较级与最高级"),
-        node("形容词的用法与顺序"),
-    ],
-    ("知识点标签", "语法", "小学", "副词"): [
-        node("副词原级"),
-        node("副词比较级与最高级"),
-        node("频度副词"),
-        node("副词的位置与用法"),
-    ],
-    ("知识点标签", "语法", "小学", "介词"): [
-        node("时间介词"),
-        node("地点/方位介词"),
-        node("方式介词"),
-        node("原因介词"),
-        node("伴随介词（with）"),
-        node("常见介词短语"),
-        node("介词用法与搭配"),
-        node("易混介词辨析"),
-    ],
-    ("知识点标签", "语法", "小学", "连词"): [
-        node("并列连词"),
-        node("转折连词"),
-        node("选择连词"),
-        node("因果连词"),
-        node("条件/时间连词"),
-    ],
-    ("知识点标签", "语法", "小学", "动词"): [
-        node("实义动词"),
-        node("系动词"),
-        node("助动词"),
-        node("情态动词"),
-        node("动词形式变化"),
-    ],
-    ("知识点标签", "语法", "小学", "时态"): [
-        node("一般现在时"),
-        node("现在进行时"),
-        node("一般过去时"),
-        node("过去进行时"),
-        node("一般将来时"),
-        node("现在完成时"),
-    ],
-    ("知识点标签", "语法", "小学", "一般疑问句"): [
-        node("be 动词引导的一般疑问句及其回答"),
-        node("助动词引导的一般疑问句及其回答"),
-        node("情态动词引导的一般疑问句及其回答"),
-    ],
-    ("知识点标签", "语法", "小学", "特殊疑问句"): [
-        node("What 引导的特殊疑问句及其回答"),
-        node("When 引导的特殊疑问句及其回答"),
-        node("Where 引导的特殊疑问句及其回答"),
-        node("Who 引导的特殊疑问句及其回答"),
-        node("Whose 引导的特殊疑问句及其回答"),
-        node("Which 引导的特殊疑问句及其回答"),
-        node("Why 引导的特殊疑问句及其回答"),
-        node("How 引导的特殊疑问句及其回答"),
-        node("How old 引导的特殊疑问句及其回答"),
-        node("How many 引导的特殊疑问句及其回答"),
-        node("How much 引导的特殊疑问句及其回答"),
-        node("How long 引导的特殊疑问句及其回答"),
-        node("How far 引导的特殊疑问句及其回答"),
-        node("How often 引导的特殊疑问句及其回答"),
-        node("How soon 引导的特殊疑问句及其回答"),
-        node("How deep 引导的特殊疑问句及其回答"),
-        node("How high 引导的特殊疑问句及其回答"),
-        node("How heavy 引导的特殊疑问句及其回答"),
-        node("How large 引导的特殊疑问句及其回答"),
-        node("How tall 引导的特殊疑问句及其回答"),
-        node("How wide 引导的特殊疑问句及其回答"),
-        node("How fast 引导的特殊疑问句及其回答"),
-        node("What time 引导的特殊疑问句及其回答"),
-    ],
-    ("知识点标签", "语法", "小学", "there be 句型"): [
-        node("there is + 单数名词"),
-        node("there are + 复数名词"),
-        node("there was / there were"),
-        node("there will be"),
-        node("there is/are going to be"),
-        node("there has/have been"),
-        node("there used to be"),
-    ],
-    ("知识点标签", "语法", "小学", "句子的应用"): [
-        node("主谓一致"),
-        node("单复数句子转换"),
-        node("肯定句与否定句转换"),
-        node("陈述句与疑问句转换"),
-        node("同义句转换"),
-        node("句子排序与连句成段"),
-    ],
-    # 词汇
-    ("知识点标签", "词汇", "小学", "词汇辨析"): [
-        node("名词辨析"),
-        node("动词辨析"),
-        node("形容词辨析"),
-        node("副词辨析"),
-        node("介词辨析"),
-        node("代词辨析"),
-        node("连词辨析"),
-        node("短语辨析"),
-    ],
-    ("知识点标签", "词汇", "小学", "其他词汇知识"): [
-        node("同义词"),
-        node("反义词"),
-        node("一词多义"),
-        node("同音/形近词"),
-        node("词义归类"),
-    ],
-    ("知识点标签", "词汇", "小学", "知识/固定搭配"): [
-        node("名词词组"),
-        node("动词短语"),
-        node("介词短语"),
-        node("形容词短语"),
-        node("常用固定搭配"),
-    ],
-    ("知识点标签", "词汇", "初中", "词汇辨析"): [
-        node("名词辨析"),
-        node("代词辨析"),
-        node("动词辨析"),
-        node("形容词辨析"),
-        node("副词辨析"),
-        node("介词辨析"),
-        node("连词辨析"),
-        node("冠词辨析"),
-        node("短语辨析"),
-    ],
-    ("知识点标签", "词汇", "初中", "短语"): [
-        node("动词短语"),
-        node("介词短语"),
-        node("名词短语"),
-        node("形容词短语"),
-        node("固定搭配"),
-    ],
-    ("知识点标签", "词汇", "初中", "构词法"): [
-        node("派生"),
-        node("转化"),
-        node("合成"),
-        node("缩略"),
-    ],
-    # 语音
-    ("知识点标签", "语音", "小学", "发音"): [
-        node("字母的发音"),
-        node("字母组合的发音"),
-        node("元音发音"),
-        node("辅音发音"),
-        node("重音与节奏"),
-        node("连读与停顿"),
-    ],
-    ("知识点标签", "语音", "初中", "基本读音"): [
-        node("字母"),
-        node("元音字母的发音"),
-        node("辅音字母的发音"),
-        node("字母组合的发音"),
-        node("国际音标"),
-        node("常见发音规则"),
-        node("易错发音辨析"),
-    ],
-    ("知识点标签", "语音", "初中", "语音与节奏"): [
-        node("升调"),
-        node("降调"),
-        node("重音"),
-        node("连读"),
-    ],
-}
-
-
 def merge_children(primary: List[Dict[str, Any]], secondary: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Dedupe by title (trimmed). Preserve order: primary first, then secondary."""
     seen = set()
@@ -766,39 +100,131 @@ def merge_children(primary: List[Dict[str, Any]], secondary: List[Dict[str, Any]
 
 
 class Stats:
+    __slots__ = ("placeholders_found", "placeholders_replaced", "placeholders_removed")
+
     def __init__(self) -> None:
         self.placeholders_found = 0
         self.placeholders_replaced = 0
         self.placeholders_removed = 0
 
+    def add(self, other: "Stats") -> None:
+        self.placeholders_found += other.placeholders_found
+        self.placeholders_replaced += other.placeholders_replaced
+        self.placeholders_removed += other.placeholders_removed
+
+    def summary(self) -> str:
+        return (
+            f"placeholders found={self.placeholders_found} replaced={self.placeholders_replaced} "
+            f"removed={self.placeholders_removed}"
+        )
+
 
 def transform(node_obj: Dict[str, Any], path: List[str], stats: Stats) -> Dict[str, Any]:
-    title = (node_obj.get("title") or "").strip()
-    next_path = path + [title]
+    """Expand placeholders in the subtree at `node_obj` (in place); `path` holds the ancestor titles.
+
+    Uses an explicit stack, so depth is not limited by the recursion limit, and one shared
+    `prefix` list that grows and shrinks with the walk instead of a path copy per node.
+    """
+    prefix = list(path)
+    base = len(prefix)
+    seen: set = set()
+    stack: List[Tuple[Dict[str, Any], int]] = [(node_obj, base)]
+    while stack:
+        n, depth = stack.pop()
+        del prefix[depth:]
+        prefix.append((n.get("title") or "").strip())
+        descend = _expand_children(n, prefix, stats, seen)
+        for i in range(len(descend) - 1, -1, -1):
+            ch = descend[i]
+            if ch.get("children"):
+                stack.append((ch, depth + 1))
+            elif "children" in ch:
+                # Leaf with an empty/falsy children value: finish it here instead of a stack round trip.
+                del ch["children"]
+    return node_obj
+
+
+def _expand_children(
+    node_obj: Dict[str, Any], path: List[str], stats: Stats, seen: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    """Resolve placeholder children of `node_obj` in place. `path` ends with node_obj's own title.
 
+    Returns the non-placeholder children still to be transformed, including ones the title
+    dedupe drops (their placeholders are still counted, as before). `seen` is scratch space
+    that callers may reuse across nodes; the children list is only copied when something changes.
+    """
     children = node_obj.get("children") or []
     if not isinstance(children, list) or not children:
         node_obj.pop("children", None)
-        return node_obj
-
-    kept: List[Dict[str, Any]] = []
-    placeholder_nodes: List[Dict[str, Any]] = []
+        return []
 
+    if seen is None:
+        seen = set()
+    # Fast path, one pass: no placeholders, no junk entries, no empty or repeated titles.
+    match = PLACEHOLDER_RE.match
     for ch in children:
         if not isinstance(ch, dict):
-            continue
-        ch_title = (ch.get("title") or "").strip()
-        if is_placeholder_title(ch_title):
+            break
+        title = (ch.get("title") or "").strip()
+        if not title or title in seen or match(title):
+            break
+        seen.add(title)
+    else:
+        seen.clear()
+        return children
+    seen.clear()
+
+    kept: Optional[List[Dict[str, Any]]] = None  # stays None while every child is kept as-is
+    placeholder_nodes: List[Dict[str, Any]] = []
+    for i, ch in enumerate(children):
+        if isinstance(ch, dict):
+            ch_title = (ch.get("title") or "").strip()
+            if not is_placeholder_title(ch_title):
+                if kept is not None:
+                    kept.append(ch)
+                continue
             stats.placeholders_found += 1
             placeholder_nodes.append(ch)
-            continue
-        kept.append(transform(ch, next_path, stats))
+        if kept is None:
+            kept = children[:i]
+    if kept is None:
+        kept = children
+
+    if placeholder_nodes:
+        merged = merge_children(resolve_placeholders(placeholder_nodes, tuple(path), stats), kept)
+    else:
+        # Same result as merge_children([], kept), without allocating when nothing is dropped.
+        merged = kept
+        for i, ch in enumerate(kept):
+            title = (ch.get("title") or "").strip()
+            if title and title not in seen:
+                seen.add(title)
+                if merged is not kept:
+                    merged.append(ch)
+            elif merged is kept:
+                merged = kept[:i]
+        seen.clear()
+
+    if merged:
+        if merged is not children:
+            node_obj["children"] = merged
+    else:
+        node_obj.pop("children", None)
+    return kept
+
+
+def resolve_placeholders(
+    placeholder_nodes: List[Dict[str, Any]], parent_key: Tuple[str, ...], stats: Stats
+) -> List[Dict[str, Any]]:
+    """Pick the nodes that stand in for `placeholder_nodes` under `parent_key`.
 
+    Curated lists come from the replacement catalogs (`tag_catalogs/*.json`, see replacement_catalog.py).
+    """
     replacements: List[Dict[str, Any]] = []
     if placeholder_nodes:
-        parent_key = tuple(next_path)
-        if parent_key in REPLACEMENTS:
-            replacements = REPLACEMENTS[parent_key]
+        curated = get_catalog().lookup(parent_key)
+        if curated is not None:
+            replacements = curated
             stats.placeholders_replaced += len(placeholder_nodes)
         else:
             # If we don't have a curated list, fall back to parsed examples (if any).
@@ -812,37 +238,731 @@ def transform(node_obj: Dict[str, Any], path: List[str], stats: Stats) -> Dict[s
                 stats.placeholders_replaced += len(placeholder_nodes)
             else:
                 stats.placeholders_removed += len(placeholder_nodes)
+    return replacements
 
-    merged = merge_children(replacements, kept)
-    if merged:
-        node_obj["children"] = merged
-    else:
-        node_obj.pop("children", None)
-    return node_obj
 
+ID_HASH_SEED = 5381
 
-def main() -> int:
-    root = Path(__file__).resolve().parents[1]
-    target = Path(sys.argv[1]) if len(sys.argv) > 1 else (root / "题型知识点标签.json")
-    target = target.resolve()
 
-    data = json.loads(target.read_text(encoding="utf-8"))
+def id_hash(text: str, h: int = ID_HASH_SEED) -> int:
+    """The djb2 state of `createIdFromPath` after `text`, continuing from state `h`.
+
+    djb2 is a running hash, so the state of "a/b" is `id_hash("/b", id_hash("a"))`: a tree walk
+    can hash each path from its parent's state instead of rehashing the whole path.
+    """
+    data = text.encode("utf-16-le")
+    for i in range(0, len(data), 2):
+        h = ((h << 5) + h + (data[i] | (data[i + 1] << 8))) & 0xFFFFFFFF
+    return h
+
+
+def id_hash_step(text: str) -> Tuple[int, int]:
+    """(mul, add) such that `id_hash(text, h) == (h * mul + add) & 0xFFFFFFFF` for every h.
+
+    djb2 is linear in its state, so a step can be cached per distinct title and applied to
+    any parent's state with one multiply-add.
+    """
+    return pow(33, len(text.encode("utf-16-le")) // 2, 1 << 32), id_hash(text, 0)
+
+
+def create_id_from_path(path: str) -> str:
+    """Port of `createIdFromPath` in stores/tagTree.ts: 32-bit djb2 over UTF-16 code units."""
+    return f"t_{id_hash(path):x}"
+
+
+class TagIndexBuilder:
+    """Precomputed tag index equivalent to `ensureNodeIds` + `buildTagIndex` in stores/tagTree.ts.
+
+    Nodes are stored in preorder as parallel columns. `parents[i]` and `roots[i]` are offsets into
+    the same columns (-1 for a root's parent). The `buildTagIndex` path of node i is
+    `path[parents[i]] + "/" + titles[i]`, skipping empty parts, so paths are not stored twice.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.parents: List[int] = []
+        self.roots: List[int] = []
+        self.collisions: List[Tuple[str, str, str]] = []
+        self.duplicates = 0
+        self._path_by_id: Dict[str, str] = {}
+
+    def add_root(self, root: Dict[str, Any]) -> None:
+        root_offset = len(self.ids)
+        # (node, parent offset, parent id path) — id paths keep empty titles, like ensureNodeIds.
+        stack: List[Tuple[Dict[str, Any], int, Optional[str]]] = [(root, -1, None)]
+        while stack:
+            node_obj, parent, parent_path = stack.pop()
+            title = (node_obj.get("title") or "").strip()
+            path = title if parent_path is None else f"{parent_path}/{title}"
+            node_id = node_obj.get("id") or create_id_from_path(path)
+
+            prev = self._path_by_id.get(node_id)
+            if prev is None:
+                self._path_by_id[node_id] = path
+            elif prev == path:
+                self.duplicates += 1
+            else:
+                self.collisions.append((node_id, prev, path))
+
+            offset = len(self.ids)
+            self.ids.append(node_id)
+            self.titles.append(title)
+            self.parents.append(parent)
+            self.roots.append(root_offset)
+
+            children = node_obj.get("children")
+            if isinstance(children, list):
+                for ch in reversed(children):
+                    if isinstance(ch, dict):
+                        stack.append((ch, offset, path))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "count": len(self.ids),
+            "ids": self.ids,
+            "titles": self.titles,
+            "parents": self.parents,
+            "roots": self.roots,
+        }
+
+    def write(self, path: Path, writer: Optional[OutputWriter] = None) -> None:
+        text = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+        (writer or OutputWriter()).write_text(path, text)
+
+    def report(self) -> None:
+        print(f"index nodes={len(self.ids)} collisions={len(self.collisions)} duplicate_paths={self.duplicates}")
+        for node_id, first, second in self.collisions:
+            print(f"id collision {node_id}: {first!r} vs {second!r}", file=sys.stderr)
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array one at a time.
+
+    Only the item being decoded is buffered, so peak memory follows the largest
+    single item instead of the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    read_size = chunk_size
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof, read_size
+        if eof:
+            return False
+        chunk = fp.read(read_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return True
+            if not fill():
+                return False
+
+    if not skip_ws() or buf[pos] != "[":
+        raise ValueError("Expected top-level JSON array")
+    pos += 1
+
+    first = True
+    while True:
+        if not skip_ws():
+            raise ValueError("Unterminated top-level JSON array")
+        if buf[pos] == "]":
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise ValueError(f"Expected ',' between array items, got {buf[pos]!r}")
+            pos += 1
+            if not skip_ws():
+                raise ValueError("Unterminated top-level JSON array")
+        first = False
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Incomplete item: grow the read size so a large item costs O(n), not O(n^2).
+                if not fill():
+                    raise
+                read_size *= 2
+                continue
+            if end == len(buf) and fill():
+                # A scalar may continue past the buffer edge (e.g. a split number); re-decode.
+                continue
+            pos = end
+            read_size = chunk_size
+            yield item
+            break
+
+
+def write_json_array(items: Iterator[Any], fp: TextIO) -> int:
+    """Write items as a JSON array, byte-identical to `json.dumps(list(items), indent=2)`."""
+    count = 0
+    for item in items:
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        # Newlines inside JSON strings are always escaped, so this only re-indents structure.
+        fp.write(("[\n  " if count == 0 else ",\n  ") + text.replace("\n", "\n  "))
+        count += 1
+    fp.write("\n]\n" if count else "[]\n")
+    return count
+
+
+def _visit_roots(nodes: Iterator[Dict[str, Any]], on_root: Optional[Callable[[Dict[str, Any]], None]]):
+    for n in nodes:
+        if on_root is not None:
+            on_root(n)
+        yield n
+
+
+def run_stream(
+    target: Path,
+    stats: Stats,
+    on_root: Optional[Callable[[Dict[str, Any]], None]] = None,
+    writer: Optional[OutputWriter] = None,
+) -> None:
+    """Transform `target` in place one top-level node at a time."""
+    with open(target, "r", encoding="utf-8") as src, (writer or OutputWriter()).open(target) as dst:
+        items = (transform(n, [], stats) for n in iter_json_array(src) if isinstance(n, dict))
+        write_json_array(_visit_roots(items, on_root), dst)
+
+
+CACHE_VERSION = 1
+
+
+def _sha256_json(obj: Any) -> str:
+    text = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def default_cache_path(target: Path) -> Path:
+    return target.with_name(f".{target.name}.expand-cache.json")
+
+
+class IncrementalCache:
+    """Sidecar cache for `--incremental`: hashes of the target file, each branch and each catalog entry.
+
+    A branch is a subtree rooted `depth` titles below the top (e.g. 知识点标签/语篇主题/初中 for depth=3).
+    Its entry records the hash of its last transformed output plus a digest of the catalog entries
+    that can match under it, so an unchanged branch can be reused without running `transform()` again.
+    """
+
+    def __init__(self, path: Path, depth: int) -> None:
+        self.path = path
+        self.depth = depth
+        self.replacements = {"/".join(k): _sha256_json(v) for k, v in get_catalog().entries().items()}
+        self.file: Dict[str, Any] = {}
+        self.branches: Dict[str, Dict[str, str]] = {}
+        self.prev_replacements: Dict[str, str] = {}
+        self.reused = 0
+        self.rebuilt = 0
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION and data.get("depth") == depth:
+            self.file = data.get("file") or {}
+            self.branches = data.get("branches") or {}
+            self.prev_replacements = data.get("replacements") or {}
+
+        # Entries grouped by their first `depth` segments; a group may contain wildcards.
+        self._groups: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        for key in get_catalog().entries():
+            if len(key) >= depth:
+                name = "/".join(key)
+                self._groups.setdefault(key[:depth], []).append((name, self.replacements[name]))
+
+    def is_noop(self, target: Path) -> bool:
+        """True if neither the target file nor any catalog entry changed since the last run."""
+        if not self.file or self.prev_replacements != self.replacements:
+            return False
+        st = target.stat()
+        if st.st_size != self.file.get("size"):
+            return False
+        if st.st_mtime_ns == self.file.get("mtime_ns"):
+            return True
+        # Fresh checkouts reset mtimes; fall back to the content hash before parsing anything.
+        return _sha256_file(target) == self.file.get("sha256")
+
+    def transform(self, node_obj: Dict[str, Any], path: List[str], stats: Stats, seen: set) -> Dict[str, Any]:
+        if len(path) + 1 < self.depth:
+            next_path = path + [(node_obj.get("title") or "").strip()]
+            for ch in _expand_children(node_obj, next_path, stats):
+                self.transform(ch, next_path, stats, seen)
+            return node_obj
+
+        branch = path + [(node_obj.get("title") or "").strip()]
+        key = "/".join(branch)
+        rep_digest = self._branch_digest(branch)
+        if key in seen:
+            # Duplicate branch path: merge_children keeps the first one, so only that one is cached.
+            self.rebuilt += 1
+            return transform(node_obj, path, stats)
+        seen.add(key)
+
+        entry = self.branches.get(key)
+        if entry and entry.get("replacements") == rep_digest and entry.get("sha256") == _sha256_json(node_obj):
+            self.reused += 1
+            return node_obj
+
+        out = transform(node_obj, path, stats)
+        self.branches[key] = {"sha256": _sha256_json(out), "replacements": rep_digest}
+        self.rebuilt += 1
+        return out
+
+    def _branch_digest(self, branch: List[str]) -> str:
+        items: List[Tuple[str, str]] = []
+        for prefix, group in self._groups.items():
+            if all(p == WILDCARD or p == t for p, t in zip(prefix, branch)):
+                items.extend(group)
+        return _sha256_json(sorted(items)) if items else ""
+
+    def save(self, target: Path, seen: set, writer: Optional[OutputWriter] = None) -> None:
+        st = target.stat()
+        data = {
+            "version": CACHE_VERSION,
+            "depth": self.depth,
+            "file": {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256_file(target)},
+            "replacements": self.replacements,
+            "branches": {k: v for k, v in self.branches.items() if k in seen},
+        }
+        (writer or OutputWriter()).write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+
+
+def _null_phase(name: str) -> ContextManager[None]:
+    return contextlib.nullcontext()
+
+
+def run_incremental(
+    target: Path,
+    cache: IncrementalCache,
+    stats: Stats,
+    on_root: Optional[Callable[[Dict[str, Any]], None]] = None,
+    allow_noop: bool = True,
+    phase: Callable[[str], ContextManager[None]] = _null_phase,
+    writer: Optional[OutputWriter] = None,
+) -> bool:
+    """Transform only branches whose input or curated replacements changed. Returns False on a no-op."""
+    with phase("cache"):
+        if allow_noop and cache.is_noop(target):
+            return False
+
+    with phase("read"):
+        raw = target.read_text(encoding="utf-8")
+    with phase("parse"):
+        data = json.loads(raw)
     if not isinstance(data, list):
-        print("Expected top-level JSON array", file=sys.stderr)
-        return 2
+        raise ValueError("Expected top-level JSON array")
 
+    seen: set = set()
+    with phase("walk"):
+        out = list(_visit_roots((cache.transform(n, [], stats, seen) for n in data if isinstance(n, dict)), on_root))
+    with phase("serialize"):
+        text = json.dumps(out, ensure_ascii=False, indent=2) + "\n"
+    writer = writer or OutputWriter()
+    with phase("write"):
+        writer.write_text(target, text)
+    with phase("cache"):
+        cache.save(target, seen, writer)
+    return True
+
+
+class _TimedPattern:
+    """Stands in for `PLACEHOLDER_RE` while profiling: same `match()`, timed and counted."""
+
+    def __init__(self, pattern: "re.Pattern[str]", profiler: "Profiler") -> None:
+        self.pattern = pattern
+        self.profiler = profiler
+
+    def match(self, string: str) -> Optional["re.Match[str]"]:
+        w0, c0 = time.perf_counter(), time.process_time()
+        m = self.pattern.match(string)
+        self.profiler.charge("regex", time.perf_counter() - w0, time.process_time() - c0)
+        return m
+
+
+class Profiler:
+    """Wall/CPU time per phase plus work counters for `--profile`.
+
+    Phases are timed with `phase(name)`. Placeholder regex matching and `merge_children()` are
+    timed per call through wrappers that `installed()` swaps into this module's globals; that
+    time is charged to "regex"/"merge" and taken out of whichever phase was running, so "walk"
+    is the tree walk itself. The per-call timers slow the walk down, so compare profiles with
+    each other rather than with the wall time of a plain run.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, List[float]] = {}  # name -> [wall_s, cpu_s]
+        self.counters: Dict[str, int] = {"nodes_visited": 0, "parents_expanded": 0, "regex_calls": 0, "merge_calls": 0}
+        self._inner = [0.0, 0.0]  # regex/merge time charged so far, subtracted from the enclosing phase
+        self._start = (time.perf_counter(), time.process_time())
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        w0, c0 = time.perf_counter(), time.process_time()
+        inner_w, inner_c = self._inner
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - w0 - (self._inner[0] - inner_w)
+            cpu = time.process_time() - c0 - (self._inner[1] - inner_c)
+            acc = self.phases.setdefault(name, [0.0, 0.0])
+            acc[0] += wall
+            acc[1] += cpu
+
+    def charge(self, name: str, wall: float, cpu: float) -> None:
+        acc = self.phases.setdefault(name, [0.0, 0.0])
+        acc[0] += wall
+        acc[1] += cpu
+        self._inner[0] += wall
+        self._inner[1] += cpu
+        key = f"{name}_calls"
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator[None]:
+        g = globals()
+        saved = {name: g[name] for name in ("PLACEHOLDER_RE", "merge_children", "_expand_children")}
+        merge, expand = saved["merge_children"], saved["_expand_children"]
+
+        def timed_merge(primary: List[Dict[str, Any]], secondary: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            w0, c0 = time.perf_counter(), time.process_time()
+            out = merge(primary, secondary)
+            self.charge("merge", time.perf_counter() - w0, time.process_time() - c0)
+            return out
+
+        def counted_expand(
+            node_obj: Dict[str, Any], path: List[str], stats: Stats, seen: Optional[set] = None
+        ) -> List[Dict[str, Any]]:
+            children = node_obj.get("children")
+            if isinstance(children, list):
+                self.counters["nodes_visited"] += len(children)
+            self.counters["parents_expanded"] += 1
+            return expand(node_obj, path, stats, seen)
+
+        g.update(PLACEHOLDER_RE=_TimedPattern(saved["PLACEHOLDER_RE"], self), merge_children=timed_merge)
+        g["_expand_children"] = counted_expand
+        try:
+            yield
+        finally:
+            g.update(saved)
+
+    def report(self, target: Path, mode: str, stats: Stats) -> Dict[str, Any]:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else 0
+        return {
+            "version": 1,
+            "target": str(target),
+            "mode": mode,
+            "total": {
+                "wall_s": round(time.perf_counter() - self._start[0], 6),
+                "cpu_s": round(time.process_time() - self._start[1], 6),
+            },
+            "phases": {name: {"wall_s": round(w, 6), "cpu_s": round(c, 6)} for name, (w, c) in self.phases.items()},
+            "counters": dict(
+                self.counters,
+                placeholders_found=stats.placeholders_found,
+                placeholders_replaced=stats.placeholders_replaced,
+                placeholders_removed=stats.placeholders_removed,
+            ),
+            # ru_maxrss is KiB on Linux and bytes on macOS; null where unavailable.
+            "peak_rss_mb": round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1) if peak else None,
+        }
+
+
+def expand_file(
+    target: Path, args: argparse.Namespace, profiler: Optional[Profiler] = None, writer: Optional[OutputWriter] = None
+) -> Tuple[Stats, List[str]]:
+    """Run one target through the mode selected in `args`. Returns stats and extra report lines.
+
+    Outputs go through `writer`, which leaves files whose content did not change untouched.
+    """
+    writer = writer or OutputWriter()
+    phase = profiler.phase if profiler is not None else _null_phase
+    with phase("catalog"):
+        use_catalogs([Path(c) for c in args.catalog]).entries()
     stats = Stats()
-    out = [transform(n, [], stats) for n in data if isinstance(n, dict)]
+    notes: List[str] = []
+    index = TagIndexBuilder() if args.emit_index else None
+    index_path = Path(args.emit_index).resolve() if args.emit_index else None
+    binary = TagTreeBinaryBuilder() if args.emit_binary else None
+    binary_path = Path(args.emit_binary).resolve() if args.emit_binary else None
+    artifacts = [(b, p) for b, p in ((index, index_path), (binary, binary_path)) if b is not None and p is not None]
+
+    def on_root(n: Dict[str, Any]) -> None:
+        if profiler is None:
+            for builder, _ in artifacts:
+                builder.add_root(n)
+            return
+        profiler.counters["nodes_visited"] += 1
+        if artifacts:
+            w0, c0 = time.perf_counter(), time.process_time()
+            for builder, _ in artifacts:
+                builder.add_root(n)
+            profiler.charge("emit", time.perf_counter() - w0, time.process_time() - c0)
+
+    if args.stream:
+        # Parse, walk and write interleave per top-level node, so they are one phase here.
+        with phase("stream"):
+            run_stream(target, stats, on_root, writer)
+    elif args.incremental:
+        with phase("cache"):
+            cache = IncrementalCache(Path(args.cache) if args.cache else default_cache_path(target), max(1, args.cache_depth))
+        allow_noop = all(p.exists() for _, p in artifacts)
+        changed = run_incremental(target, cache, stats, on_root, allow_noop=allow_noop, phase=phase, writer=writer)
+        if not changed:
+            notes.append("unchanged (cache hit), nothing to do")
+            return stats, notes
+        notes.append(f"branches reused={cache.reused} rebuilt={cache.rebuilt}")
+    else:
+        with phase("read"):
+            raw = target.read_text(encoding="utf-8")
+        with phase("parse"):
+            data = json.loads(raw)
+        if not isinstance(data, list):
+            raise ValueError("Expected top-level JSON array")
+
+        with phase("walk"):
+            out = list(_visit_roots((transform(n, [], stats) for n in data if isinstance(n, dict)), on_root))
+
+        # Write in-place with a trailing newline, keep 2-space indent to match repo style.
+        with phase("serialize"):
+            text = json.dumps(out, ensure_ascii=False, indent=2) + "\n"
+        with phase("write"):
+            writer.write_text(target, text)
+
+    with phase("emit"):
+        if index is not None and index_path is not None:
+            index.write(index_path, writer)
+            index.report()
+        if binary is not None and binary_path is not None:
+            size = binary.write(binary_path, writer)
+            notes.append(f"binary nodes={len(binary.titles)} strings={binary.string_count} bytes={size}")
+    return stats, notes
+
+
+def profile_file(
+    target: Path, args: argparse.Namespace, writer: Optional[OutputWriter] = None, stdout: Optional[TextIO] = None
+) -> Tuple[Stats, List[str]]:
+    """`expand_file()` under `--profile` and/or `--cprofile`; writes the requested reports.
+
+    `--profile -` writes the JSON to `stdout` (default: sys.stdout).
+    """
+    profiler = Profiler() if args.profile else None
+    cprof = cProfile.Profile() if args.cprofile else None
+    mode = "stream" if args.stream else "incremental" if args.incremental else "default"
+    with profiler.installed() if profiler is not None else contextlib.nullcontext():
+        if cprof is not None:
+            cprof.enable()
+        try:
+            stats, notes = expand_file(target, args, profiler, writer)
+        finally:
+            if cprof is not None:
+                cprof.disable()
+    if cprof is not None:
+        cprof.dump_stats(args.cprofile)
+        notes.append(f"cProfile stats written to {args.cprofile}")
+    if profiler is not None:
+        text = json.dumps(profiler.report(target, mode, stats), ensure_ascii=False, indent=2) + "\n"
+        if args.profile == "-":
+            (stdout or sys.stdout).write(text)
+        else:
+            Path(args.profile).write_text(text, encoding="utf-8")
+            notes.append(f"profile written to {args.profile}")
+    return stats, notes
+
+
+def is_tag_index_file(path: Path) -> bool:
+    """True for a flat tag index written by `--emit-index` (recognized by its fixed header)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+    except OSError:
+        return False
+    return head.startswith(b'{"version":') and b',"count":' in head
+
+
+def _iter_dir_targets(root: Path) -> Iterator[Path]:
+    """*.json under `root`, minus our own artifacts: dotfiles and dot-directories (the
+    `--incremental` sidecars) and `--emit-index` outputs."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.endswith(".json") and not name.startswith("."):
+                path = Path(dirpath) / name
+                if not is_tag_index_file(path):
+                    yield path
+
+
+def collect_targets(patterns: List[str]) -> List[Path]:
+    """Expand files, directories (recursively, *.json) and glob patterns into unique paths."""
+    found: Dict[Path, None] = {}
+    for pattern in patterns:
+        p = Path(pattern)
+        if p.is_dir():
+            matches = sorted(_iter_dir_targets(p))
+        elif glob.has_magic(pattern):
+            matches = sorted(Path(m) for m in glob.glob(pattern, recursive=True))
+        else:
+            matches = [p]
+        for m in matches:
+            if m.is_file() or not m.exists():
+                found.setdefault(m.resolve(), None)
+    return list(found)
+
+
+def _expand_file_worker(
+    target: str, args: argparse.Namespace
+) -> Tuple[str, Optional[Stats], OutputWriter, List[str]]:
+    writer = OutputWriter()
+    try:
+        stats, notes = expand_file(Path(target), args, writer=writer)
+    except (OSError, ValueError) as exc:
+        return target, None, writer, [f"error: {exc}"]
+    return target, stats, writer, notes
+
+
+def run_batch(targets: List[Path], args: argparse.Namespace) -> int:
+    """Expand many files in a process pool, one file per task. Returns the number of failed files."""
+    # Largest files first so one big taxonomy does not end up alone at the tail of the schedule.
+    ordered = sorted(targets, key=lambda t: t.stat().st_size if t.exists() else 0, reverse=True)
+    workers = args.workers or os.cpu_count() or 1
+    results: Dict[str, Tuple[Optional[Stats], OutputWriter, List[str]]] = {}
+
+    if workers == 1 or len(ordered) == 1:
+        for t in ordered:
+            name, stats, writer, notes = _expand_file_worker(str(t), args)
+            results[name] = (stats, writer, notes)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ordered))) as pool:
+            futures = [pool.submit(_expand_file_worker, str(t), args) for t in ordered]
+            for fut in as_completed(futures):
+                name, stats, writer, notes = fut.result()
+                results[name] = (stats, writer, notes)
+
+    total = Stats()
+    total_writes = OutputWriter()
+    failed = 0
+    for t in targets:
+        stats, writer, notes = results[str(t)]
+        total_writes.add(writer)
+        suffix = f" ({'; '.join(notes)})" if notes else ""
+        if stats is None:
+            failed += 1
+            print(f"{t}: failed{suffix}", file=sys.stderr)
+            continue
+        total.add(stats)
+        print(f"{t}: {stats.summary()} {writer.summary()}{suffix}")
+    print(f"total files={len(targets)} failed={failed} {total.summary()} {total_writes.summary()}")
+    return failed
 
-    # Write in-place with a trailing newline, keep 2-space indent to match repo style.
-    target.write_text(json.dumps(out, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
-    print(
-        f"placeholders found={stats.placeholders_found} replaced={stats.placeholders_replaced} removed={stats.placeholders_removed}"
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help="Tag tree JSON (default: 题型知识点标签.json). With --batch: files, directories or glob patterns",
+    )
+    parser.add_argument("--batch", action="store_true", help="Process every matched file in a process pool")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for --batch (default: CPU count)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse, transform and write one top-level node at a time (bounded memory for huge files)",
+    )
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse branches whose content and catalog entries are unchanged since the last run",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="append",
+        default=[],
+        help="Replacement catalog file or directory; repeat to layer overrides (default: scripts/tag_catalogs/)",
+    )
+    parser.add_argument("--cache", default=None, help="Sidecar cache for --incremental (default: .<target>.expand-cache.json)")
+    parser.add_argument("--cache-depth", type=int, default=3, help="Depth of the branches cached by --incremental")
+    parser.add_argument(
+        "--emit-index",
+        default=None,
+        help="Also write a precomputed flat tag index (ids/titles/parents/roots) to this path",
+    )
+    parser.add_argument(
+        "--emit-binary",
+        default=None,
+        help="Also write the tree in the compact interned binary format (see tag_tree_binary.py)",
     )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="PATH",
+        help="Write per-phase wall/CPU time, work counters and peak RSS as JSON to PATH ('-' for stdout)",
+    )
+    parser.add_argument("--cprofile", default=None, metavar="PATH", help="Also dump cProfile stats (pstats format) to PATH")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+
+    if args.batch:
+        if args.emit_index or args.emit_binary or args.cache or args.profile or args.cprofile:
+            parser.error(
+                "--emit-index, --emit-binary, --cache, --profile and --cprofile take a single target "
+                "and cannot be used with --batch"
+            )
+        targets = collect_targets(args.targets or [str(root / "题型*.json")])
+        if not targets:
+            print("No files matched", file=sys.stderr)
+            return 2
+        return 1 if run_batch(targets, args) else 0
+
+    if len(args.targets) > 1:
+        parser.error("pass --batch to process more than one target")
+    target = Path(args.targets[0]) if args.targets else (root / "题型知识点标签.json")
+    target = target.resolve()
+
+    # With `--profile -` stdout carries the profile JSON only; report lines go to stderr.
+    stdout = sys.stdout
+    log = sys.stderr if args.profile == "-" else stdout
+    writer = OutputWriter()
+    try:
+        with contextlib.redirect_stdout(log):
+            if args.profile or args.cprofile:
+                stats, notes = profile_file(target, args, writer, stdout)
+            else:
+                stats, notes = expand_file(target, args, writer=writer)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    for line in notes:
+        print(line, file=log)
+    if notes and notes[0].startswith("unchanged"):
+        return 0
+    print(stats.summary(), file=log)
+    print(writer.summary(), file=log)
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
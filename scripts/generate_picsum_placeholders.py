@@ -7,15 +7,28 @@ needs some "random" images for option/stem image URLs.
 
 If you have network access, you can later replace these with real photos by
 running `scripts/download_picsum_images.py`.
+
+Each image's seed is derived from (--seed, prefix, index), so a file's pixels do not depend
+on render order and the output is identical for any --workers count. For load-test
+fixtures, --plan takes a larger set, e.g. `--plan opt:2000:512x512,stem:500:1280x720`.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import io
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFilter, ImageOps
 
-from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageOps
+from atomic_output import OutputWriter
+from image_derivatives import build_derivatives, summarize
+from picsum_plan import DEFAULT_PLAN, parse_plan
 
 
 def _rand_color(rnd: random.Random, lo: int = 30, hi: int = 225) -> tuple[int, int, int]:
@@ -30,12 +43,29 @@ def _make_base(w: int, h: int, rnd: random.Random) -> Image.Image:
     return base
 
 
-def _draw_shapes(img: Image.Image, rnd: random.Random) -> Image.Image:
-    w, h = img.size
-    layer = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(layer)
+def _noise(size: tuple[int, int], sigma: float, rnd: random.Random) -> Image.Image:
+    """Grey noise around 128 with roughly `sigma` spread, drawn from `rnd`.
+
+    Stands in for `Image.effect_noise`, which uses the C library RNG and so gives different
+    pixels on every run and in every worker process. The mean of two uniform bytes is close
+    enough to Gaussian at 8% opacity.
+    """
+    n = size[0] * size[1]
+    a = Image.frombytes("L", size, rnd.randbytes(n))
+    b = Image.frombytes("L", size, rnd.randbytes(n))
+    tri = ImageChops.add(a, b, scale=2.0)
+    # The triangular distribution on 0..255 has a standard deviation of 255 / sqrt(24) ~ 52.
+    k = sigma / 52.0
+    return tri.point([max(0, min(255, round(128 + (v - 127.5) * k))) for v in range(256)])
 
+
+# (shape, [x1, y1, x2, y2], (r, g, b, a))
+Shape = Tuple[str, List[int], Tuple[int, int, int, int]]
+
+
+def _shape_plan(w: int, h: int, rnd: random.Random) -> List[Shape]:
     # Random translucent circles/rectangles to make it feel less synthetic.
+    shapes: List[Shape] = []
     for _ in range(rnd.randint(6, 14)):
         shape = rnd.choice(["circle", "rect"])
         x1 = rnd.randint(-w // 6, w)
@@ -45,15 +75,23 @@ def _draw_shapes(img: Image.Image, rnd: random.Random) -> Image.Image:
 
         color = _rand_color(rnd, 0, 255)
         alpha = rnd.randint(30, 90)
-        fill = (*color, alpha)
+        shapes.append((shape, [x1, y1, x2, y2], (*color, alpha)))
+    return shapes
 
+
+def _draw_shapes(img: Image.Image, rnd: random.Random) -> Image.Image:
+    w, h = img.size
+    layer = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+
+    for shape, box, fill in _shape_plan(w, h, rnd):
         if shape == "circle":
-            draw.ellipse([x1, y1, x2, y2], fill=fill)
+            draw.ellipse(box, fill=fill)
         else:
-            draw.rectangle([x1, y1, x2, y2], fill=fill)
+            draw.rectangle(box, fill=fill)
 
     # Add subtle noise.
-    noise = Image.effect_noise((w, h), rnd.uniform(6, 14)).convert("L")
+    noise = _noise((w, h), rnd.uniform(6, 14), rnd)
     noise_rgba = Image.merge("RGBA", (noise, noise, noise, noise.point(lambda v: int(v * 0.08))))
     layer = Image.alpha_composite(layer, noise_rgba)
 
@@ -74,37 +112,207 @@ def make_image(w: int, h: int, seed: int) -> Image.Image:
     return img.convert("RGB")
 
 
+def _blur_axis(src, dst, sigma: float, axis: int, tile: int = 64) -> None:
+    """Separable Gaussian along axis 1 (rows) or 2 (columns) of a (3, h, w) frame, edges clamped.
+
+    Each run of `tile` output pixels is one small matrix product with a banded kernel matrix,
+    which BLAS does far faster than summing 2 * radius + 1 shifted copies of the frame.
+    """
+    import numpy as np
+
+    radius = max(1, int(sigma * 3 + 0.999))
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    taps = (taps / taps.sum()).astype(np.float32)
+    band = np.zeros((tile + 2 * radius, tile), dtype=np.float32)
+    for j in range(tile):
+        band[j : j + 2 * radius + 1, j] = taps
+
+    n = src.shape[axis]
+    pad = [(0, 0)] * 3
+    pad[axis] = (radius, radius)
+    padded = np.pad(src, pad, mode="edge")
+    for start in range(0, n, tile):
+        t = min(tile, n - start)
+        k = band[: t + 2 * radius, :t]
+        if axis == 2:
+            np.matmul(padded[:, :, start : start + t + 2 * radius], k, out=dst[:, :, start : start + t])
+        else:
+            np.matmul(k.T, padded[:, start : start + t + 2 * radius], out=dst[:, start : start + t])
+
+
+def make_image_numpy(w: int, h: int, seed: int) -> Image.Image:
+    """NumPy renderer for `make_image()`: same random draws, same look, in float32 arrays.
+
+    Works on one planar (3, h, w) frame so per-pixel broadcasts run over whole rows. The base
+    is opaque, so only RGB is tracked: the vertical gradient is one color per row, shapes are
+    painted into a layer over their bounding boxes only, and the two alpha composites fold
+    into one `base * (1 - A) + C` pass. Blur, contrast and color then work in place. Output
+    differs from the PIL path by rounding (PIL quantizes to 8 bits after every step), by the
+    exact Gaussian versus PIL's box approximation, and by a pixel at shape edges: about 1.5
+    levels on average, ~44 dB PSNR (see bench_picsum_render.py).
+    """
+    import numpy as np
+
+    rnd = random.Random(seed)
+    c1 = np.array(_rand_color(rnd), dtype=np.float32)
+    c2 = np.array(_rand_color(rnd), dtype=np.float32)
+    # Image.linear_gradient("L") resized to h rows is a ramp over 0..255, sampled at row centers.
+    g = np.clip((np.arange(h, dtype=np.float32) + 0.5) * (256.0 / h) - 0.5, 0, 255) / 255.0
+    rows = c1[:, None] + (c2 - c1)[:, None] * g[None, :]  # (3, h)
+
+    # Shapes overwrite each other in the layer (ImageDraw does not blend), so paint in order.
+    img = np.zeros((3, h, w), dtype=np.float32)
+    layer_a = np.zeros((h, w), dtype=np.float32)
+    for shape, (x1, y1, x2, y2), fill in _shape_plan(w, h, rnd):
+        bx1, by1, bx2, by2 = max(x1, 0), max(y1, 0), min(x2, w - 1), min(y2, h - 1)
+        if bx1 > bx2 or by1 > by2:
+            continue
+        ys, xs = slice(by1, by2 + 1), slice(bx1, bx2 + 1)
+        if shape == "circle":
+            cx, cy = (x1 + x2) / 2.0, (y1 + y2) / 2.0
+            rx, ry = (x2 - x1 + 1) / 2.0, (y2 - y1 + 1) / 2.0
+            dy = ((np.arange(by1, by2 + 1, dtype=np.float32) - cy) / ry) ** 2
+            dx = ((np.arange(bx1, bx2 + 1, dtype=np.float32) - cx) / rx) ** 2
+            mask = (dy[:, None] + dx[None, :]) <= 1.0
+            for c in range(3):
+                np.copyto(img[c, ys, xs], fill[c], where=mask)
+            np.copyto(layer_a[ys, xs], fill[3] / 255.0, where=mask)
+        else:
+            for c in range(3):
+                img[c, ys, xs] = fill[c]
+            layer_a[ys, xs] = fill[3] / 255.0
+
+    # Same draws as `_noise()` through the same lookup table, so the grain matches exactly.
+    # Only the noise alpha and the premultiplied noise are needed, each one table lookup.
+    sigma = rnd.uniform(6, 14)
+    idx = np.frombuffer(rnd.randbytes(w * h), dtype=np.uint8).astype(np.uint16)
+    idx += np.frombuffer(rnd.randbytes(w * h), dtype=np.uint8)
+    # Indexed by the sum of the two bytes; ImageChops.add(scale=2) halves it (rounding down).
+    lut = np.clip(np.rint(128 + (np.arange(511) // 2 - 127.5) * (sigma / 52.0)), 0, 255)
+    lut_a = np.floor(lut * 0.08) / 255.0
+    noise_a = np.take(lut_a.astype(np.float32), idx).reshape(h, w)
+    noise_premul = np.take((lut * lut_a).astype(np.float32), idx).reshape(h, w)
+
+    # noise over layer, then that over the base: out = base * (1 - A) + C.
+    base_weight = np.subtract(1.0, layer_a)
+    np.subtract(1.0, noise_a, out=noise_a)  # now the share the noise leaves to what is below
+    layer_a *= noise_a
+    base_weight *= noise_a
+    img *= layer_a
+    img += noise_premul
+    for c in range(3):
+        img[c] += np.multiply(base_weight, rows[c][:, None], out=noise_premul)
+
+    radius = rnd.uniform(0.6, 1.8)
+    tmp = np.empty_like(img)
+    _blur_axis(img, tmp, radius, axis=1)
+    _blur_axis(tmp, img, radius, axis=2)
+
+    # ImageEnhance.Contrast blends with the mean luma m, ImageEnhance.Color with the luma L.
+    # Both are affine, so they fold into one pass: out = f*c*x + (1 - f)*c*L + (1 - c)*m
+    # (PIL clips to 0..255 in between; this path clips once).
+    luma = np.multiply(img[0], 0.299, out=layer_a)
+    luma += np.multiply(img[1], 0.587, out=base_weight)
+    luma += np.multiply(img[2], 0.114, out=base_weight)
+    mean = float(int(luma.mean() + 0.5))
+    contrast = rnd.uniform(1.05, 1.22)
+    color = rnd.uniform(1.05, 1.25)
+    luma *= (1.0 - color) * contrast
+    luma += (1.0 - contrast) * mean
+    img *= color * contrast
+    img += luma
+    np.clip(img, 0, 255, out=img)
+    np.rint(img, out=img)
+    planes = img.astype(np.uint8)
+    return Image.merge("RGB", [Image.fromarray(plane, "L") for plane in planes])
+
+
+RENDERERS = {"pil": make_image, "numpy": make_image_numpy}
+
+
+# (path, width, height, seed, renderer)
+Task = Tuple[str, int, int, int, str]
+
+
+def file_seed(seed: int, prefix: str, index: int) -> int:
+    """Seed for one file, from the global seed and the file's identity only."""
+    digest = hashlib.blake2b(f"{seed}:{prefix}:{index}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & (2**31 - 1)
+
+
+def render_file(task: Task) -> OutputWriter:
+    path, w, h, seed, renderer = task
+    img = RENDERERS[renderer](w, h, seed=seed)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=88, optimize=True, progressive=True)
+    # Identical output is not rewritten, so re-running does not touch mtimes.
+    writer = OutputWriter()
+    writer.write_bytes(path, buf.getvalue())
+    return writer
+
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--out", default="static/picsum", help="Output directory")
     parser.add_argument("--seed", type=int, default=20260210, help="Random seed")
+    parser.add_argument("--plan", default=DEFAULT_PLAN, help="Comma-separated prefix:count:WxH groups")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--renderer",
+        choices=sorted(RENDERERS),
+        default="pil",
+        help="Image renderer; numpy is faster for large images and needs NumPy installed",
+    )
+    parser.add_argument(
+        "--derivatives",
+        action="store_true",
+        help="Also refresh the resized/WebP derivatives and their manifest (see image_derivatives.py)",
+    )
     args = parser.parse_args()
 
+    if args.renderer == "numpy":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            parser.error("--renderer numpy needs NumPy (pip install numpy)")
+
+    try:
+        plan = parse_plan(args.plan)
+    except ValueError as exc:
+        parser.error(str(exc))
+
     root = Path(__file__).resolve().parents[1]
     out_dir = (root / args.out).resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rnd = random.Random(args.seed)
+    tasks: List[Task] = []
+    for prefix, count, w, h in plan:
+        width = max(2, len(str(count)))
+        for i in range(1, count + 1):
+            path = out_dir / f"{prefix}-{i:0{width}d}.jpg"
+            tasks.append((str(path), w, h, file_seed(args.seed, prefix, i), args.renderer))
 
-    # Files match the naming convention used by `download_picsum_images.py`,
-    # so you can overwrite them later.
-    plan = []
-    plan += [("opt", 12, 512, 512)]
-    plan += [("stem", 6, 1280, 720)]
-    plan += [("tall", 4, 720, 1280)]
+    workers = min(args.workers or os.cpu_count() or 1, len(tasks)) or 1
+    if workers == 1:
+        results = [render_file(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Results come back in task order; small chunks keep big and small images balanced.
+            results = list(pool.map(render_file, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
 
+    writer = OutputWriter()
     written = []
-    for prefix, count, w, h in plan:
-        for i in range(1, count + 1):
-            name = f"{prefix}-{i:02d}.jpg"
-            path = out_dir / name
-            img = make_image(w, h, seed=rnd.randint(0, 2**31 - 1))
-            img.save(path, format="JPEG", quality=88, optimize=True, progressive=True)
-            written.append(str(path.relative_to(root)))
+    for (path, *_), result in zip(tasks, results):
+        writer.add(result)
+        if result.written:
+            written.append(str(Path(path).relative_to(root)))
 
-    print("generated:")
+    print(f"generated: {writer.summary()} workers={workers}")
     for p in written:
         print(" -", p)
+
+    if args.derivatives:
+        print(summarize(*build_derivatives(out_dir, workers=args.workers)))
     return 0
 
 
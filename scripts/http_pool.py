@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Small keep-alive HTTP client for the download scripts.
+
+`urllib.request.urlopen` opens (and TLS-handshakes) a new connection for every request.
+`ConnectionPool` keeps idle `http.client` connections per host and hands them back out, so a
+batch of downloads from one CDN runs over a few persistent connections. It is thread-safe:
+each request checks a connection out, so at most one request uses it at a time, and returns
+it once the body has been read.
+
+    pool = ConnectionPool(max_idle_per_host=8)
+    resp = pool.request("GET", "https://picsum.photos/seed/a/512/512")   # follows redirects
+    resp.status, resp.headers["Content-Type"], resp.body
+    pool.stats()     # {"requests": 1, "connections": 2, "reused": 0}
+
+    with pool.stream("GET", url, {"Range": "bytes=1000-"}) as resp:   # body read in chunks
+        for chunk in resp.iter_chunks():
+            fp.write(chunk)
+    pool.close()
+
+Redirects are followed (up to `max_redirects`). A request on a reused connection that the
+server has meanwhile closed is retried once on a fresh connection.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import http.client
+import threading
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = "TestPaperEditor/1.0 (+https://picsum.photos/)"
+REDIRECTS = (301, 302, 303, 307, 308)
+
+HostKey = Tuple[str, str, int]
+
+
+class Response(NamedTuple):
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+    url: str  # final URL, after redirects
+
+
+class StreamResponse:
+    """A response whose body has not been read yet; valid inside ConnectionPool.stream()."""
+
+    def __init__(self, resp: http.client.HTTPResponse, url: str) -> None:
+        self._resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+        self.url = url  # final URL, after redirects
+
+    def read(self) -> bytes:
+        return self._resp.read()
+
+    def iter_chunks(self, size: int = 1 << 16) -> Iterator[bytes]:
+        while True:
+            chunk = self._resp.read(size)
+            if not chunk:
+                break
+            yield chunk
+        # read(amt) returns short at EOF instead of raising like read() does.
+        if self._resp.length:
+            raise http.client.IncompleteRead(b"", self._resp.length)
+
+
+class ConnectionPool:
+    def __init__(self, max_idle_per_host: int = 8, timeout: float = 30.0, max_redirects: int = 5) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._idle: Dict[HostKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "connections": 0, "reused": 0}
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _checkout(self, key: HostKey) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            conns = self._idle.get(key)
+            if conns:
+                self._counts["reused"] += 1
+                return conns.pop(), True
+            self._counts["connections"] += 1
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _checkin(self, key: HostKey, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def _open(
+        self, method: str, url: str, headers: Mapping[str, str]
+    ) -> Tuple[HostKey, http.client.HTTPConnection, http.client.HTTPResponse]:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL {url!r}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        hdrs = {"User-Agent": USER_AGENT, **headers}
+        while True:
+            conn, reused = self._checkout(key)
+            try:
+                conn.request(method, path, headers=hdrs)
+                return key, conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    # The server dropped an idle keep-alive connection; try a fresh one.
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+    def _release(self, key: HostKey, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+        # Only a connection whose response was read to the end can carry the next request.
+        if not resp.isclosed() and resp.length == 0:
+            resp.read()  # 304/204/HEAD: nothing to drain, but marks the response done
+        if resp.isclosed() and not resp.will_close:
+            self._checkin(key, conn)
+        else:
+            conn.close()
+
+    @contextlib.contextmanager
+    def stream(self, method: str, url: str, headers: Optional[Mapping[str, str]] = None) -> Iterator[StreamResponse]:
+        """Like request(), but the body is read by the caller, in chunks, inside the block."""
+        with self._lock:
+            self._counts["requests"] += 1
+        for _ in range(self.max_redirects + 1):
+            key, conn, resp = self._open(method, url, headers or {})
+            location = resp.headers.get("Location")
+            if resp.status in REDIRECTS and location:
+                try:
+                    resp.read()
+                finally:
+                    self._release(key, conn, resp)
+                url = urljoin(url, location)
+                if resp.status == 303:
+                    method = "GET"
+                continue
+            try:
+                yield StreamResponse(resp, url)
+            finally:
+                self._release(key, conn, resp)
+            return
+        raise http.client.HTTPException(f"too many redirects, last: {url}")
+
+    def request(self, method: str, url: str, headers: Optional[Mapping[str, str]] = None) -> Response:
+        with self.stream(method, url, headers) as resp:
+            body = resp.read()
+        return Response(resp.status, resp.headers, body, resp.url)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Pack option images into sprite sheets (atlases) plus a JSON coordinate map for the front end.
+
+Listening-choice questions show many small option images; one sheet per group turns a dozen
+requests into one. Packing is MaxRects with the best-short-side-fit rule: each sprite goes
+into the free rectangle that leaves the least slack on its shorter side; free space is kept as
+maximal (possibly overlapping) rectangles and pruned of rectangles contained in others. Sprites
+are placed largest first and never rotated (CSS backgrounds cannot rotate). When a sheet is
+full a new one is opened; each sheet is cropped to its used extent.
+
+    python3 scripts/image_atlas.py "static/picsum/opt-*.jpg" --max-side 256 --out static/atlas
+
+writes `static/atlas/options-0.jpg`, ... and `static/atlas/options.json`:
+
+    {"version": 1, "padding": 2,
+     "sheets": [{"file": "options-0.jpg", "width": 1042, "height": 780}],
+     "sprites": {"opt-01.jpg": {"sheet": 0, "x": 0, "y": 0, "width": 256, "height": 256}}}
+
+`--bench N` packs N random rectangles (no image I/O) and reports density and time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from atomic_output import OutputWriter
+
+# (left, top, right, bottom), right/bottom exclusive
+Rect = Tuple[int, int, int, int]
+
+
+class MaxRectsSheet:
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.free: List[Rect] = [(0, 0, width, height)]
+        self.max_free = (width, height)  # widest and tallest free rectangle (not necessarily one)
+        self.used_area = 0
+        self.extent = (0, 0)  # right and bottom edge of everything placed so far
+
+    def find(self, w: int, h: int) -> Optional[Tuple[int, int, Rect]]:
+        """Best-short-side-fit free rectangle for a w x h sprite, as (short, long, rect)."""
+        if w > self.max_free[0] or h > self.max_free[1]:
+            return None
+        best: Optional[Tuple[int, int, Rect]] = None
+        for fr in self.free:
+            dx, dy = fr[2] - fr[0] - w, fr[3] - fr[1] - h
+            if dx >= 0 and dy >= 0:
+                score = (dx, dy) if dx < dy else (dy, dx)
+                if best is None or score < best[:2]:
+                    best = (score[0], score[1], fr)
+                    if score[0] == 0 and score[1] == 0:
+                        break
+        return best
+
+    def place(self, x: int, y: int, w: int, h: int) -> None:
+        x2, y2 = x + w, y + h
+        hit = [fr for fr in self.free if fr[0] < x2 and x < fr[2] and fr[1] < y2 and y < fr[3]]
+        kept = [fr for fr in self.free if not (fr[0] < x2 and x < fr[2] and fr[1] < y2 and y < fr[3])]
+        added: List[Rect] = []
+        for fx, fy, fx2, fy2 in hit:
+            # Split into up to four maximal rectangles around the placed sprite.
+            if x > fx:
+                added.append((fx, fy, x, fy2))
+            if x2 < fx2:
+                added.append((x2, fy, fx2, fy2))
+            if y > fy:
+                added.append((fx, fy, fx2, y))
+            if y2 < fy2:
+                added.append((fx, y2, fx2, fy2))
+        # Only split-off rectangles can be redundant: each lies inside the rectangle it came
+        # from, so an old rectangle inside a new one would already have been pruned.
+        for i, a in enumerate(added):
+            ax, ay, ax2, ay2 = a
+            for j, b in enumerate(added):
+                # Identical rectangles: only the first copy survives.
+                if j != i and b[0] <= ax and b[1] <= ay and ax2 <= b[2] and ay2 <= b[3] and (a != b or j < i):
+                    break
+            else:
+                for b in kept:
+                    if b[0] <= ax and b[1] <= ay and ax2 <= b[2] and ay2 <= b[3]:
+                        break
+                else:
+                    kept.append(a)
+        self.free = kept
+        # Split-offs are never larger than their parents, so the maxima only need recomputing
+        # when a widest or tallest rectangle was consumed.
+        mw, mh = self.max_free
+        if any(fr[2] - fr[0] >= mw or fr[3] - fr[1] >= mh for fr in hit):
+            self.max_free = (max(fr[2] - fr[0] for fr in kept), max(fr[3] - fr[1] for fr in kept)) if kept else (0, 0)
+        self.used_area += w * h
+        self.extent = (max(self.extent[0], x2), max(self.extent[1], y2))
+
+
+REPACK_BELOW = 0.6  # fill ratio under which the last sheet is repacked smaller
+
+
+def _fill(sizes: Sequence[Tuple[int, int]], order: Sequence[int], width: int, height: int):
+    """Place `order` into one width x height sheet; None if they do not all fit."""
+    sheet = MaxRectsSheet(width, height)
+    spots: Dict[int, Tuple[int, int]] = {}
+    for i in order:
+        found = sheet.find(*sizes[i])
+        if found is None:
+            return None
+        sheet.place(found[2][0], found[2][1], *sizes[i])
+        spots[i] = (found[2][0], found[2][1])
+    return sheet, spots
+
+
+def pack(
+    sizes: Sequence[Tuple[int, int]], sheet_size: int, padding: int = 0
+) -> Tuple[List[Tuple[int, int, int]], List[MaxRectsSheet]]:
+    """Place sprites of the given sizes; returns (sheet, x, y) per sprite in input order."""
+    # Padding goes right/bottom of each sprite; the sheet gets the same margin top/left.
+    padded = [(w + padding, h + padding) for w, h in sizes]
+    side = sheet_size - padding
+    for i, (w, h) in enumerate(padded):
+        if w > side or h > side:
+            raise ValueError(f"sprite {i} ({sizes[i][0]}x{sizes[i][1]}) does not fit a {sheet_size}px sheet")
+    order = sorted(range(len(sizes)), key=lambda i: (max(padded[i]), padded[i][0] * padded[i][1]), reverse=True)
+
+    sheets: List[MaxRectsSheet] = []
+    members: List[List[int]] = []
+    spots: Dict[int, Tuple[int, int]] = {}
+    for i in order:
+        for s, sheet in enumerate(sheets):
+            found = sheet.find(*padded[i])
+            if found is not None:
+                break
+        else:
+            sheet = MaxRectsSheet(side, side)
+            sheets.append(sheet)
+            members.append([])
+            s, found = len(sheets) - 1, sheet.find(*padded[i])
+        assert found is not None
+        sheet.place(found[2][0], found[2][1], *padded[i])
+        members[s].append(i)
+        spots[i] = (found[2][0], found[2][1])
+
+    # A part-empty last sheet gets spread out by best-short-side-fit; repack it into the
+    # smallest square that still holds all of its sprites.
+    if sheets and sheets[-1].used_area < REPACK_BELOW * side * side:
+        last = members[-1]
+        lo = max(max(max(padded[i]) for i in last), int(sum(padded[i][0] * padded[i][1] for i in last) ** 0.5))
+        hi = side
+        best = None
+        while lo < hi:
+            mid = (lo + hi) // 2
+            attempt = _fill(padded, last, mid, mid)
+            if attempt is None:
+                lo = mid + 1
+            else:
+                best, hi = attempt, mid
+        if best is None:
+            best = _fill(padded, last, lo, lo)
+        if best is not None and best[0].extent[0] * best[0].extent[1] < sheets[-1].extent[0] * sheets[-1].extent[1]:
+            sheets[-1] = best[0]
+            spots.update(best[1])
+
+    sheet_of = {i: s for s, group in enumerate(members) for i in group}
+    placements = [(sheet_of[i], spots[i][0] + padding, spots[i][1] + padding) for i in range(len(sizes))]
+    return placements, sheets
+
+
+def build_atlas(
+    files: Sequence[Path],
+    out_dir: Path,
+    name: str,
+    sheet_size: int,
+    padding: int,
+    max_side: Optional[int],
+    fmt: str,
+    writer: OutputWriter,
+) -> Dict[str, Any]:
+    from PIL import Image
+
+    images = []
+    for f in files:
+        with Image.open(f) as opened:
+            img = opened.convert("RGBA" if fmt == "png" else "RGB")
+        if max_side and max(img.size) > max_side:
+            scale = max_side / max(img.size)
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.Resampling.LANCZOS)
+        images.append(img)
+
+    placements, sheets = pack([img.size for img in images], sheet_size, padding)
+    ext = "jpg" if fmt == "jpeg" else fmt
+    canvases = [
+        Image.new("RGBA" if fmt == "png" else "RGB", (sh.extent[0] + padding, sh.extent[1] + padding), (0, 0, 0, 0) if fmt == "png" else (255, 255, 255))
+        for sh in sheets
+    ]
+    sprites: Dict[str, Any] = {}
+    for f, img, (s, x, y) in zip(files, images, placements):
+        canvases[s].paste(img, (x, y))
+        sprites[f.name] = {"sheet": s, "x": x, "y": y, "width": img.width, "height": img.height}
+
+    sheet_info = []
+    for s, canvas in enumerate(canvases):
+        buf = io.BytesIO()
+        if fmt == "png":
+            canvas.save(buf, format="PNG", optimize=True)
+        elif fmt == "webp":
+            canvas.save(buf, format="WEBP", quality=82, method=6)
+        else:
+            canvas.save(buf, format="JPEG", quality=85, optimize=True, progressive=True)
+        file = f"{name}-{s}.{ext}"
+        writer.write_bytes(out_dir / file, buf.getvalue())
+        sheet_info.append({"file": file, "width": canvas.width, "height": canvas.height, "bytes": len(buf.getvalue())})
+
+    return {"version": 1, "padding": padding, "sheets": sheet_info, "sprites": sprites}
+
+
+def bench(count: int, sheet_size: int, padding: int, seed: int, lo: int, hi: int) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    sizes = [(rnd.randint(lo, hi), rnd.randint(lo, hi)) for _ in range(count)]
+    t0 = time.perf_counter()
+    _, sheets = pack(sizes, sheet_size, padding)
+    elapsed = time.perf_counter() - t0
+    sprite_area = sum(w * h for w, h in sizes)
+    sheet_area = sum((sh.extent[0] + padding) * (sh.extent[1] + padding) for sh in sheets)
+    return {
+        "sprites": count,
+        "sprite_size": f"{lo}..{hi}",
+        "sheet_size": sheet_size,
+        "sheets": len(sheets),
+        "density": round(sprite_area / sheet_area, 4),
+        "pack_ms": round(elapsed * 1000, 1),
+        "us_per_sprite": round(elapsed / count * 1e6, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="*", help="Image files or glob patterns (default: static/picsum/opt-*.jpg)")
+    parser.add_argument("--out", default="static/atlas", help="Output directory for sheets and the map")
+    parser.add_argument("--name", default="options", help="Base name of the sheets and the JSON map")
+    parser.add_argument("--sheet-size", type=int, default=2048, help="Maximum sheet width and height")
+    parser.add_argument("--padding", type=int, default=2, help="Pixels between sprites (avoids filtering bleed)")
+    parser.add_argument("--max-side", type=int, default=None, help="Downscale sprites so their longer side fits")
+    parser.add_argument("--format", choices=("jpeg", "png", "webp"), default="jpeg", help="Sheet image format")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="Pack N random rectangles and report density/time")
+    parser.add_argument("--bench-sizes", default="32,256", help="Min,max sprite side for --bench")
+    parser.add_argument("--seed", type=int, default=20260210, help="Seed for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        lo, hi = (int(v) for v in args.bench_sizes.split(","))
+        print(json.dumps(bench(args.bench, args.sheet_size, args.padding, args.seed, lo, hi)))
+        return 0
+
+    root = Path(__file__).resolve().parents[1]
+    patterns = args.inputs or [str(root / "static/picsum/opt-*.jpg")]
+    files: Dict[Path, None] = {}
+    for pattern in patterns:
+        for m in sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]:
+            files.setdefault(Path(m).resolve(), None)
+    if not files:
+        print("No images matched", file=sys.stderr)
+        return 2
+    names = [f.name for f in files]
+    if len(set(names)) != len(names):
+        print("Sprite names must be unique (the map is keyed by file name)", file=sys.stderr)
+        return 2
+
+    out_dir = (root / args.out).resolve()
+    writer = OutputWriter()
+    t0 = time.perf_counter()
+    try:
+        atlas = build_atlas(list(files), out_dir, args.name, args.sheet_size, args.padding, args.max_side, args.format, writer)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    writer.write_text(out_dir / f"{args.name}.json", json.dumps(atlas, ensure_ascii=False, indent=2) + "\n")
+    print(
+        f"atlas sprites={len(atlas['sprites'])} sheets={len(atlas['sheets'])} "
+        f"bytes={sum(s['bytes'] for s in atlas['sheets'])} in {(time.perf_counter() - t0) * 1000:.0f}ms {writer.summary()}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate images under `static/` (re-downloaded picsum photos, re-encoded uploads)
+with perceptual hashes.
+
+Every image gets three 64-bit hashes, computed for a whole batch at once with NumPy:
+
+    ahash  8x8 block means of a 32x32 grayscale thumbnail, thresholded at their mean
+    dhash  sign of the horizontal gradient of a 9x8 thumbnail
+    phash  low 8x8 DCT coefficients of the 32x32 thumbnail, thresholded at their median
+
+Two images are near-duplicates when their phash differs in at most --threshold bits and their
+dhash in at most --threshold bits too. Candidates come from multi-index hashing: the phash is
+cut into threshold//2+1 chunks, and by pigeonhole any pair within the threshold differs in at
+most one bit on at least one chunk, so only images whose chunk values are equal or one bit
+apart are compared. Candidates are expanded and checked with vectorized popcounts, never all
+n^2 pairs.
+
+Hashes are kept in an index (default `.image-hashes.json`, not committed) and reused while a
+file's mtime and size are unchanged; new files are hashed across cores.
+
+    python3 scripts/image_dedup.py                          # index static/, print groups
+    python3 scripts/image_dedup.py --threshold 6 --report dupes.json
+    python3 scripts/image_dedup.py --bench 100000           # matching only, synthetic hashes
+
+Needs NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from atomic_output import OutputWriter
+from image_index import Task, scan
+
+INDEX_VERSION = 1
+HASHES = ("ahash", "dhash", "phash")
+DEFAULT_THRESHOLD = 8
+BATCH = 64
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m.astype(np.float32)
+
+
+_DCT32 = _dct_matrix(32)
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        b = x[..., None].view(np.uint8)
+        return _POP8[b].sum(axis=-1, dtype=np.uint8)
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(n, 64) bools -> (n,) uint64, first bit most significant."""
+    return np.packbits(bits, axis=-1).view(">u8")[:, 0].astype(np.uint64)
+
+
+def hash_arrays(small: np.ndarray, grad: np.ndarray) -> Dict[str, np.ndarray]:
+    """small: (n, 32, 32) and grad: (n, 8, 9) float32 grayscale -> uint64 hashes per kind."""
+    n = small.shape[0]
+    blocks = small.reshape(n, 8, 4, 8, 4).mean(axis=(2, 4)).reshape(n, 64)
+    ahash = _pack(blocks > blocks.mean(axis=1, keepdims=True))
+    dhash = _pack((grad[:, :, 1:] > grad[:, :, :-1]).reshape(n, 64))
+    low = (_DCT32 @ small @ _DCT32.T)[:, :8, :8].reshape(n, 64)
+    phash = _pack(low > np.median(low, axis=1, keepdims=True))
+    return {"ahash": ahash, "dhash": dhash, "phash": phash}
+
+
+def _thumbs(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    with Image.open(path) as opened:
+        opened.draft("L", (64, 64))
+        img = opened.convert("L")
+    small = np.asarray(img.resize((32, 32), Image.Resampling.BOX), dtype=np.float32)
+    grad = np.asarray(img.resize((9, 8), Image.Resampling.BOX), dtype=np.float32)
+    return small, grad
+
+
+def hash_batch(tasks: List[Task]) -> List[Tuple[str, Optional[Dict[str, Any]], str]]:
+    """Decode a batch of images and hash them together. Returns (url, entry, error) per task."""
+    ok: List[Tuple[Task, np.ndarray, np.ndarray]] = []
+    out: List[Tuple[str, Optional[Dict[str, Any]], str]] = []
+    for task in tasks:
+        try:
+            small, grad = _thumbs(task[0])
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            out.append((task[1], None, f"{task[0]}: {exc}"))
+            continue
+        ok.append((task, small, grad))
+    if ok:
+        hashes = hash_arrays(np.stack([s for _, s, _ in ok]), np.stack([g for _, _, g in ok]))
+        for i, (task, _, _) in enumerate(ok):
+            _, url, size, mtime_ns = task
+            entry: Dict[str, Any] = {"bytes": size, "mtime_ns": mtime_ns}
+            entry.update({k: f"{int(hashes[k][i]):016x}" for k in HASHES})
+            out.append((url, entry, ""))
+    return out
+
+
+def update_index(root: Path, index_path: Path, workers: int = 0) -> Tuple[Dict[str, Any], Dict[str, int], OutputWriter]:
+    try:
+        old = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old = {}
+    old_images = old.get("images", {}) if isinstance(old, dict) and old.get("version") == INDEX_VERSION else {}
+
+    images: Dict[str, Any] = {}
+    todo: List[Task] = []
+    for task in scan(root):
+        prev = old_images.get(task[1])
+        if isinstance(prev, dict) and prev.get("bytes") == task[2] and prev.get("mtime_ns") == task[3]:
+            images[task[1]] = prev
+        else:
+            todo.append(task)
+
+    errors = 0
+    if todo:
+        batches = [todo[i : i + BATCH] for i in range(0, len(todo), BATCH)]
+        n = min(workers or os.cpu_count() or 1, len(batches))
+        if n == 1:
+            results = [hash_batch(b) for b in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                results = list(pool.map(hash_batch, batches))
+        for url, entry, error in (r for batch in results for r in batch):
+            if entry is None:
+                errors += 1
+                print(f"warning: skipped {error}", file=sys.stderr)
+            else:
+                images[url] = entry
+
+    writer = OutputWriter()
+    index = {"version": INDEX_VERSION, "images": dict(sorted(images.items()))}
+    writer.write_text(index_path, json.dumps(index, indent=1) + "\n")
+    counts = {"images": len(images), "hashed": len(todo) - errors, "errors": errors}
+    return index, counts, writer
+
+
+def _chunks(count: int) -> List[Tuple[int, int]]:
+    """(shift, width) of `count` near-equal chunks covering the 64 bits."""
+    widths = [64 // count + (1 if i < 64 % count else 0) for i in range(count)]
+    out, shift = [], 64
+    for w in widths:
+        shift -= w
+        out.append((shift, w))
+    return out
+
+
+def _cross(order: np.ndarray, s1: np.ndarray, n1: np.ndarray, s2: np.ndarray, n2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Every (a, b) with a from group (s1, n1) and b from group (s2, n2) of `order`, per group pair."""
+    counts = n1 * n2
+    total = int(counts.sum())
+    if not total:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    grp = np.repeat(np.arange(len(counts)), counts)
+    off = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[s1[grp] + off // n2[grp]], order[s2[grp] + off % n2[grp]]
+
+
+def near_pairs(
+    phash: np.ndarray, dhash: np.ndarray, threshold: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """All pairs i < j with phash and dhash distance <= threshold: (i, j, dp, dd)."""
+    if not 0 <= threshold < 32:
+        raise ValueError("threshold must be in 0..31")
+    n = len(phash)
+    # With threshold//2 + 1 chunks, a pair within the threshold differs in at most one bit on
+    # some chunk, so each chunk is probed at its exact value and at every 1-bit neighbour.
+    radius = min(1, threshold)
+    found: List[np.ndarray] = []
+    for shift, width in _chunks(threshold // 2 + 1):
+        key = (phash >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        order = np.argsort(key, kind="stable")
+        keys, starts, sizes = np.unique(key[order], return_index=True, return_counts=True)
+        probes = [np.uint64(0)] + [np.uint64(1 << b) for b in range(width)] * radius
+        for flip in probes:
+            if flip:
+                # Only probe upwards (bit clear -> set) so each pair of buckets is visited once.
+                src = np.flatnonzero((keys & flip) == 0)
+                pos = np.searchsorted(keys, keys[src] ^ flip)
+                hit = pos < len(keys)
+                hit[hit] = keys[pos[hit]] == (keys[src[hit]] ^ flip)
+                src, dst = src[hit], pos[hit]
+            else:
+                src = dst = np.flatnonzero(sizes > 1)
+            a, b = _cross(order, starts[src], sizes[src], starts[dst], sizes[dst])
+            if not flip:
+                a, b = a[a < b], b[a < b]
+            close = _popcount(phash[a] ^ phash[b]) <= threshold
+            lo, hi = np.minimum(a[close], b[close]), np.maximum(a[close], b[close])
+            found.append(lo.astype(np.int64) * n + hi)
+    # A pair close on several chunks is found several times.
+    codes = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+    i, j = codes // n, codes % n
+    dp = _popcount(phash[i] ^ phash[j]).astype(np.int64)
+    dd = _popcount(dhash[i] ^ dhash[j]).astype(np.int64)
+    keep = dd <= threshold
+    return i[keep], j[keep], dp[keep], dd[keep]
+
+
+def group_pairs(n: int, i: np.ndarray, j: np.ndarray) -> List[List[int]]:
+    """Connected components of the pair graph, singletons dropped."""
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    groups: Dict[int, List[int]] = {}
+    for x in sorted(set(i.tolist()) | set(j.tolist())):
+        groups.setdefault(find(x), []).append(x)
+    return list(groups.values())
+
+
+def find_duplicates(images: Dict[str, Any], threshold: int) -> Dict[str, Any]:
+    urls = list(images)
+    phash = np.array([int(images[u]["phash"], 16) for u in urls], dtype=np.uint64)
+    dhash = np.array([int(images[u]["dhash"], 16) for u in urls], dtype=np.uint64)
+    i, j, dp, dd = near_pairs(phash, dhash, threshold)
+    pairs = [
+        {"a": urls[a], "b": urls[b], "phash": int(p), "dhash": int(d)}
+        for a, b, p, d in zip(i.tolist(), j.tolist(), dp.tolist(), dd.tolist())
+    ]
+    groups = []
+    for members in group_pairs(len(urls), i, j):
+        # Keep the largest file as the likely original; the rest are candidates for removal.
+        names = sorted((urls[m] for m in members), key=lambda u: (-images[u]["bytes"], u))
+        groups.append({"keep": names[0], "duplicates": names[1:], "bytes": sum(images[u]["bytes"] for u in names[1:])})
+    groups.sort(key=lambda g: (-g["bytes"], g["keep"]))
+    return {"threshold": threshold, "groups": groups, "pairs": pairs}
+
+
+def bench(count: int, threshold: int, seed: int) -> Dict[str, Any]:
+    """Time matching alone on random hashes with one planted near-duplicate per 100 images."""
+    rng = np.random.default_rng(seed)
+    phash = rng.integers(0, 2**64, size=count, dtype=np.uint64)
+    dhash = rng.integers(0, 2**64, size=count, dtype=np.uint64)
+    planted = count // 100
+    src = rng.choice(count - planted, size=planted, replace=False)
+    for k, s in enumerate(src):
+        flips = rng.choice(64, size=rng.integers(0, threshold + 1), replace=False)
+        mask = np.uint64(sum(1 << int(f) for f in flips))
+        phash[count - planted + k] = phash[s] ^ mask
+        dhash[count - planted + k] = dhash[s] ^ mask
+    t0 = time.perf_counter()
+    i, _, _, _ = near_pairs(phash, dhash, threshold)
+    elapsed = time.perf_counter() - t0
+    return {
+        "images": count,
+        "threshold": threshold,
+        "planted": planted,
+        "pairs": len(i),
+        "match_ms": round(elapsed * 1000, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="static", help="Directory to scan (URLs are relative to its parent)")
+    parser.add_argument("--index", default=".image-hashes.json", help="Hash index, reused between runs")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="Max differing bits (phash and dhash)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for hashing (default: CPU count)")
+    parser.add_argument("--report", default=None, help="Write groups and pairs as JSON to this path")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="Time matching on N synthetic hashes and exit")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(bench(args.bench, args.threshold, args.seed)))
+        return 0
+
+    repo = Path(__file__).resolve().parents[1]
+    t0 = time.perf_counter()
+    index, counts, writer = update_index((repo / args.root).resolve(), (repo / args.index).resolve(), args.workers)
+    t1 = time.perf_counter()
+    result = find_duplicates(index["images"], args.threshold)
+    t2 = time.perf_counter()
+
+    for g in result["groups"]:
+        print(f"{g['keep']}")
+        for d in g["duplicates"]:
+            print(f"  = {d}")
+    wasted = sum(g["bytes"] for g in result["groups"])
+    print(
+        f"dedup images={counts['images']} hashed={counts['hashed']} errors={counts['errors']} "
+        f"groups={len(result['groups'])} pairs={len(result['pairs'])} reclaimable_bytes={wasted} "
+        f"hash={(t1 - t0) * 1000:.0f}ms match={(t2 - t1) * 1000:.0f}ms index {writer.summary()}"
+    )
+    if args.report:
+        OutputWriter().write_text(repo / args.report, json.dumps(result, ensure_ascii=False, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Responsive derivatives for the images in `static/picsum/`: smaller widths and WebP versions.
+
+For every source image, each width in --widths that is narrower than the source is written as
+JPEG and WebP, plus a full-width WebP, under `<dir>/_derived/`. Names keep the source's
+suffix, so `foo.jpg` and `foo.png` do not overwrite each other's derivatives:
+
+    static/picsum/opt-01.jpg  ->  _derived/opt-01.jpg.w160.jpg, _derived/opt-01.jpg.w160.webp, ...,
+                                  _derived/opt-01.jpg.webp
+
+`<dir>/derivatives.json` maps each source to its derivatives (paths relative to <dir>):
+
+    {"version": 1, "settings": {...},
+     "sources": {"opt-01.jpg": {"sha256": "...", "width": 512, "height": 512, "bytes": 61234,
+                                "derivatives": [{"path": "_derived/opt-01.jpg.w160.webp",
+                                                 "format": "webp", "width": 160, "height": 160,
+                                                 "bytes": 2310}, ...]}}}
+
+A source is skipped when its sha256 and the settings match the manifest and its derivatives are
+still on disk, so a rerun does nothing. Derivatives of sources that no longer exist are
+removed. The image scripts run this stage with --derivatives.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from atomic_output import OutputWriter, sha256_file
+
+MANIFEST_NAME = "derivatives.json"
+DERIVED_DIR = "_derived"
+MANIFEST_VERSION = 1
+DEFAULT_WIDTHS = (160, 320, 640)
+SOURCE_SUFFIXES = (".jpg", ".jpeg", ".png")
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+
+
+def settings_for(widths: Sequence[int]) -> Dict[str, Any]:
+    return {"widths": sorted(set(widths)), "jpeg_quality": JPEG_QUALITY, "webp_quality": WEBP_QUALITY}
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def render_derivatives(
+    source: str, base_dir: str, widths: Sequence[int]
+) -> Tuple[Dict[str, Any], OutputWriter]:
+    """Write all derivatives of one source; returns its manifest entry (without sha256)."""
+    src = Path(source)
+    base = Path(base_dir)
+    writer = OutputWriter()
+    derivatives: List[Dict[str, Any]] = []
+    with Image.open(src) as opened:
+        img = opened.convert("RGB")
+    w, h = img.size
+
+    targets: List[Tuple[Optional[int], str]] = [(None, "webp")]
+    for width in sorted(set(widths)):
+        if width < w:
+            targets += [(width, "jpg"), (width, "webp")]
+
+    resized: Dict[int, Image.Image] = {}
+    for width, fmt in targets:
+        if width is None:
+            frame, name = img, f"{src.name}.webp"
+        else:
+            if width not in resized:
+                resized[width] = img.resize((width, max(1, round(h * width / w))), Image.Resampling.LANCZOS)
+            frame, name = resized[width], f"{src.name}.w{width}.{fmt}"
+        data = _encode(frame, fmt)
+        rel = f"{DERIVED_DIR}/{name}"
+        writer.write_bytes(base / rel, data)
+        derivatives.append(
+            {"path": rel, "format": fmt, "width": frame.size[0], "height": frame.size[1], "bytes": len(data)}
+        )
+    entry = {"width": w, "height": h, "bytes": src.stat().st_size, "derivatives": derivatives}
+    return entry, writer
+
+
+def _is_current(entry: Any, name: str, digest: str, base_dir: Path) -> bool:
+    if not isinstance(entry, dict) or entry.get("sha256") != digest:
+        return False
+    prefix = f"{DERIVED_DIR}/{name}."
+    for d in entry.get("derivatives") or []:
+        try:
+            if not d["path"].startswith(prefix) or (base_dir / d["path"]).stat().st_size != d["bytes"]:
+                return False
+        except (OSError, KeyError, TypeError):
+            return False
+    return True
+
+
+def build_derivatives(
+    base_dir: Path, widths: Sequence[int] = DEFAULT_WIDTHS, workers: int = 0
+) -> Tuple[Dict[str, int], OutputWriter]:
+    """Bring `<base_dir>/_derived` and the manifest up to date. Returns counts and write stats."""
+    manifest_path = base_dir / MANIFEST_NAME
+    settings = settings_for(widths)
+    try:
+        old = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old = {}
+    same_settings = isinstance(old, dict) and old.get("version") == MANIFEST_VERSION and old.get("settings") == settings
+    old_sources: Dict[str, Any] = old.get("sources", {}) if same_settings else {}
+
+    sources = sorted(p for p in base_dir.iterdir() if p.is_file() and p.suffix.lower() in SOURCE_SUFFIXES)
+    entries: Dict[str, Any] = {}
+    todo: List[Tuple[Path, str]] = []
+    for src in sources:
+        digest = sha256_file(src)
+        if _is_current(old_sources.get(src.name), src.name, digest, base_dir):
+            entries[src.name] = old_sources[src.name]
+        else:
+            todo.append((src, digest))
+
+    writer = OutputWriter()
+    if todo:
+        args = [(str(src), str(base_dir), settings["widths"]) for src, _ in todo]
+        n = min(workers or os.cpu_count() or 1, len(todo))
+        if n == 1:
+            results = [render_derivatives(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                results = list(pool.map(render_derivatives, *zip(*args)))
+        for (src, digest), (entry, w) in zip(todo, results):
+            entries[src.name] = {"sha256": digest, **entry}
+            writer.add(w)
+
+    # Remove derivatives that no current source produces any more.
+    keep = {d["path"] for e in entries.values() for d in e["derivatives"]}
+    removed = 0
+    derived = base_dir / DERIVED_DIR
+    if derived.is_dir():
+        for f in derived.iterdir():
+            if f.is_file() and f"{DERIVED_DIR}/{f.name}" not in keep:
+                f.unlink()
+                removed += 1
+
+    manifest = {"version": MANIFEST_VERSION, "settings": settings, "sources": dict(sorted(entries.items()))}
+    writer.write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2) + "\n")
+    counts = {"sources": len(sources), "rendered": len(todo), "cached": len(sources) - len(todo), "removed": removed}
+    return counts, writer
+
+
+def summarize(counts: Dict[str, int], writer: OutputWriter) -> str:
+    return (
+        f"derivatives sources={counts['sources']} rendered={counts['rendered']} cached={counts['cached']} "
+        f"removed={counts['removed']} {writer.summary()}"
+    )
+
+
+def parse_widths(spec: str) -> List[int]:
+    return [int(w) for w in spec.split(",") if w.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default="static/picsum", help="Directory with the source images")
+    parser.add_argument("--widths", default=",".join(map(str, DEFAULT_WIDTHS)), help="Comma-separated target widths")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    base_dir = (root / args.dir).resolve()
+    counts, writer = build_derivatives(base_dir, parse_widths(args.widths), args.workers)
+    print(summarize(counts, writer))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
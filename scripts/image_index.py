@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Metadata index for the images under `static/`, so the editor can lay out a `RichTextImageNode`
+or an option image before it has downloaded it.
+
+One manifest, keyed by the URL the question data uses:
+
+    {"version": 1, "settings": {"placeholder_size": 16, ...},
+     "images": {"/static/picsum/opt-01.jpg": {"width": 512, "height": 512, "bytes": 61234,
+                                              "mtime_ns": 1760000000000000000,
+                                              "color": "#8a6f52",
+                                              "placeholder": "data:image/webp;base64,..."}}}
+
+`color` is the dominant color (most populated median-cut bucket of a 64px thumbnail) and
+`placeholder` a tiny image (longest side --placeholder-size) meant to be stretched and blurred
+with CSS while the real image loads.
+
+The index is incremental: a file whose mtime and size match its entry is not opened again, so
+a rerun over an unchanged library only stats the files. Directories starting with `_` or `.`
+(generated derivatives, temp output) are not indexed.
+
+    python3 scripts/image_index.py                       # static/ -> static/image-index.json
+    python3 scripts/image_index.py --workers 4 --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from atomic_output import OutputWriter
+
+MANIFEST_VERSION = 1
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+DEFAULT_PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+COLOR_SAMPLE = 64
+COLOR_BUCKETS = 5
+
+# (path, url, size, mtime_ns)
+Task = Tuple[str, str, int, int]
+
+
+def settings_for(placeholder_size: int) -> Dict[str, Any]:
+    return {
+        "placeholder_size": placeholder_size,
+        "placeholder_quality": PLACEHOLDER_QUALITY,
+        "color_sample": COLOR_SAMPLE,
+        "color_buckets": COLOR_BUCKETS,
+    }
+
+
+def dominant_color(img: Image.Image) -> str:
+    sample = img.copy()
+    sample.thumbnail((COLOR_SAMPLE, COLOR_SAMPLE), Image.Resampling.BILINEAR)
+    quantized = sample.quantize(colors=COLOR_BUCKETS, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette() or []
+    r, g, b = palette[index * 3 : index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def placeholder(img: Image.Image, size: int) -> str:
+    tiny = img.copy()
+    tiny.thumbnail((size, size), Image.Resampling.BOX)
+    buf = io.BytesIO()
+    tiny.save(buf, format="WEBP", quality=PLACEHOLDER_QUALITY, method=6)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def index_image(task: Task, placeholder_size: int) -> Tuple[str, Optional[Dict[str, Any]], str]:
+    """Returns (url, entry, error); entry is None if the file could not be decoded."""
+    path, url, size, mtime_ns = task
+    try:
+        with Image.open(path) as opened:
+            width, height = opened.size
+            # JPEGs can be decoded at 1/2..1/8 scale; nothing below needs more than COLOR_SAMPLE px.
+            opened.draft("RGB", (COLOR_SAMPLE, COLOR_SAMPLE))
+            img = opened.convert("RGBA")
+        # Transparent areas count as the white page they are shown on, not as black.
+        img = Image.alpha_composite(Image.new("RGBA", img.size, (255, 255, 255, 255)), img).convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return url, None, f"{path}: {exc}"
+    entry = {
+        "width": width,
+        "height": height,
+        "bytes": size,
+        "mtime_ns": mtime_ns,
+        "color": dominant_color(img),
+        "placeholder": placeholder(img, placeholder_size),
+    }
+    return url, entry, ""
+
+
+def _index_chunk(tasks: List[Task], placeholder_size: int) -> List[Tuple[str, Optional[Dict[str, Any]], str]]:
+    return [index_image(t, placeholder_size) for t in tasks]
+
+
+def scan(root: Path) -> List[Task]:
+    """All indexable images under `root`, with the URL the app would reference them by."""
+    tasks: List[Task] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+        for name in sorted(filenames):
+            if not name.lower().endswith(IMAGE_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            rel = Path(path).relative_to(root.parent).as_posix()
+            tasks.append((path, "/" + rel, st.st_size, st.st_mtime_ns))
+    return tasks
+
+
+def build_index(
+    root: Path, out: Path, placeholder_size: int = DEFAULT_PLACEHOLDER_SIZE, workers: int = 0, force: bool = False
+) -> Tuple[Dict[str, int], OutputWriter]:
+    settings = settings_for(placeholder_size)
+    try:
+        old = json.loads(out.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old = {}
+    reuse = (
+        not force
+        and isinstance(old, dict)
+        and old.get("version") == MANIFEST_VERSION
+        and old.get("settings") == settings
+    )
+    old_images: Dict[str, Any] = old.get("images", {}) if reuse else {}
+
+    images: Dict[str, Any] = {}
+    todo: List[Task] = []
+    for task in scan(root):
+        _, url, size, mtime_ns = task
+        prev = old_images.get(url)
+        if isinstance(prev, dict) and prev.get("bytes") == size and prev.get("mtime_ns") == mtime_ns:
+            images[url] = prev
+        else:
+            todo.append(task)
+
+    errors = 0
+    if todo:
+        n = min(workers or os.cpu_count() or 1, len(todo))
+        # A few chunks per worker keeps them busy without pickling one task at a time.
+        step = max(1, -(-len(todo) // (n * 4)))
+        chunks = [todo[i : i + step] for i in range(0, len(todo), step)]
+        if n == 1:
+            results = [_index_chunk(c, placeholder_size) for c in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                results = list(pool.map(_index_chunk, chunks, [placeholder_size] * len(chunks)))
+        for url, entry, error in (r for chunk in results for r in chunk):
+            if entry is None:
+                errors += 1
+                print(f"warning: skipped {error}", file=sys.stderr)
+            else:
+                images[url] = entry
+
+    manifest = {"version": MANIFEST_VERSION, "settings": settings, "images": dict(sorted(images.items()))}
+    writer = OutputWriter()
+    writer.write_text(out, json.dumps(manifest, ensure_ascii=False, indent=2) + "\n")
+    counts = {
+        "images": len(images),
+        "indexed": len(todo) - errors,
+        "cached": len(images) - (len(todo) - errors),
+        "errors": errors,
+    }
+    return counts, writer
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="static", help="Directory to index (URLs are relative to its parent)")
+    parser.add_argument("--out", default="static/image-index.json", help="Manifest path")
+    parser.add_argument("--placeholder-size", type=int, default=DEFAULT_PLACEHOLDER_SIZE,
+                        help="Longest side of the blur placeholder in px")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the existing manifest and re-index everything")
+    args = parser.parse_args()
+
+    repo = Path(__file__).resolve().parents[1]
+    root = (repo / args.root).resolve()
+    out = (repo / args.out).resolve()
+    t0 = time.perf_counter()
+    counts, writer = build_index(root, out, args.placeholder_size, args.workers, args.force)
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(
+        f"image-index images={counts['images']} indexed={counts['indexed']} cached={counts['cached']} "
+        f"errors={counts['errors']} in {elapsed:.0f}ms {writer.summary()}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+The `--plan` spec shared by `generate_picsum_placeholders.py` and `download_picsum_images.py`.
+
+Stdlib only, so the downloader keeps working without Pillow.
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+# Both scripts name files `<prefix>-<NN>.jpg`, so downloaded photos overwrite the placeholders.
+DEFAULT_PLAN = "opt:12:512x512,stem:6:1280x720,tall:4:720x1280"
+
+
+def parse_plan(spec: str) -> List[Tuple[str, int, int, int]]:
+    """'opt:12:512x512,stem:6:1280x720' -> [(prefix, count, width, height), ...]"""
+    plan = []
+    for item in spec.split(","):
+        try:
+            prefix, count, size = item.strip().split(":")
+            w, h = size.lower().split("x")
+            plan.append((prefix, int(count), int(w), int(h)))
+        except ValueError:
+            raise ValueError(f"bad plan item {item!r}, expected prefix:count:WxH") from None
+    return plan
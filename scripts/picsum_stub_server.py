@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for https://picsum.photos, for exercising the download scripts offline.
+
+Speaks HTTP/1.1 with keep-alive and mimics the two routes the downloader uses:
+
+    GET /seed/<seed>/<w>/<h>   302 -> /id/<n>/<w>/<h>   (n derived from the seed, like picsum)
+    GET /id/<n>/<w>/<h>        a flat-colored JPEG of that size, with ETag/Last-Modified;
+                               answers If-None-Match with 304 and Range (+ If-Range) with 206
+    GET /stats                 {"connections": ..., "requests": ..., "throttled": ..., "failed": ...}
+
+    python3 scripts/picsum_stub_server.py --port 8765 --latency 20
+    python3 scripts/download_picsum_images.py --base-url http://127.0.0.1:8765 --out /tmp/picsum \\
+        --plan opt:3000:64x64 --concurrency 16
+
+--latency adds a fixed delay to every response, to stand in for the round trip to the CDN.
+--max-rps answers requests beyond that rate with 429 and `Retry-After: --retry-after`, and
+--fail-rate answers that fraction of image requests with a 503, to exercise the retry path.
+--drop-rate cuts that fraction of image bodies off halfway and closes the connection, to
+exercise resuming with Range.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Tuple
+
+from PIL import Image
+
+IMAGE_IDS = 1000
+MAX_SIDE = 5000
+_SEED_RE = re.compile(r"^/seed/([^/]+)/(\d+)/(\d+)$")
+_ID_RE = re.compile(r"^/id/(\d+)/(\d+)/(\d+)$")
+_RANGE_RE = re.compile(r"^bytes=(\d+)-$")
+LAST_MODIFIED = "Mon, 02 Feb 2026 00:00:00 GMT"
+
+
+@functools.lru_cache(maxsize=256)
+def _jpeg(image_id: int, w: int, h: int) -> bytes:
+    # Sixteen colors are plenty for a fixture and keep the encode cache small.
+    shade = image_id % 16
+    color = (40 + shade * 12, 200 - shade * 9, 90 + (shade * 37) % 120)
+    buf = io.BytesIO()
+    Image.new("RGB", (w, h), color).save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+def image_id_for(seed: str) -> int:
+    return int.from_bytes(hashlib.blake2b(seed.encode("utf-8"), digest_size=4).digest(), "big") % IMAGE_IDS
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        latency: float = 0.0,
+        max_rps: float = 0.0,
+        retry_after: int = 1,
+        fail_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.lock = threading.Lock()
+        self.counts = {
+            "connections": 0, "requests": 0, "throttled": 0, "failed": 0,
+            "not_modified": 0, "partial": 0, "dropped": 0,
+        }
+        self._rnd = random.Random(seed)
+        self._tokens = max_rps
+        self._last = time.monotonic()
+
+    def bump(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] += 1
+
+    def admit(self) -> bool:
+        """Token bucket of one second's worth of --max-rps; False means answer 429."""
+        if not self.max_rps:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_rps, self._tokens + (now - self._last) * self.max_rps)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.counts["throttled"] += 1
+            return False
+
+    def chance(self, rate: float, name: str) -> bool:
+        with self.lock:
+            if rate and self._rnd.random() < rate:
+                self.counts[name] += 1
+                return True
+            return False
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY the body waits for the
+    # client's delayed ACK (~40 ms) on every keep-alive response.
+    disable_nagle_algorithm = True
+    server: StubServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.bump("connections")
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "text/plain", **headers: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.bump("requests")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = self.path.split("?", 1)[0]
+        if path == "/stats":
+            with self.server.lock:
+                body = json.dumps(self.server.counts).encode("utf-8")
+            self._reply(200, body, "application/json")
+            return
+        if not self.server.admit():
+            self._reply(429, b"slow down\n", Retry_After=str(self.server.retry_after))
+            return
+        m = _SEED_RE.match(path)
+        if m:
+            seed, w, h = m.groups()
+            self._reply(302, Location=f"/id/{image_id_for(seed)}/{w}/{h}")
+            return
+        m = _ID_RE.match(path)
+        if m:
+            image_id, w, h = (int(g) for g in m.groups())
+            if self.server.chance(self.server.fail_rate, "failed"):
+                self._reply(503, b"unavailable\n")
+                return
+            if 0 < w <= MAX_SIDE and 0 < h <= MAX_SIDE:
+                self._image(_jpeg(image_id, w, h), f'"{image_id}-{w}x{h}"')
+                return
+        self._reply(404, b"not found\n")
+
+    def _image(self, body: bytes, etag: str) -> None:
+        validators = {"ETag": etag, "Last_Modified": LAST_MODIFIED}
+        if self.headers.get("If-None-Match") == etag:
+            self.server.bump("not_modified")
+            self._reply(304, **validators)
+            return
+        start = 0
+        m = _RANGE_RE.match(self.headers.get("Range", ""))
+        if m and self.headers.get("If-Range", etag) in (etag, LAST_MODIFIED):
+            start = int(m.group(1))
+            if start >= len(body):
+                self._reply(416, Content_Range=f"bytes */{len(body)}")
+                return
+        status = 206 if start else 200
+        if start:
+            self.server.bump("partial")
+            validators["Content_Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        body = body[start:]
+        if self.command != "HEAD" and self.server.chance(self.server.drop_rate, "dropped"):
+            # Promise the whole body, send half of it, hang up.
+            self.send_response(status)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in validators.items():
+                self.send_header(name.replace("_", "-"), value)
+            self.end_headers()
+            self.wfile.write(body[: len(body) // 2])
+            self.close_connection = True
+            return
+        self._reply(status, body, "image/jpeg", **validators)
+
+    do_HEAD = do_GET
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, **options: Any) -> StubServer:
+    """Start a stub server on a background thread; port 0 picks a free one. Stop with .shutdown()."""
+    server = StubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per response in milliseconds")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Answer 429 above this many requests/s (0: off)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of image requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of image bodies cut off halfway")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --fail-rate and --drop-rate")
+    args = parser.parse_args()
+
+    server = StubServer(
+        (args.host, args.port),
+        latency=args.latency / 1000,
+        max_rps=args.max_rps,
+        retry_after=args.retry_after,
+        fail_rate=args.fail_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    print(f"picsum stub on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"stub {json.dumps(server.counts)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
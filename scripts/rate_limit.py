@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting and retry helpers for the download scripts.
+
+`AdaptiveRateLimiter` is a token bucket shared by all download threads whose rate follows
+the server (additive increase, multiplicative decrease):
+
+- until the first slowdown the rate doubles every second (slow start), afterwards every
+  successful response raises it by about `increase` requests/s per second, up to `max_rate`,
+  so an idle server is used at full speed;
+- a throttled response (429, or 503 with Retry-After), or latency rising above
+  `latency_factor` times the lowest latency seen so far, halves the rate, at most once per
+  smoothed round trip;
+- `pause(seconds)` stops every thread until then, for a server-sent `Retry-After`.
+
+    limiter = AdaptiveRateLimiter(rate=10, max_rate=200)
+    limiter.acquire()                      # blocks until a token is free
+    limiter.record(latency_s, throttled=is_throttle(resp.status, resp.headers))
+    delay = retry_after_seconds(resp.headers.get("Retry-After"))
+    delay = delay if delay is not None else backoff_delay(attempt)
+
+`backoff_delay` is "full jitter" exponential backoff: uniform in [0, min(cap, base * 2^n)].
+"""
+
+from __future__ import annotations
+
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_throttle(status: int, headers: Mapping[str, str]) -> bool:
+    """429, or a 503 that says when to come back, means "too fast"; other 5xx are just errors."""
+    return status == 429 or (status == 503 and "Retry-After" in headers)
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, rnd: Optional[random.Random] = None) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return (rnd or random).uniform(0, min(cap, base * (2**attempt)))
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        rate: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 200.0,
+        burst: float = 1.0,
+        increase: float = 5.0,
+        decrease: float = 0.5,
+        latency_factor: float = 3.0,
+    ) -> None:
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+        self._slow_start = True
+        self._latency: Optional[float] = None  # smoothed
+        self._base_latency: Optional[float] = None  # lowest seen
+        self._counts: Dict[str, float] = {"waited_s": 0.0, "paused_s": 0.0, "cuts": 0, "peak_rate": self.rate}
+
+    def acquire(self) -> float:
+        """Block until a request may be sent. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.burst, self._tokens + max(0.0, now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._counts["waited_s"] += waited
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of acquire() for `seconds` (a server-wide Retry-After)."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._counts["paused_s"] += until - max(self._paused_until, time.monotonic())
+                self._paused_until = until
+                self._tokens = 0.0
+                self._last = until
+            self._cut()
+
+    def record(self, latency: float, throttled: bool = False) -> None:
+        """Feed back one response: its latency and whether the server asked us to slow down."""
+        with self._lock:
+            if throttled:
+                self._cut()
+                return
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if self._base_latency is None or latency < self._base_latency:
+                self._base_latency = latency
+            if self._latency > self.latency_factor * max(self._base_latency, 0.001):
+                self._cut()
+            else:
+                step = 1.0 if self._slow_start else self.increase / self.rate
+                self.rate = min(self.max_rate, self.rate + step)
+                self._counts["peak_rate"] = max(self._counts["peak_rate"], self.rate)
+
+    def _cut(self) -> None:
+        # Responses already in flight report the same congestion; count it once per round trip.
+        now = time.monotonic()
+        if now - self._last_cut < (self._latency or 0.1):
+            return
+        self._last_cut = now
+        self._slow_start = False
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._counts["cuts"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self._counts)
+            out["rate"] = self.rate
+            return {k: round(v, 2) if isinstance(v, float) else v for k, v in out.items()}
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Curated placeholder replacements for `expand_knowledge_tags.py`, loaded from catalog files.
+
+A catalog is a JSON file (see `tag_catalogs/default.json`):
+
+    {
+      "name": "default",
+      "entries": [
+        {"path": ["知识点标签", "语法", "*", "连词"], "children": ["并列连词", "从属连词"]}
+      ]
+    }
+
+`path` is the parent path of the placeholder rows, as a list of titles; "*" matches any single
+title, so one list can serve every grade. `children` items, at any depth, are titles or full
+`{"title", "children"}` nodes; a malformed item fails the load with the entry's path. Several
+catalogs can be layered (e.g. default, then a region or publisher override); a later catalog
+replaces an earlier entry with the same path pattern.
+
+Catalogs are read on first use and compiled into a path trie, so importing the script costs
+nothing and a lookup walks one trie level per path segment. Where both match, an exact
+segment wins over "*" at the first level where they differ.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_CATALOG_DIR = Path(__file__).resolve().parent / "tag_catalogs"
+WILDCARD = "*"
+
+Key = Tuple[str, ...]
+Nodes = List[Dict[str, Any]]
+
+
+class _TrieNode:
+    __slots__ = ("children", "wildcard", "value")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.wildcard: Optional["_TrieNode"] = None
+        self.value: Optional[Nodes] = None
+
+
+def catalog_files(sources: Iterable[Path]) -> List[Path]:
+    """Expand directories to their *.json files (sorted); keep explicit files in the given order."""
+    files: List[Path] = []
+    for src in sources:
+        if src.is_dir():
+            files.extend(sorted(src.glob("*.json")))
+        else:
+            files.append(src)
+    return files
+
+
+def _to_node(item: Any, where: str) -> Dict[str, Any]:
+    """Check one replacement item, nested children included, so a bad entry fails at load time."""
+    if isinstance(item, str):
+        return {"title": item}
+    if not (isinstance(item, dict) and isinstance(item.get("title"), str)):
+        raise ValueError(f"{where}: children items must be titles or objects with a title")
+    children = item.get("children")
+    if children is None:
+        return item
+    if not isinstance(children, list):
+        raise ValueError(f"{where}.children: must be a list")
+    return dict(item, children=[_to_node(c, f"{where}.children[{j}]") for j, c in enumerate(children)])
+
+
+class ReplacementCatalog:
+    def __init__(self, sources: Sequence[Path] = ()) -> None:
+        self.sources = [Path(s) for s in sources] or [DEFAULT_CATALOG_DIR]
+        self._entries: Optional[Dict[Key, Nodes]] = None
+        self._root: Optional[_TrieNode] = None
+
+    def files(self) -> List[Path]:
+        return catalog_files(self.sources)
+
+    def entries(self) -> Dict[Key, Nodes]:
+        """All path patterns with their replacement nodes, in load order."""
+        if self._entries is None:
+            self._load()
+        assert self._entries is not None
+        return self._entries
+
+    def _load(self) -> None:
+        entries: Dict[Key, Nodes] = {}
+        for file in self.files():
+            try:
+                data = json.loads(file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                raise ValueError(f"{file}: cannot read catalog ({exc})") from exc
+            items = data.get("entries") if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                raise ValueError(f"{file}: expected an object with an 'entries' list")
+            for i, entry in enumerate(items):
+                where = f"{file}: entries[{i}]"
+                path = entry.get("path") if isinstance(entry, dict) else None
+                children = entry.get("children") if isinstance(entry, dict) else None
+                if not isinstance(path, list) or not path or not all(isinstance(p, str) for p in path):
+                    raise ValueError(f"{where}: 'path' must be a non-empty list of titles")
+                key = tuple(p.strip() for p in path)
+                where = f"{where} ({'/'.join(key)})"
+                if not isinstance(children, list):
+                    raise ValueError(f"{where}: 'children' must be a list")
+                entries.pop(key, None)  # re-insert so a later catalog's position wins as well
+                entries[key] = [_to_node(c, f"{where}: children[{j}]") for j, c in enumerate(children)]
+
+        root = _TrieNode()
+        for key, nodes in entries.items():
+            cur = root
+            for seg in key:
+                if seg == WILDCARD:
+                    if cur.wildcard is None:
+                        cur.wildcard = _TrieNode()
+                    cur = cur.wildcard
+                else:
+                    nxt = cur.children.get(seg)
+                    if nxt is None:
+                        nxt = cur.children[seg] = _TrieNode()
+                    cur = nxt
+            cur.value = nodes
+        self._entries = entries
+        self._root = root
+
+    def lookup(self, path: Sequence[str]) -> Optional[Nodes]:
+        """Replacement nodes for the parent at `path`, or None when no entry matches."""
+        if self._root is None:
+            self._load()
+        # Depth-first, exact segment before wildcard, so the most specific pattern wins.
+        stack: List[Tuple[_TrieNode, int]] = [(self._root, 0)]  # type: ignore[list-item]
+        n = len(path)
+        while stack:
+            node_obj, i = stack.pop()
+            if i == n:
+                if node_obj.value is not None:
+                    return node_obj.value
+                continue
+            if node_obj.wildcard is not None:
+                stack.append((node_obj.wildcard, i + 1))
+            child = node_obj.children.get(path[i])
+            if child is not None:
+                stack.append((child, i + 1))
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries())
+
+
+_active: Optional[ReplacementCatalog] = None
+
+
+def get_catalog() -> ReplacementCatalog:
+    """The catalog used by `transform()`; the default directory unless `use_catalogs()` changed it."""
+    global _active
+    if _active is None:
+        _active = ReplacementCatalog()
+    return _active
+
+
+def use_catalogs(sources: Sequence[Path]) -> ReplacementCatalog:
+    global _active
+    wanted = [Path(s) for s in sources] or [DEFAULT_CATALOG_DIR]
+    if _active is None or _active.sources != wanted:
+        _active = ReplacementCatalog(wanted)
+    return _active
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("catalogs", nargs="*", help="Catalog files or directories (default: tag_catalogs/)")
+    parser.add_argument("--lookup", action="append", default=[], help="Parent path to resolve, titles joined by '/'")
+    args = parser.parse_args()
+
+    catalog = ReplacementCatalog([Path(c) for c in args.catalogs])
+    try:
+        entries = catalog.entries()
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    wildcards = sum(1 for k in entries if WILDCARD in k)
+    print(f"catalogs={len(catalog.files())} entries={len(entries)} wildcard_entries={wildcards}")
+    for path in args.lookup:
+        nodes = catalog.lookup(path.split("/"))
+        titles = [n.get("title") for n in nodes] if nodes is not None else None
+        print(f"{path}: {json.dumps(titles, ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
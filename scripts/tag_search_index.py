@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Character n-gram inverted index over tag titles and full paths, for the editor's tag picker.
+
+Chinese titles have no word boundaries, so titles are indexed as overlapping character
+unigrams/bigrams/trigrams. Postings are sorted document numbers; documents carry the tag id
+(`createIdFromPath`, or an explicit `id`), title, `buildTagIndex`-style path and depth.
+
+Ranking, best first: exact title, title prefix, title substring, then n-gram overlap (title
+grams weigh more than path grams), then shallower nodes, then shorter titles.
+
+Documents are numbered in that last order (depth, title length, then tree order), so every
+postings list is already sorted best first. A query whose text occurs in at least `limit`
+titles is answered from the exact-title table, the title-prefix table and the postings of its
+rarest gram, each read only until `limit` hits are found. Otherwise (a partial match) the
+candidates are the distinct titles sharing a bigram/trigram with the query, visited in
+decreasing title overlap; their tags are scored by how many query grams are in the title and
+how many anywhere on the path, found by walking the ancestors (memoized per query). Each
+title's grams are indexed once, under its own document, so postings stay O(nodes) however
+deep the tree is.
+
+A partial match scores at most `max_docs` tags (PARTIAL_MAX_DOCS by default, `--partial-max-docs`
+on the command line; 0 scores every candidate). On very large trees the cap can cut off tags
+that would have ranked; `search_with_status` then reports the response as truncated, and the
+CLI marks it. On the shipped tree the default cap never truncates.
+
+The exported artifact is compact JSON with delta-encoded postings:
+
+    {"version": 1, "ids": [...], "titles": [...], "parents": [...],
+     "title_grams": {"短语": [3, 1, 7], ...}}
+
+`parents` are document offsets (-1 for roots) from which paths and depths are rebuilt.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+Hit = Tuple[str, str, float]
+
+from atomic_output import OutputWriter
+from expand_knowledge_tags import create_id_from_path
+
+INDEX_VERSION = 1
+TITLE_NGRAMS = (1, 2, 3)
+PATH_WEIGHT = 0.35
+PREFIX_LEN = 3
+PARTIAL_NGRAMS = (2, 3)
+PARTIAL_MAX_DOCS = 256
+
+
+def normalize(text: str) -> str:
+    return "".join((text or "").split()).lower()
+
+
+def ngrams(text: str, sizes: Iterable[int]) -> Set[str]:
+    out: Set[str] = set()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            out.add(text[i : i + n])
+    return out
+
+
+def _query_grams(q: str) -> Set[str]:
+    # Single characters only have unigrams; longer queries use bigrams/trigrams so that
+    # common characters do not flood the candidate set.
+    return ngrams(q, (1,)) if len(q) == 1 else ngrams(q, (2, 3))
+
+
+class TagSearchIndex:
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.parents: List[int] = []
+        self.paths: List[str] = []
+        self.depths: List[int] = []
+        self.title_grams: Dict[str, List[int]] = {}
+        self._norm_titles: List[str] = []
+        self._exact: Dict[str, List[int]] = {}
+        self._prefixes: Dict[str, List[int]] = {}
+        self._gram_titles: Dict[str, List[str]] = {}  # over distinct normalized titles
+
+    @classmethod
+    def build(cls, tree: List[Dict[str, Any]]) -> "TagSearchIndex":
+        # Walk the tree (preorder) first, then number documents in rank order.
+        nodes: List[Tuple[str, str, int, int]] = []  # (id, title, parent, depth), preorder
+        stack: List[Tuple[Dict[str, Any], int, str]] = [(n, -1, "") for n in reversed(tree) if isinstance(n, dict)]
+        while stack:
+            node_obj, parent, parent_id_path = stack.pop()
+            title = (node_obj.get("title") or "").strip()
+            id_path = title if parent < 0 else f"{parent_id_path}/{title}"
+            depth = 0 if parent < 0 else nodes[parent][3] + 1
+            nodes.append((node_obj.get("id") or create_id_from_path(id_path), title, parent, depth))
+            children = node_obj.get("children")
+            if isinstance(children, list):
+                for ch in reversed(children):
+                    if isinstance(ch, dict):
+                        stack.append((ch, len(nodes) - 1, id_path))
+
+        order = sorted(range(len(nodes)), key=lambda i: (nodes[i][3], len(normalize(nodes[i][1])), i))
+        doc_of = [0] * len(nodes)
+        for doc, i in enumerate(order):
+            doc_of[i] = doc
+        index = cls()
+        for i in order:
+            node_id, title, parent, _ = nodes[i]
+            doc = len(index.ids)
+            index.ids.append(node_id)
+            index._add_doc(title, doc_of[parent] if parent >= 0 else -1)
+            for g in ngrams(index._norm_titles[doc], TITLE_NGRAMS):
+                index.title_grams.setdefault(g, []).append(doc)
+        return index
+
+    def _add_doc(self, title: str, parent: int) -> None:
+        doc = len(self.titles)
+        norm = normalize(title)
+        self.titles.append(title)
+        self.parents.append(parent)
+        self._norm_titles.append(norm)
+        same_title = self._exact.setdefault(norm, [])
+        same_title.append(doc)
+        if len(same_title) == 1:
+            for g in ngrams(norm, PARTIAL_NGRAMS):
+                self._gram_titles.setdefault(g, []).append(norm)
+        for n in range(1, min(len(norm), PREFIX_LEN) + 1):
+            self._prefixes.setdefault(norm[:n], []).append(doc)
+        if parent < 0:
+            self.paths.append(title)
+            self.depths.append(0)
+        else:
+            parent_path = self.paths[parent]
+            self.paths.append(f"{parent_path}/{title}" if parent_path and title else (parent_path or title))
+            self.depths.append(self.depths[parent] + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "ids": self.ids,
+            "titles": self.titles,
+            "parents": self.parents,
+            "title_grams": {g: _delta_encode(p) for g, p in self.title_grams.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TagSearchIndex":
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported search index version {data.get('version')!r} (rebuild it)")
+        index = cls()
+        index.ids = list(data["ids"])
+        for title, parent in zip(data["titles"], data["parents"]):
+            index._add_doc(title, parent)
+        index.title_grams = {g: _delta_decode(p) for g, p in data["title_grams"].items()}
+        return index
+
+    def search(self, query: str, limit: int = 20, max_docs: int = PARTIAL_MAX_DOCS) -> List[Hit]:
+        """Return up to `limit` (id, path, score) tuples, best match first."""
+        return self.search_with_status(query, limit, max_docs)[0]
+
+    def search_with_status(
+        self, query: str, limit: int = 20, max_docs: int = PARTIAL_MAX_DOCS
+    ) -> Tuple[List[Hit], bool]:
+        """Like `search`, plus whether `max_docs` cut off candidates that could still have ranked."""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return [], False
+        grams = _query_grams(q)
+        # Every gram of q is in a title that contains q, and so on its path: full overlap.
+        full = 1.0 + (PATH_WEIGHT if len(q) > 1 else 0.0)
+        titles = self._norm_titles
+        rarest = min(grams, key=lambda g: len(self.title_grams.get(g, ())))
+        tiers = (
+            (3, self._exact.get(q, ())),
+            (2, (d for d in self._prefixes.get(q[:PREFIX_LEN], ()) if titles[d] != q and titles[d].startswith(q))),
+            (1, (d for d in self.title_grams.get(rarest, ()) if q in titles[d] and not titles[d].startswith(q))),
+        )
+        # Within a tier, documents are numbered in rank order, so the first hits are the best.
+        hits: List[Tuple[int, int]] = []
+        for tier, docs in tiers:
+            hits.extend((tier, d) for d in itertools.islice(docs, limit - len(hits)))
+            if len(hits) >= limit:
+                break
+        if len(hits) >= limit or len(grams) == 1:
+            return [(self.ids[d], self.paths[d], tier + full) for tier, d in hits], False
+        return self._rank_partial(q, grams, limit, max_docs)
+
+    def _rank_partial(self, q: str, grams: Set[str], limit: int, max_docs: int) -> Tuple[List[Hit], bool]:
+        """Fewer than `limit` titles contain q: rank by n-gram overlap in the title and the path."""
+        grams_list = sorted(grams)
+        n = len(grams_list)
+        title_weight = 1.0 / n
+        path_weight = PATH_WEIGHT / n
+        # Title overlap only depends on the title text, so it is worked out per distinct title.
+        masks: Dict[str, int] = {}
+        for i, g in enumerate(grams_list):
+            for title in self._gram_titles.get(g, ()):
+                masks[title] = masks.get(title, 0) | (1 << i)
+        counts = {title: _popcount(mask) for title, mask in masks.items()}
+        full = (1 << n) - 1
+        on_path: Dict[int, int] = {}
+        best: List[Tuple[int, float, int]] = []  # min-heap of (tier, overlap, -doc): the worst kept hit on top
+        budget = max_docs if max_docs > 0 else len(self.ids)
+        truncated = False
+        parents = self.parents
+        popcounts: Dict[int, int] = {}
+        for title in sorted(masks, key=lambda t: (-counts[t], self._exact[t][0])):
+            # Titles come in decreasing title overlap; stop once none can beat the kept hits.
+            bound = (3 if masks[title] == full else 0, title_weight * counts[title] + path_weight * n)
+            if len(best) >= limit and bound < best[0][:2]:
+                break
+            if budget <= 0:
+                truncated = True
+                break
+            tier = 3 if title == q else 2 if title.startswith(q) else 1 if q in title else 0
+            mask = masks[title]
+            own = title_weight * counts[title]
+            docs = self._exact[title]
+            if len(docs) > budget:
+                docs = docs[:budget]
+                truncated = True
+            budget -= len(docs)
+            for doc in docs:
+                parent = parents[doc]
+                above = on_path.get(parent) if parent >= 0 else 0
+                if above is None:
+                    above = self._path_mask(parent, masks, on_path)
+                path = above | mask
+                ones = popcounts.get(path)
+                if ones is None:
+                    ones = popcounts[path] = _popcount(path)
+                item = (tier, own + path_weight * ones, -doc)
+                if len(best) < limit:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+        best.sort(reverse=True)
+        return [(self.ids[-d], self.paths[-d], tier + overlap) for tier, overlap, d in best], truncated
+
+    def _path_mask(self, doc: int, masks: Dict[str, int], memo: Dict[int, int]) -> int:
+        """Query grams found anywhere on the doc's path; `memo` is shared by one query's candidates."""
+        chain = []
+        d = doc
+        while d >= 0 and d not in memo:
+            chain.append(d)
+            d = self.parents[d]
+        mask = memo[d] if d >= 0 else 0
+        titles = self._norm_titles
+        for d in reversed(chain):
+            mask |= masks.get(titles[d], 0)
+            memo[d] = mask
+        return mask
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def _delta_encode(postings: List[int]) -> List[int]:
+    out = []
+    prev = 0
+    for p in postings:
+        out.append(p - prev)
+        prev = p
+    return out
+
+
+def _delta_decode(deltas: List[int]) -> List[int]:
+    out = []
+    acc = 0
+    for d in deltas:
+        acc += d
+        out.append(acc)
+    return out
+
+
+def _bench(index: TagSearchIndex, rounds: int, seed: int, max_docs: int = PARTIAL_MAX_DOCS) -> Dict[str, float]:
+    rnd = random.Random(seed)
+    queries: List[str] = []
+    for _ in range(rounds):
+        title = rnd.choice(index.titles) or "x"
+        start = rnd.randrange(len(title))
+        queries.append(title[start : start + rnd.randint(1, 4)])
+    timings = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, max_docs=max_docs)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return {
+        "queries": len(timings),
+        "mean_ms": 1000 * sum(timings) / len(timings),
+        "p50_ms": 1000 * timings[len(timings) // 2],
+        "p99_ms": 1000 * timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", default=None, help="Tag tree JSON (default: 题型知识点标签.json), or an index with --load")
+    parser.add_argument("--out", default=None, help="Write the index artifact here")
+    parser.add_argument("--load", action="store_true", help="INPUT is a previously exported index, not a tag tree")
+    parser.add_argument("--query", "-q", action="append", default=[], help="Run a query and print the ranked hits")
+    parser.add_argument("--limit", type=int, default=10, help="Hits per query")
+    parser.add_argument(
+        "--partial-max-docs",
+        type=int,
+        default=PARTIAL_MAX_DOCS,
+        metavar="N",
+        help="Tags scored per partial-match query (default: %(default)s; 0 = all, exact but slower on big trees)",
+    )
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="Time N random title-fragment queries")
+    parser.add_argument(
+        "--scale", type=int, default=1, metavar="K", help="Index K copies of the tree (roots suffixed 1..K), to benchmark growth"
+    )
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    src = Path(args.input) if args.input else (root / "题型知识点标签.json")
+    data = json.loads(src.read_text(encoding="utf-8"))
+
+    t0 = time.perf_counter()
+    if args.load:
+        index = TagSearchIndex.from_dict(data)
+    elif isinstance(data, list):
+        if args.scale > 1:
+            data = [dict(n, title=f"{n.get('title') or ''}{k}") for k in range(1, args.scale + 1) for n in data if isinstance(n, dict)]
+        index = TagSearchIndex.build(data)
+    else:
+        print("Expected top-level JSON array", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{'loaded' if args.load else 'built'} docs={len(index.ids)} title_grams={len(index.title_grams)} "
+        f"postings={sum(len(p) for p in index.title_grams.values())} in {elapsed * 1000:.1f}ms"
+    )
+
+    if args.out:
+        text = json.dumps(index.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+        writer = OutputWriter()
+        writer.write_text(args.out, text)
+        print(f"{args.out} bytes={len(text.encode('utf-8'))} {writer.summary()}")
+
+    for q in args.query:
+        t0 = time.perf_counter()
+        hits, truncated = index.search_with_status(q, args.limit, args.partial_max_docs)
+        note = f" (truncated at {args.partial_max_docs} scored tags)" if truncated else ""
+        print(f"query {q!r}: {len(hits)} hits in {(time.perf_counter() - t0) * 1000:.3f}ms{note}")
+        for node_id, path, score in hits:
+            print(f"  {score:.2f} {node_id} {path}")
+
+    if args.bench:
+        print(json.dumps(_bench(index, args.bench, seed=20260210, max_docs=args.partial_max_docs)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
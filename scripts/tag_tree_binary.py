@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Compact binary encoding for tag trees (`题型*.json`), plus a lazy mmap reader.
+
+Layout (little-endian, every section 4-byte aligned):
+
+    header   magic b"TPTB", u16 version, u16 flags, u32 node_count, u32 string_count, u32 blob_size
+    strings  u32 offsets[string_count + 1] into the UTF-8 blob, then the blob itself
+    nodes    int title[node_count]         index into the interned string table
+             int parent[node_count]        -1 for roots
+             int first_child[node_count]   -1 for leaves
+             int next_sibling[node_count]  -1 for the last child; roots are chained the same way
+
+Node columns are i32, or i16 when FLAG_NARROW is set (trees with fewer than 32768 nodes
+and strings, which covers every taxonomy shipped today).
+
+Nodes are numbered in preorder, so node 0 is the first root and a subtree occupies a
+contiguous range. Repeated titles (e.g. "动词短语" in every grade) are stored once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from atomic_output import OutputWriter
+
+MAGIC = b"TPTB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+FLAG_NARROW = 0x1
+
+
+def _pad4(n: int) -> int:
+    return (4 - n % 4) % 4
+
+
+class TagTreeBinaryBuilder:
+    """Accumulates roots one at a time (works with `--stream`) and serializes them."""
+
+    def __init__(self) -> None:
+        self._strings: Dict[str, int] = {}
+        self.titles = array("i")
+        self.parents = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self._last_root = -1
+
+    @property
+    def string_count(self) -> int:
+        return len(self._strings)
+
+    def intern(self, s: str) -> int:
+        idx = self._strings.get(s)
+        if idx is None:
+            idx = len(self._strings)
+            self._strings[s] = idx
+        return idx
+
+    def add_root(self, root: Dict[str, Any]) -> None:
+        # Last emitted child per open parent, so sibling links are set without a second pass.
+        last_child: Dict[int, int] = {}
+        stack: List[Tuple[Dict[str, Any], int]] = [(root, -1)]
+        while stack:
+            node_obj, parent = stack.pop()
+            offset = len(self.titles)
+            self.titles.append(self.intern((node_obj.get("title") or "").strip()))
+            self.parents.append(parent)
+            self.first_child.append(-1)
+            self.next_sibling.append(-1)
+
+            if parent < 0:
+                if self._last_root >= 0:
+                    self.next_sibling[self._last_root] = offset
+                self._last_root = offset
+            else:
+                prev = last_child.get(parent)
+                if prev is None:
+                    self.first_child[parent] = offset
+                else:
+                    self.next_sibling[prev] = offset
+                last_child[parent] = offset
+
+            children = node_obj.get("children")
+            if isinstance(children, list):
+                for ch in reversed(children):
+                    if isinstance(ch, dict):
+                        stack.append((ch, offset))
+
+    def to_bytes(self) -> bytes:
+        blob = bytearray()
+        offsets = array("I", [0])
+        for s in self._strings:
+            blob += s.encode("utf-8")
+            offsets.append(len(blob))
+        blob += b"\0" * _pad4(len(blob))
+
+        narrow = max(len(self.titles), len(self._strings)) < 0x8000
+        node_type = "h" if narrow else "i"
+        columns = [array("I", offsets)]
+        columns += [array(node_type, c) for c in (self.titles, self.parents, self.first_child, self.next_sibling)]
+        if sys.byteorder != "little":
+            for c in columns:
+                c.byteswap()
+
+        flags = FLAG_NARROW if narrow else 0
+        out = bytearray(HEADER.pack(MAGIC, VERSION, flags, len(self.titles), len(self._strings), len(blob)))
+        out += columns[0].tobytes()
+        out += blob
+        for col in columns[1:]:
+            out += col.tobytes()
+        return bytes(out)
+
+    def write(self, path: Path, writer: Optional[OutputWriter] = None) -> int:
+        data = self.to_bytes()
+        (writer or OutputWriter()).write_bytes(path, data)
+        return len(data)
+
+
+def encode_tree(tree: List[Dict[str, Any]]) -> bytes:
+    builder = TagTreeBinaryBuilder()
+    for root in tree:
+        if isinstance(root, dict):
+            builder.add_root(root)
+    return builder.to_bytes()
+
+
+class TagTreeReader:
+    """Memory-maps an encoded tree. Nothing is decoded until a node is actually visited."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, self.node_count, self.string_count, blob_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a tag tree binary (magic={magic!r} version={version})")
+
+        pos = HEADER.size
+        self._offsets = self._column(pos, self.string_count + 1, "I")
+        pos += 4 * (self.string_count + 1)
+        self._blob_start = pos
+        pos += blob_size
+        n = self.node_count
+        node_type = "h" if flags & FLAG_NARROW else "i"
+        width = 2 if flags & FLAG_NARROW else 4
+        self._title = self._column(pos, n, node_type)
+        self._parent = self._column(pos + width * n, n, node_type)
+        self._first_child = self._column(pos + 2 * width * n, n, node_type)
+        self._next_sibling = self._column(pos + 3 * width * n, n, node_type)
+        self._strings: Dict[int, str] = {}
+
+    def _column(self, pos: int, count: int, typecode: str):
+        size = array(typecode).itemsize * count
+        if sys.byteorder == "little":
+            return memoryview(self._mm)[pos : pos + size].cast(typecode)
+        col = array(typecode, self._mm[pos : pos + size])
+        col.byteswap()
+        return col
+
+    def close(self) -> None:
+        for name in ("_offsets", "_title", "_parent", "_first_child", "_next_sibling"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "TagTreeReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def string(self, idx: int) -> str:
+        s = self._strings.get(idx)
+        if s is None:
+            start = self._blob_start + self._offsets[idx]
+            end = self._blob_start + self._offsets[idx + 1]
+            s = self._mm[start:end].decode("utf-8")
+            self._strings[idx] = s
+        return s
+
+    def title(self, i: int) -> str:
+        return self.string(self._title[i])
+
+    def parent(self, i: int) -> int:
+        return self._parent[i]
+
+    def first_child(self, i: int) -> int:
+        return self._first_child[i]
+
+    def next_sibling(self, i: int) -> int:
+        return self._next_sibling[i]
+
+    def roots(self) -> Iterator[int]:
+        i = 0 if self.node_count else -1
+        while i >= 0:
+            yield i
+            i = self._next_sibling[i]
+
+    def children(self, i: int) -> Iterator[int]:
+        c = self._first_child[i]
+        while c >= 0:
+            yield c
+            c = self._next_sibling[c]
+
+    def path(self, i: int) -> List[str]:
+        parts: List[str] = []
+        while i >= 0:
+            parts.append(self.title(i))
+            i = self._parent[i]
+        parts.reverse()
+        return parts
+
+    def walk(self, start: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Yield (node, depth) in preorder, for the whole forest or the subtree at `start`."""
+        stack: List[Tuple[int, int]] = []
+        tops = [start] if start is not None else list(self.roots())
+        for top in reversed(tops):
+            stack.append((top, 0))
+        while stack:
+            i, depth = stack.pop()
+            yield i, depth
+            kids = list(self.children(i))
+            for c in reversed(kids):
+                stack.append((c, depth + 1))
+
+    def to_json(self, start: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rebuild the nested `{"title", "children"}` form (the whole forest by default)."""
+        built: Dict[int, Dict[str, Any]] = {}
+        out: List[Dict[str, Any]] = []
+        for i, depth in self.walk(start):
+            n: Dict[str, Any] = {"title": self.title(i)}
+            built[i] = n
+            if depth == 0:
+                out.append(n)
+            else:
+                built[self._parent[i]].setdefault("children", []).append(n)
+        return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="Tag tree JSON to encode, or a .ttb file with --dump")
+    parser.add_argument("output", nargs="?", default=None, help="Binary output (default: <input>.ttb)")
+    parser.add_argument("--dump", action="store_true", help="Decode a binary file and print it as JSON")
+    args = parser.parse_args()
+
+    src = Path(args.input).resolve()
+    if args.dump:
+        with TagTreeReader(src) as reader:
+            print(json.dumps(reader.to_json(), ensure_ascii=False, indent=2))
+        return 0
+
+    raw = src.read_bytes()
+    tree = json.loads(raw.decode("utf-8"))
+    if not isinstance(tree, list):
+        print("Expected top-level JSON array", file=sys.stderr)
+        return 2
+    builder = TagTreeBinaryBuilder()
+    for root in tree:
+        if isinstance(root, dict):
+            builder.add_root(root)
+    dest = Path(args.output).resolve() if args.output else src.with_suffix(".ttb")
+    size = builder.write(dest)
+
+    compact = len(json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    print(
+        f"nodes={len(builder.titles)} strings={builder.string_count} "
+        f"bytes json={len(raw)} compact_json={compact} binary={size}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
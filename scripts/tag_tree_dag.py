@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Find identical subtrees in a tag tree and optionally export it as a deduplicated DAG.
+
+Subtrees are hash-consed bottom-up: two nodes share one DAG entry when their title,
+extra fields and (already deduplicated) children are identical. The DAG is written as
+
+    {"version": 1, "nodes": [[title, [child, ...]], ...], "roots": [node, ...]}
+
+where children are indices of earlier entries (postorder), leaves are `[title]`, and a node
+with fields other than title/children carries them as a third element (with `null` as the
+second when it has no `children` key). A leaf with an explicit `"children": []` keeps it, so
+`expand_dag` gives back exactly the input tree.
+
+With `--replacements` it also reports identical / near-identical curated lists in the
+replacement catalogs (`tag_catalogs/`), which are the usual source of copied subtrees.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from atomic_output import OutputWriter
+
+DAG_VERSION = 1
+
+Entry = List[Any]
+
+
+class TagTreeDag:
+    def __init__(self) -> None:
+        self.nodes: List[Entry] = []
+        self.roots: List[int] = []
+        self.sizes: List[int] = []  # subtree size (nodes) per DAG entry
+        self.uses: List[int] = []  # how many tree positions point at each entry
+        self.first_path: List[str] = []
+        self.tree_nodes = 0
+        self._ids: Dict[Tuple[Any, ...], int] = {}
+
+    def add_root(self, root: Dict[str, Any]) -> int:
+        # Iterative postorder: a node is interned once all its children have ids.
+        stack: List[Tuple[Dict[str, Any], str, bool]] = [(root, "", False)]
+        done: List[List[int]] = [[]]
+        while stack:
+            node_obj, parent_path, expanded = stack.pop()
+            title = node_obj.get("title") or ""
+            path = f"{parent_path}/{title}" if parent_path else title
+            if not expanded:
+                stack.append((node_obj, parent_path, True))
+                done.append([])
+                children = node_obj.get("children")
+                if isinstance(children, list):
+                    for ch in reversed(children):
+                        if isinstance(ch, dict):
+                            stack.append((ch, path, False))
+                continue
+
+            child_ids = done.pop()
+            has_children = isinstance(node_obj.get("children"), list)
+            # A non-list `children` is kept as an ordinary field so it round-trips too.
+            extras = {k: v for k, v in node_obj.items() if k != "title" and (k != "children" or not has_children)}
+            extras_key = json.dumps(extras, ensure_ascii=False, sort_keys=True) if extras else ""
+            key = (title, tuple(child_ids) if has_children else None, extras_key)
+            idx = self._ids.get(key)
+            if idx is None:
+                idx = len(self.nodes)
+                self._ids[key] = idx
+                entry: Entry = [title]
+                if has_children or extras:
+                    entry.append(child_ids if has_children else None)
+                if extras:
+                    entry.append(extras)
+                self.nodes.append(entry)
+                self.sizes.append(1 + sum(self.sizes[c] for c in child_ids))
+                self.uses.append(0)
+                self.first_path.append(path)
+            self.uses[idx] += 1
+            self.tree_nodes += 1
+            done[-1].append(idx)
+
+        root_id = done.pop()[0]
+        self.roots.append(root_id)
+        return root_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": DAG_VERSION, "nodes": self.nodes, "roots": self.roots}
+
+    def shared_subtrees(self, min_size: int = 2) -> List[int]:
+        """DAG entries with at least `min_size` nodes that appear more than once, biggest saving first."""
+        ids = [i for i in range(len(self.nodes)) if self.uses[i] > 1 and self.sizes[i] >= min_size]
+        ids.sort(key=lambda i: (self.uses[i] - 1) * self.sizes[i], reverse=True)
+        return ids
+
+
+def expand_dag(dag: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of `TagTreeDag.to_dict()`: rebuild the nested tree (shared entries are copied)."""
+    nodes = dag["nodes"]
+    built: List[Dict[str, Any]] = []
+    for entry in nodes:
+        n: Dict[str, Any] = {"title": entry[0]}
+        if len(entry) > 2:
+            n.update(entry[2])
+        if len(entry) > 1 and entry[1] is not None:
+            n["children"] = [_copy(built[c]) for c in entry[1]]
+        built.append(n)
+    return [_copy(built[r]) for r in dag["roots"]]
+
+
+def _copy(n: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(n)
+    if isinstance(out.get("children"), list):
+        out["children"] = [_copy(c) for c in out["children"]]
+    return out
+
+
+def compare_replacements(threshold: float) -> List[Tuple[float, Tuple[str, ...], Tuple[str, ...]]]:
+    """Pairs of catalog entries whose title sets overlap by at least `threshold` (Jaccard)."""
+    from replacement_catalog import get_catalog
+
+    entries = get_catalog().entries()
+    keys = list(entries)
+    titles = [frozenset((n.get("title") or "").strip() for n in entries[k]) for k in keys]
+    pairs = []
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            a, b = titles[i], titles[j]
+            if not a or not b:
+                continue
+            score = len(a & b) / len(a | b)
+            if score >= threshold:
+                pairs.append((score, keys[i], keys[j]))
+    pairs.sort(key=lambda p: p[0], reverse=True)
+    return pairs
+
+
+def _json_size(obj: Any, **kwargs: Any) -> int:
+    return len(json.dumps(obj, ensure_ascii=False, **kwargs).encode("utf-8"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", default=None, help="Tag tree JSON (default: 题型知识点标签.json)")
+    parser.add_argument("--out", default=None, help="Write the deduplicated DAG JSON here")
+    parser.add_argument("--top", type=int, default=10, help="How many shared subtrees to list")
+    parser.add_argument("--min-size", type=int, default=2, help="Ignore shared subtrees smaller than this")
+    parser.add_argument(
+        "--replacements",
+        type=float,
+        nargs="?",
+        const=0.8,
+        default=None,
+        metavar="JACCARD",
+        help="Also compare catalog replacement lists; report pairs at or above this overlap (default 0.8)",
+    )
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    src = Path(args.input) if args.input else (root / "题型知识点标签.json")
+    tree = json.loads(src.resolve().read_text(encoding="utf-8"))
+    if not isinstance(tree, list):
+        print("Expected top-level JSON array", file=sys.stderr)
+        return 2
+
+    dag = TagTreeDag()
+    for n in tree:
+        if isinstance(n, dict):
+            dag.add_root(n)
+    out = dag.to_dict()
+
+    pretty = _json_size(tree, indent=2) + 1
+    compact = _json_size(tree, separators=(",", ":"))
+    dag_size = _json_size(out, separators=(",", ":"))
+    print(f"tree nodes={dag.tree_nodes} dag nodes={len(dag.nodes)} shared_subtrees={len(dag.shared_subtrees(args.min_size))}")
+    print(
+        f"bytes pretty={pretty} compact={compact} dag={dag_size} "
+        f"saved_vs_compact={compact - dag_size} ({(compact - dag_size) / max(compact, 1):.1%})"
+    )
+    for i in dag.shared_subtrees(args.min_size)[: args.top]:
+        print(f"  x{dag.uses[i]} size={dag.sizes[i]} {dag.first_path[i]}")
+
+    if args.replacements is not None:
+        pairs = compare_replacements(args.replacements)
+        print(f"replacement pairs >= {args.replacements:.2f}: {len(pairs)}")
+        for score, a, b in pairs[: args.top]:
+            print(f"  {score:.2f} {'/'.join(a)} ~ {'/'.join(b)}")
+
+    if args.out:
+        writer = OutputWriter()
+        writer.write_text(args.out, json.dumps(out, ensure_ascii=False, separators=(",", ":")) + "\n")
+        print(writer.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
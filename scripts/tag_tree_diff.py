@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Diff two versions of a tag tree and apply the resulting patch (delta sync for clients).
+
+Node identity is the title path, the same identity `createIdFromPath` in stores/tagTree.ts hashes
+into tag ids. Sibling titles must be unique, which `merge_children` guarantees for generated trees.
+
+Matching runs in three passes, all linear or close to it:
+  1. identical paths;
+  2. top-down over the remaining new nodes: same title under the matched parent (descendants of a
+     renamed/moved node), then an identical unmatched subtree anywhere (move), then a sibling with
+     the same children or at the same position under the matched parent (rename);
+  3. whatever is still unmatched is an insert (new side) or a remove (old side).
+
+Patch ops (old nodes are addressed by old path, `id` is its `createIdFromPath`):
+
+    {"op": "remove", "path", "id"}
+    {"op": "rename", "path", "id", "title"}
+    {"op": "set", "path", "id", "fields"}                  non-title/children fields of the node
+    {"op": "move", "path", "id", "parent"|"parent_insert", "index"}
+    {"op": "insert", "ref", "parent"|"parent_insert", "index", "node"}
+
+`parent` is an old path (null for the top level); `parent_insert` is the `ref` of a node created
+by an earlier insert. `index` is the position among the parent's children in the new tree.
+Siblings that keep their relative order (longest increasing run) do not get a move op.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from expand_knowledge_tags import create_id_from_path
+
+ROOT = -1
+_BASE_KEYS = frozenset(("title", "children"))
+
+
+class _Flat:
+    """Preorder flattening of a tag forest with parent links, paths and subtree hashes."""
+
+    def __init__(self, tree: List[Dict[str, Any]]) -> None:
+        self.nodes: List[Dict[str, Any]] = []
+        self.titles: List[str] = []
+        self.parent: List[int] = []
+        self.children: List[List[int]] = []
+        self.paths: List[str] = []
+        self.roots: List[int] = []
+        self.by_path: Dict[str, int] = {}
+
+        stack: List[Tuple[Dict[str, Any], int]] = [(n, ROOT) for n in reversed(tree) if isinstance(n, dict)]
+        while stack:
+            node_obj, parent = stack.pop()
+            i = len(self.nodes)
+            title = node_obj.get("title") or ""
+            path = title if parent == ROOT else f"{self.paths[parent]}/{title}"
+            if path in self.by_path:
+                raise ValueError(f"duplicate sibling title at {path!r}; paths must be unique")
+            self.by_path[path] = i
+            self.nodes.append(node_obj)
+            self.titles.append(title)
+            self.parent.append(parent)
+            self.children.append([])
+            self.paths.append(path)
+            (self.roots if parent == ROOT else self.children[parent]).append(i)
+            kids = node_obj.get("children")
+            if isinstance(kids, list):
+                for ch in reversed(kids):
+                    if isinstance(ch, dict):
+                        stack.append((ch, i))
+
+        n = len(self.nodes)
+        self.size = [1] * n
+        self.hash: List[bytes] = [b""] * n
+        self.shape: List[bytes] = [b""] * n  # hash of the children only (ignores the node's own title)
+        for i in range(n - 1, -1, -1):
+            kids = self.children[i]
+            h = hashlib.blake2b(digest_size=16)
+            for c in kids:
+                self.size[i] += self.size[c]
+                h.update(self.hash[c])
+            self.shape[i] = h.digest()
+            h.update(b"\0" + self.titles[i].encode("utf-8") + b"\0" + _extras_key(self.nodes[i]).encode("utf-8"))
+            self.hash[i] = h.digest()
+
+    def siblings(self, i: int) -> List[int]:
+        p = self.parent[i]
+        return self.roots if p == ROOT else self.children[p]
+
+
+def _extras(node_obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in node_obj.items() if k not in ("title", "children")}
+
+
+def _extras_key(node_obj: Dict[str, Any]) -> str:
+    if node_obj.keys() <= _BASE_KEYS:
+        return ""
+    return json.dumps(_extras(node_obj), ensure_ascii=False, sort_keys=True)
+
+
+def _title_overlap(old: _Flat, i: int, new: _Flat, j: int) -> float:
+    a = {old.titles[c] for c in old.children[i]}
+    b = {new.titles[c] for c in new.children[j]}
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _lis_keep(seq: List[int]) -> set:
+    """Positions in `seq` forming a longest strictly increasing subsequence (patience sorting)."""
+    if all(a < b for a, b in zip(seq, seq[1:])):
+        return set(range(len(seq)))
+    tails: List[int] = []
+    tails_pos: List[int] = []
+    prev = [-1] * len(seq)
+    for pos, v in enumerate(seq):
+        k = bisect.bisect_left(tails, v)
+        if k == len(tails):
+            tails.append(v)
+            tails_pos.append(pos)
+        else:
+            tails[k] = v
+            tails_pos[k] = pos
+        prev[pos] = tails_pos[k - 1] if k else -1
+    keep = set()
+    pos = tails_pos[-1] if tails_pos else -1
+    while pos >= 0:
+        keep.add(pos)
+        pos = prev[pos]
+    return keep
+
+
+def diff_trees(old_tree: List[Dict[str, Any]], new_tree: List[Dict[str, Any]]) -> Dict[str, Any]:
+    old = _Flat(old_tree)
+    new = _Flat(new_tree)
+    n_old, n_new = len(old.nodes), len(new.nodes)
+    to_old = [-1] * n_new
+    to_new = [-1] * n_old
+
+    def pair(j: int, i: int) -> None:
+        to_old[j] = i
+        to_new[i] = j
+
+    # Pass 1: identical paths.
+    for j, path in enumerate(new.paths):
+        i = old.by_path.get(path)
+        if i is not None:
+            pair(j, i)
+
+    by_hash: Dict[bytes, List[int]] = {}
+    by_shape: Dict[Tuple[int, bytes], List[int]] = {}
+    for i in range(n_old):
+        if to_new[i] < 0:
+            by_hash.setdefault(old.hash[i], []).append(i)
+            if old.children[i]:
+                by_shape.setdefault((old.parent[i], old.shape[i]), []).append(i)
+
+    def take(candidates: Optional[List[int]], j: int, whole_subtree: bool) -> int:
+        while candidates:
+            i = candidates.pop()
+            if to_new[i] >= 0:
+                continue
+            if whole_subtree and any(to_new[i + k] >= 0 or to_old[j + k] >= 0 for k in range(old.size[i])):
+                continue
+            return i
+        return -1
+
+    # Pass 2: top-down, so a node's parent is always decided before the node itself.
+    for j in range(n_new):
+        if to_old[j] >= 0:
+            continue
+        p = new.parent[j]
+        po = ROOT if p == ROOT else to_old[p]
+        parent_known = p == ROOT or po >= 0
+
+        if parent_known:
+            i = old.by_path.get(new.titles[j] if po == ROOT else f"{old.paths[po]}/{new.titles[j]}", -1)
+            if i >= 0 and to_new[i] < 0:
+                pair(j, i)
+                continue
+
+        i = take(by_hash.get(new.hash[j]), j, whole_subtree=True)
+        if i >= 0:
+            for k in range(old.size[i]):
+                pair(j + k, i + k)
+            continue
+
+        if parent_known:
+            i = -1
+            if new.children[j]:
+                i = take(by_shape.get((po, new.shape[j])), j, whole_subtree=False)
+            if i < 0:
+                old_sibs = old.roots if po == ROOT else old.children[po]
+                idx = _index_of(new, j)
+                if idx < len(old_sibs):
+                    c = old_sibs[idx]
+                    both_leaves = not old.children[c] and not new.children[j]
+                    if to_new[c] < 0 and (both_leaves or _title_overlap(old, c, new, j) >= 0.5):
+                        i = c
+            if i >= 0:
+                pair(j, i)
+
+    # Emit ops.
+    ops: List[Dict[str, Any]] = []
+    for i in range(n_old):
+        if to_new[i] < 0 and (old.parent[i] == ROOT or to_new[old.parent[i]] >= 0):
+            ops.append({"op": "remove", "path": old.paths[i], "id": create_id_from_path(old.paths[i])})
+    for j in range(n_new):
+        i = to_old[j]
+        if i < 0:
+            continue
+        if new.titles[j] != old.titles[i]:
+            ops.append(
+                {"op": "rename", "path": old.paths[i], "id": create_id_from_path(old.paths[i]), "title": new.titles[j]}
+            )
+        if _extras_key(new.nodes[j]) != _extras_key(old.nodes[i]):
+            ops.append(
+                {"op": "set", "path": old.paths[i], "id": create_id_from_path(old.paths[i]), "fields": _extras(new.nodes[j])}
+            )
+
+    pure = [True] * n_new  # subtree contains no matched node: shipped whole inside one insert
+    for j in range(n_new - 1, -1, -1):
+        if to_old[j] >= 0:
+            pure[j] = False
+        if not pure[j] and new.parent[j] != ROOT:
+            pure[new.parent[j]] = False
+
+    insert_ref: Dict[int, int] = {}
+    for parent in [ROOT] + list(range(n_new)):
+        kids = new.roots if parent == ROOT else new.children[parent]
+        if not kids or (parent != ROOT and to_old[parent] < 0 and pure[parent]):
+            continue
+        if parent == ROOT:
+            target: Dict[str, Any] = {"parent": None}
+            old_parent = ROOT
+        elif to_old[parent] >= 0:
+            target = {"parent": old.paths[to_old[parent]]}
+            old_parent = to_old[parent]
+        else:
+            target = {"parent_insert": insert_ref[parent]}
+            old_parent = None
+
+        stayed = [pos for pos, c in enumerate(kids) if to_old[c] >= 0 and old_parent is not None and old.parent[to_old[c]] == old_parent]
+        order = {c: k for k, c in enumerate(old.roots if old_parent == ROOT else old.children[old_parent])} if stayed else {}
+        keep = {stayed[k] for k in _lis_keep([order[to_old[kids[pos]]] for pos in stayed])}
+
+        for pos, c in enumerate(kids):
+            i = to_old[c]
+            if i >= 0:
+                if pos not in keep:
+                    ops.append({"op": "move", "path": old.paths[i], "id": create_id_from_path(old.paths[i]), **target, "index": pos})
+                continue
+            ref = len(insert_ref)
+            insert_ref[c] = ref
+            payload = json.loads(json.dumps(new.nodes[c])) if pure[c] else {"title": new.titles[c], **_extras(new.nodes[c])}
+            ops.append({"op": "insert", "ref": ref, **target, "index": pos, "node": payload})
+
+    return {"version": 1, "ops": ops}
+
+
+def _index_of(flat: _Flat, j: int) -> int:
+    # Sibling lists are in preorder, i.e. ascending, so the position is a binary search.
+    sibs = flat.siblings(j)
+    lo, hi = 0, len(sibs) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if sibs[mid] < j:
+            lo = mid + 1
+        elif sibs[mid] > j:
+            hi = mid - 1
+        else:
+            return mid
+    raise ValueError("node not found among its siblings")
+
+
+def apply_patch(tree: List[Dict[str, Any]], patch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply `patch` to `tree` in place and return it."""
+    by_path: Dict[str, Dict[str, Any]] = {}
+    parent_of: Dict[int, Optional[Dict[str, Any]]] = {}
+    stack: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], str]] = [(n, None, "") for n in tree if isinstance(n, dict)]
+    while stack:
+        node_obj, parent, parent_path = stack.pop()
+        title = node_obj.get("title") or ""
+        path = f"{parent_path}/{title}" if parent is not None else title
+        by_path[path] = node_obj
+        parent_of[id(node_obj)] = parent
+        for ch in node_obj.get("children") or []:
+            if isinstance(ch, dict):
+                stack.append((ch, node_obj, path))
+
+    detached: set = set()
+    touched: Dict[int, Optional[Dict[str, Any]]] = {}
+    inserted: Dict[int, Dict[str, Any]] = {}
+    attach: Dict[Any, List[Tuple[int, Dict[str, Any]]]] = {}
+
+    def container_key(op: Dict[str, Any]) -> Any:
+        if "parent_insert" in op:
+            return ("insert", op["parent_insert"])
+        return ("old", op["parent"]) if op["parent"] is not None else ("root",)
+
+    for op in patch.get("ops") or []:
+        kind = op["op"]
+        if kind == "insert":
+            n = json.loads(json.dumps(op["node"]))
+            inserted[op["ref"]] = n
+            attach.setdefault(container_key(op), []).append((op["index"], n))
+            continue
+        node_obj = by_path[op["path"]]
+        if kind == "rename":
+            node_obj["title"] = op["title"]
+        elif kind == "set":
+            for k in [k for k in node_obj if k not in ("title", "children")]:
+                del node_obj[k]
+            node_obj.update(op["fields"])
+        elif kind in ("remove", "move"):
+            detached.add(id(node_obj))
+            parent = parent_of[id(node_obj)]
+            touched[id(parent)] = parent
+            if kind == "move":
+                attach.setdefault(container_key(op), []).append((op["index"], node_obj))
+        else:
+            raise ValueError(f"unknown patch op {kind!r}")
+
+    for parent in touched.values():
+        kids = tree if parent is None else parent.get("children") or []
+        kids[:] = [c for c in kids if id(c) not in detached]
+
+    for key, items in attach.items():
+        if key[0] == "root":
+            parent = None
+            kids = tree
+        else:
+            parent = inserted[key[1]] if key[0] == "insert" else by_path[key[1]]
+            kids = parent.setdefault("children", [])
+        items.sort(key=lambda it: it[0])
+        merged: List[Dict[str, Any]] = []
+        rest = iter(kids[:])
+        for index, n in items:
+            while len(merged) < index:
+                merged.append(next(rest))
+            merged.append(n)
+        merged.extend(rest)
+        kids[:] = merged
+
+    for parent in list(touched.values()) + [by_path[k[1]] for k in attach if k[0] == "old"]:
+        if parent is not None and not parent.get("children"):
+            parent.pop("children", None)
+    return tree
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old", help="Old tag tree JSON")
+    parser.add_argument("new", help="New tag tree JSON, or a patch file with --apply")
+    parser.add_argument("-o", "--out", default=None, help="Write the patch (or the patched tree with --apply) here")
+    parser.add_argument("--apply", action="store_true", help="Apply the patch in NEW to OLD instead of diffing")
+    args = parser.parse_args()
+
+    old_tree = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    second = json.loads(Path(args.new).read_text(encoding="utf-8"))
+
+    if args.apply:
+        out = apply_patch(old_tree, second)
+        text = json.dumps(out, ensure_ascii=False, indent=2) + "\n"
+    else:
+        try:
+            out = diff_trees(old_tree, second)
+        except ValueError as exc:
+            print(str(exc), file=sys.stderr)
+            return 2
+        counts: Dict[str, int] = {}
+        for op in out["ops"]:
+            counts[op["op"]] = counts.get(op["op"], 0) + 1
+        print("ops " + " ".join(f"{k}={counts.get(k, 0)}" for k in ("insert", "remove", "rename", "move", "set")))
+        text = json.dumps(out, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    elif args.apply:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
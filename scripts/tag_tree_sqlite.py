@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Export a (transformed) tag tree into a local SQLite database for analytics.
+
+Tables:
+    nodes(id, tag_id, parent, root, depth, title, path, lft, rgt)
+        `id` is the preorder number and [lft, rgt] the Euler-tour interval of the subtree, so
+        "is X under Y" is `x.id BETWEEN y.lft AND y.rgt` (lft == id) and a subtree is one rowid
+        range scan. `tag_id` is `createIdFromPath` (or an explicit `id`), `path` the
+        `buildTagIndex` path.
+    titles(id, title)                            distinct titles (a tree repeats most of them)
+    closure(ancestor, descendant, distance)      only with --closure (O(nodes * depth) rows)
+    titles_fts(title)                            FTS5 over `titles`, trigram tokenizer when SQLite has it
+    meta(key, value)
+
+Examples:
+    -- all descendants of 语法/初中
+    SELECT d.path FROM nodes a JOIN nodes d ON d.id BETWEEN a.lft + 1 AND a.rgt
+    WHERE a.path = '知识点标签/语法/初中';
+    -- which root a leaf belongs to
+    SELECT r.title FROM nodes n JOIN nodes r ON r.id = n.root WHERE n.tag_id = ?;
+    -- title substring search (trigram, 3+ characters)
+    SELECT n.path FROM titles_fts f JOIN nodes n ON n.title = f.title WHERE titles_fts MATCH '动词短';
+    -- title prefix of any length: a range scan on the nodes_title index
+    SELECT path FROM nodes WHERE title GLOB '语法*';
+    -- substrings shorter than 3 characters cannot use the trigram index; LIKE scans `titles`,
+    -- which only holds the distinct titles, then joins back through nodes_title
+    SELECT n.path FROM titles t JOIN nodes n ON n.title = t.title WHERE t.title LIKE '%语%';
+
+The database is built in one transaction in a temp file and renamed over the target.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from expand_knowledge_tags import id_hash, id_hash_step
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE nodes (
+    id INTEGER PRIMARY KEY,
+    tag_id TEXT NOT NULL,
+    parent INTEGER REFERENCES nodes(id),
+    root INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    path TEXT NOT NULL,
+    lft INTEGER NOT NULL,
+    rgt INTEGER NOT NULL
+);
+CREATE TABLE titles (id INTEGER PRIMARY KEY, title TEXT NOT NULL);
+"""
+
+INDEXES = """
+CREATE INDEX nodes_tag_id ON nodes(tag_id);
+CREATE INDEX nodes_path ON nodes(path);
+CREATE INDEX nodes_parent ON nodes(parent);
+CREATE INDEX nodes_title ON nodes(title);
+"""
+
+Row = Tuple[int, str, Optional[int], int, int, str, str, int, int]
+
+
+def flatten(tree: List[Dict[str, Any]]) -> List[Row]:
+    """Preorder rows with Euler-tour intervals, in the column order of `nodes`."""
+    # (tag_id, parent, root, depth, title, path, id-path hash) per node, in preorder. The
+    # createIdFromPath hash of a child continues from its parent's with one multiply-add.
+    nodes: List[Tuple[str, Optional[int], int, int, str, str, int]] = []
+    steps: Dict[str, Tuple[int, int]] = {}  # title -> djb2 step over "/" + title; titles repeat a lot
+    stack: List[Tuple[Dict[str, Any], int]] = [(n, -1) for n in reversed(tree) if isinstance(n, dict)]
+    while stack:
+        node_obj, parent = stack.pop()
+        i = len(nodes)
+        title = (node_obj.get("title") or "").strip()
+        if parent < 0:
+            h = id_hash(title)
+            nodes.append((node_obj.get("id") or f"t_{h:x}", None, i, 0, title, title, h))
+        else:
+            _, _, root, depth, _, parent_path, parent_h = nodes[parent]
+            step = steps.get(title)
+            if step is None:
+                step = steps[title] = id_hash_step("/" + title)
+            h = (parent_h * step[0] + step[1]) & 0xFFFFFFFF
+            path = f"{parent_path}/{title}" if parent_path and title else (parent_path or title)
+            nodes.append((node_obj.get("id") or f"t_{h:x}", parent, root, depth + 1, title, path, h))
+        children = node_obj.get("children")
+        if isinstance(children, list):
+            for ch in reversed(children):
+                if isinstance(ch, dict):
+                    stack.append((ch, i))
+
+    # Preorder: every subtree is contiguous, so rgt is the largest rgt among the children.
+    rgt = list(range(len(nodes)))
+    for i in range(len(nodes) - 1, -1, -1):
+        parent = nodes[i][1]
+        if parent is not None and rgt[i] > rgt[parent]:
+            rgt[parent] = rgt[i]
+    return [(i, *node[:6], i, rgt[i]) for i, node in enumerate(nodes)]
+
+
+def _fts_tokenizer(conn: sqlite3.Connection) -> Optional[str]:
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute(f"CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='{tokenizer}')")
+        except sqlite3.OperationalError:
+            continue
+        conn.execute("DROP TABLE temp.fts_probe")
+        return tokenizer
+    return None
+
+
+def export(tree: List[Dict[str, Any]], dest: Path, closure: bool = False, source: str = "") -> Dict[str, Any]:
+    rows = flatten(tree)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=".tmp", dir=str(dest.parent))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_name, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            tokenizer = _fts_tokenizer(conn)
+            conn.execute("BEGIN")
+            # executescript() would commit; run statements one by one to stay in a single transaction.
+            for stmt in SCHEMA.split(";"):
+                if stmt.strip():
+                    conn.execute(stmt)
+            conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            titles = dict.fromkeys(row[5] for row in rows)
+            conn.executemany("INSERT INTO titles(title) VALUES (?)", ((t,) for t in titles))
+            for stmt in INDEXES.split(";"):
+                if stmt.strip():
+                    conn.execute(stmt)
+
+            closure_rows = 0
+            if closure:
+                conn.execute(
+                    "CREATE TABLE closure (ancestor INTEGER NOT NULL, descendant INTEGER NOT NULL, "
+                    "distance INTEGER NOT NULL, PRIMARY KEY (ancestor, descendant)) WITHOUT ROWID"
+                )
+                conn.execute(
+                    "INSERT INTO closure SELECT a.id, d.id, d.depth - a.depth FROM nodes a "
+                    "JOIN nodes d ON d.id BETWEEN a.lft AND a.rgt"
+                )
+                conn.execute("CREATE INDEX closure_descendant ON closure(descendant)")
+                closure_rows = conn.execute("SELECT count(*) FROM closure").fetchone()[0]
+
+            if tokenizer:
+                # Indexing distinct titles rather than nodes keeps the FTS build proportional to
+                # the vocabulary, not the tree.
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE titles_fts USING fts5(title, content='titles', "
+                    f"content_rowid='id', tokenize='{tokenizer}')"
+                )
+                conn.execute("INSERT INTO titles_fts(rowid, title) SELECT id, title FROM titles")
+
+            meta = {
+                "version": "1",
+                "source": source,
+                "node_count": str(len(rows)),
+                "title_count": str(len(titles)),
+                "fts_tokenizer": tokenizer or "",
+                "closure": "1" if closure else "0",
+            }
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", sorted(meta.items()))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        os.replace(tmp_name, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    return {"nodes": len(rows), "closure_rows": closure_rows, "fts": tokenizer}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", default=None, help="Tag tree JSON (default: 题型知识点标签.json)")
+    parser.add_argument("--out", default=None, help="SQLite file to (re)build (default: <input>.sqlite)")
+    parser.add_argument("--closure", action="store_true", help="Also materialize the ancestor/descendant closure table")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    src = (Path(args.input) if args.input else (root / "题型知识点标签.json")).resolve()
+    tree = json.loads(src.read_text(encoding="utf-8"))
+    if not isinstance(tree, list):
+        print("Expected top-level JSON array", file=sys.stderr)
+        return 2
+
+    dest = Path(args.out).resolve() if args.out else src.with_suffix(".sqlite")
+    t0 = time.perf_counter()
+    info = export(tree, dest, closure=args.closure, source=src.name)
+    print(
+        f"wrote {dest} nodes={info['nodes']} closure_rows={info['closure_rows']} "
+        f"fts={info['fts'] or 'unavailable'} in {(time.perf_counter() - t0) * 1000:.0f}ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Validate a question bank in bulk: every question in a directory of JSON files, in a process
+pool, with one JSONL result line per question.
+
+The checks are those of `validateQuestionBeforeSave` in
+`domain/question/validators/listeningChoiceValidator.ts` (same codes, paths and messages):
+intro title/text, groups, subQuestions, stems, option count and keys, answers. An import
+also needs audio and countdown blocks the player can use, which the editor does not check at
+save time; those are reported as warnings (codes `audio_*`, `countdown_*`, `group_seconds_*`),
+so `ok` still means "the editor would save this".
+
+Like the editor, only `listening_choice` questions are checked by default; anything else is
+ok. `listening_demo` (听力demo.json) carries the same content shape but the editor saves it
+unchecked, so applying the rules to it is opt-in:
+
+    python3 scripts/validate_question_bank.py banks/ --types listening_choice,listening_demo
+
+A file may hold one question object or a list of them. Output, one line per question, in
+input order:
+
+    {"file": "bank/unit1.json", "index": 0, "id": "q1", "type": "listening_choice", "ok": false,
+     "errors": [{"code": "groups_required", "path": "content.groups", "message": "..."}],
+     "warnings": [], "diagnostics": {"questionType": "listening_choice", "groupCount": 0}}
+
+Lines are written and flushed file by file, and only a bounded number of files is in flight,
+so memory stays flat and the report can be tailed while the run is going. A summary goes to
+stderr at the end; the exit status is 1 if any question failed.
+
+    python3 scripts/validate_question_bank.py banks/ --out report.jsonl
+    python3 scripts/validate_question_bank.py banks/ --only-failed | jq -r .file
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# validateQuestionBeforeSave only checks `listening_choice`; everything else saves as is.
+DEFAULT_TYPES = ("listening_choice",)
+
+Issue = Dict[str, str]
+
+
+def _issue(code: str, path: str, message: str) -> Issue:
+    return {"code": code, "path": path, "message": message}
+
+
+def _array(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else []
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _js_string(value: Any) -> str:
+    """JavaScript String(value) for a JSON value."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, dict):
+        return "[object Object]"
+    if isinstance(value, list):
+        return ",".join("" if v is None else _js_string(v) for v in value)
+    return str(value)
+
+
+def _js_str(value: Any) -> str:
+    """String(value || ''): JS truthiness, so {} and [] count but 0 and "" do not."""
+    if value is None or value is False or value == "" or (_is_number(value) and value == 0):
+        return ""
+    return _js_string(value)
+
+
+def has_rich_text_content(value: Any) -> bool:
+    if not isinstance(value, dict):
+        return False
+    if value.get("type") != "richtext" or not isinstance(value.get("content"), list):
+        return False
+    for node in value["content"]:
+        if not isinstance(node, dict):
+            continue
+        if node.get("type") == "text" and _js_str(node.get("text")).strip():
+            return True
+        if node.get("type") == "image" and _js_str(node.get("url")).strip():
+            return True
+    return False
+
+
+def _check_audio(audio: Any, path: str, warnings: List[Issue], label: str, need_url: bool = False) -> None:
+    if audio is None:
+        if need_url:
+            warnings.append(_issue("audio_url_missing", path, f"{label}未配置音频。"))
+        return
+    if not isinstance(audio, dict) or not isinstance(audio.get("url", ""), str):
+        warnings.append(_issue("audio_invalid", path, f"{label}音频配置格式不正确。"))
+        return
+    if need_url and not audio.get("url", "").strip():
+        warnings.append(_issue("audio_url_missing", f"{path}.url", f"{label}音频地址为空。"))
+    play_count = audio.get("playCount")
+    if play_count is not None and not (_is_number(play_count) and play_count >= 1 and float(play_count).is_integer()):
+        warnings.append(_issue("audio_play_count_invalid", f"{path}.playCount", f"{label}播放次数应为正整数。"))
+
+
+def _check_countdown(countdown: Any, path: str, warnings: List[Issue]) -> None:
+    if countdown is None:
+        return
+    if not isinstance(countdown, dict):
+        warnings.append(_issue("countdown_invalid", path, "倒计时配置格式不正确。"))
+        return
+    seconds = countdown.get("seconds")
+    if not _is_number(seconds) or seconds <= 0:
+        warnings.append(_issue("countdown_seconds_invalid", f"{path}.seconds", "倒计时秒数应为正数。"))
+    beep = countdown.get("endBeepUrl")
+    if beep is not None and not isinstance(beep, str):
+        warnings.append(_issue("countdown_end_beep_invalid", f"{path}.endBeepUrl", "倒计时结束提示音地址格式不正确。"))
+
+
+def _validate_listening_choice(question: Dict[str, Any]) -> Dict[str, Any]:
+    errors: List[Issue] = []
+    warnings: List[Issue] = []
+    content = question.get("content") if isinstance(question.get("content"), dict) else {}
+
+    intro = content.get("intro") if isinstance(content.get("intro"), dict) else {}
+    if not _js_str(intro.get("title")).strip():
+        errors.append(_issue("intro_title_required", "content.intro.title", "题目标题为必填项。"))
+    if not has_rich_text_content(intro.get("text")):
+        warnings.append(_issue("intro_text_empty", "content.intro.text", "说明文字为空，建议补充。"))
+    _check_audio(intro.get("audio"), "content.intro.audio", warnings, "说明")
+    _check_countdown(intro.get("countdown"), "content.intro.countdown", warnings)
+
+    groups = _array(content.get("groups"))
+    if not groups:
+        errors.append(_issue("groups_required", "content.groups", "至少需要一个题组。"))
+
+    for g_index, group in enumerate(groups):
+        group_path = f"content.groups[{g_index}]"
+        g = g_index + 1
+        group = group if isinstance(group, dict) else {}
+        _check_audio(group.get("audio"), f"{group_path}.audio", warnings, f"题组 {g} ", need_url=True)
+        _check_audio(group.get("descriptionAudio"), f"{group_path}.descriptionAudio", warnings, f"题组 {g} 说明")
+        for key in ("prepareSeconds", "answerSeconds"):
+            value = group.get(key)
+            if value is not None and not (_is_number(value) and value >= 0):
+                warnings.append(_issue("group_seconds_invalid", f"{group_path}.{key}", f"题组 {g} 的时长应为非负数。"))
+
+        sub_questions = _array(group.get("subQuestions"))
+        if not sub_questions:
+            errors.append(_issue("sub_questions_required", f"{group_path}.subQuestions", f"题组 {g} 至少需要一道小题。"))
+            continue
+
+        for sq_index, sq in enumerate(sub_questions):
+            sq_path = f"{group_path}.subQuestions[{sq_index}]"
+            where = f"题组 {g} 第 {sq_index + 1} 题"
+            sq = sq if isinstance(sq, dict) else {}
+            if not has_rich_text_content(sq.get("stem")):
+                errors.append(_issue("sub_question_stem_required", f"{sq_path}.stem", f"{where}题干不能为空。"))
+
+            options = _array(sq.get("options"))
+            if len(options) < 2:
+                errors.append(_issue("sub_question_options_too_few", f"{sq_path}.options", f"{where}至少需要两个选项。"))
+
+            option_keys = [k for k in (_js_str(o.get("key") if isinstance(o, dict) else None).strip() for o in options) if k]
+            unique_keys = set(option_keys)
+            if len(option_keys) != len(options) or len(unique_keys) != len(option_keys):
+                errors.append(
+                    _issue("sub_question_option_key_invalid", f"{sq_path}.options", f"{where}选项 key 不能为空且不能重复。")
+                )
+
+            answers = [a for a in (_js_str(v).strip() for v in _array(sq.get("answer"))) if a]
+            if not answers:
+                errors.append(_issue("sub_question_answer_required", f"{sq_path}.answer", f"{where}至少需要一个答案。"))
+            else:
+                illegal = [a for a in answers if a not in unique_keys]
+                if illegal:
+                    errors.append(
+                        _issue(
+                            "sub_question_answer_not_in_options",
+                            f"{sq_path}.answer",
+                            f"{where}存在不在选项中的答案：{', '.join(illegal)}。",
+                        )
+                    )
+            _check_audio(sq.get("audio"), f"{sq_path}.audio", warnings, where)
+
+    return {
+        "ok": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "diagnostics": {"questionType": question.get("type"), "groupCount": len(groups)},
+    }
+
+
+def validate_question(question: Any, types: Tuple[str, ...] = DEFAULT_TYPES) -> Dict[str, Any]:
+    """Python counterpart of validateQuestionBeforeSave (plus the audio/countdown warnings)."""
+    if not isinstance(question, (dict, list)):
+        return {"ok": False, "errors": [_issue("question_missing", "", "题目数据为空。")], "warnings": [], "diagnostics": {}}
+    if isinstance(question, dict) and question.get("type") in types:
+        return _validate_listening_choice(question)
+    return {"ok": True, "errors": [], "warnings": [], "diagnostics": {}}
+
+
+def validate_file(path: str, rel: str, types: Tuple[str, ...], only_failed: bool) -> Tuple[str, Counter]:
+    """Validate every question in one file. Returns its JSONL lines and per-file counts."""
+    counts: Counter = Counter(files=1)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        counts.update(questions=1, failed=1, **{"error:file_invalid_json": 1})
+        row = {
+            "file": rel, "index": None, "id": None, "type": None, "ok": False,
+            "errors": [_issue("file_invalid_json", "", f"无法读取 JSON：{exc}")], "warnings": [], "diagnostics": {},
+        }
+        return json.dumps(row, ensure_ascii=False) + "\n", counts
+    questions = data if isinstance(data, list) else [data]
+    lines: List[str] = []
+    for index, question in enumerate(questions):
+        result = validate_question(question, types)
+        counts["questions"] += 1
+        counts["ok" if result["ok"] else "failed"] += 1
+        counts["warned"] += bool(result["warnings"])
+        for issue in result["errors"]:
+            counts[f"error:{issue['code']}"] += 1
+        for issue in result["warnings"]:
+            counts[f"warning:{issue['code']}"] += 1
+        if only_failed and result["ok"]:
+            continue
+        q = question if isinstance(question, dict) else {}
+        row = {"file": rel, "index": index, "id": q.get("id"), "type": q.get("type"), **result}
+        lines.append(json.dumps(row, ensure_ascii=False) + "\n")
+    return "".join(lines), counts
+
+
+def iter_files(inputs: List[Path]) -> Iterator[Tuple[str, str]]:
+    """(path, path relative to its input root) for every *.json under the inputs, sorted."""
+    for root in inputs:
+        if root.is_file():
+            yield str(root), root.name
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if name.endswith(".json") and not name.startswith("."):
+                    path = os.path.join(dirpath, name)
+                    yield path, Path(path).relative_to(root).as_posix()
+
+
+def run(
+    inputs: List[Path], out: IO[str], types: Tuple[str, ...], workers: int, only_failed: bool
+) -> Counter:
+    totals: Counter = Counter()
+    files = iter_files(inputs)
+    n = workers or os.cpu_count() or 1
+    if n == 1:
+        for path, rel in files:
+            lines, counts = validate_file(path, rel, types, only_failed)
+            out.write(lines)
+            out.flush()
+            totals.update(counts)
+        return totals
+    # Keep a bounded window of files in flight and write results in input order.
+    window = n * 4
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        for path, rel in files:
+            pending.append(pool.submit(validate_file, path, rel, types, only_failed))
+            if len(pending) >= window:
+                lines, counts = pending.popleft().result()
+                out.write(lines)
+                out.flush()
+                totals.update(counts)
+        while pending:
+            lines, counts = pending.popleft().result()
+            out.write(lines)
+            out.flush()
+            totals.update(counts)
+    return totals
+
+
+def summarize(totals: Counter, elapsed: float) -> str:
+    issues = sorted(((k, v) for k, v in totals.items() if ":" in k), key=lambda kv: (-kv[1], kv[0]))
+    lines = [
+        f"validate files={totals['files']} questions={totals['questions']} ok={totals['ok']} "
+        f"failed={totals['failed']} with_warnings={totals['warned']} in {elapsed:.1f}s "
+        f"({totals['questions'] / elapsed if elapsed else 0:.0f} questions/s)"
+    ]
+    lines += [f"  {v:>8}  {k}" for k, v in issues[:15]]
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="Question JSON files or directories (searched recursively)")
+    parser.add_argument("--out", default=None, help="JSONL report path (default: stdout)")
+    parser.add_argument(
+        "--types",
+        default=",".join(DEFAULT_TYPES),
+        help="Question types validated as listening choice (default: %(default)s; e.g. add listening_demo)",
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--only-failed", action="store_true", help="Only write lines for questions that fail")
+    args = parser.parse_args()
+
+    inputs = [Path(p) for p in args.inputs]
+    missing = [str(p) for p in inputs if not p.exists()]
+    if missing:
+        parser.error(f"not found: {', '.join(missing)}")
+    types = tuple(t.strip() for t in args.types.split(",") if t.strip())
+
+    t0 = time.perf_counter()
+    out: Optional[IO[str]] = None
+    try:
+        # Written in place, not through OutputWriter: the point is that it can be read mid-run.
+        out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+        totals = run(inputs, out, types, args.workers, args.only_failed)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    print(summarize(totals, time.perf_counter() - t0), file=sys.stderr)
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
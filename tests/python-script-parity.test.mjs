@@ -0,0 +1,123 @@
+import test from 'node:test'
+import assert from 'node:assert/strict'
+import { spawnSync } from 'node:child_process'
+import fs from 'node:fs'
+import os from 'node:os'
+import path from 'node:path'
+import { fileURLToPath } from 'node:url'
+
+// scripts/ ports a few editor functions to Python; these tests hold them to the TS originals.
+
+const root = path.resolve(path.dirname(fileURLToPath(import.meta.url)), '..')
+const TAXONOMIES = ['交互类型.json', '题型交互条件.json', '题型交互标签.json', '题型定位标签.json', '题型知识点标签.json']
+
+function runPython(args, input) {
+  return spawnSync('python3', args, { cwd: root, input, encoding: 'utf8', maxBuffer: 64 << 20 })
+}
+
+function readJson(name) {
+  return JSON.parse(fs.readFileSync(path.join(root, name), 'utf8'))
+}
+
+function idPaths(nodes, parentPath = [], out = []) {
+  for (const node of nodes) {
+    const title = (node.title || '').trim()
+    out.push([...parentPath, title].join('/'))
+    if (Array.isArray(node.children)) idPaths(node.children, [...parentPath, title], out)
+  }
+  return out
+}
+
+function mulberry32(seed) {
+  return () => {
+    seed = (seed + 0x6d2b79f5) | 0
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed)
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296
+  }
+}
+
+function containers(value, out = []) {
+  if (value && typeof value === 'object') {
+    out.push(value)
+    for (const v of Object.values(value)) containers(v, out)
+  }
+  return out
+}
+
+const REPLACEMENT_VALUES = [undefined, null, '', '  ', 'x', 0, 2, -1, [], {}, [{}], { type: 'richtext', content: [] }]
+
+function mutate(question, rand) {
+  const q = structuredClone(question)
+  const count = 1 + Math.floor(rand() * 3)
+  for (let i = 0; i < count; i += 1) {
+    const all = containers(q)
+    const target = all[Math.floor(rand() * all.length)]
+    const keys = Object.keys(target)
+    if (!keys.length) continue
+    const key = keys[Math.floor(rand() * keys.length)]
+    const value = REPLACEMENT_VALUES[Math.floor(rand() * REPLACEMENT_VALUES.length)]
+    if (value === undefined) {
+      if (Array.isArray(target)) target.splice(Number(key), 1)
+      else delete target[key]
+    } else {
+      target[key] = structuredClone(value)
+    }
+  }
+  return q
+}
+
+test('createIdFromPath matches the Python port on every shipped taxonomy path', async () => {
+  const { createIdFromPath } = await import('../stores/tagTree.ts')
+  const paths = ['', '😀 emoji/𠮷', 'x'.repeat(1000)]
+  for (const name of TAXONOMIES) paths.push(...idPaths(readJson(name)))
+
+  const proc = runPython(
+    [
+      '-c',
+      'import json, sys; sys.path.insert(0, "scripts"); from expand_knowledge_tags import create_id_from_path; '
+        + 'print(json.dumps([create_id_from_path(p) for p in json.load(sys.stdin)]))'
+    ],
+    JSON.stringify(paths)
+  )
+  assert.equal(proc.status, 0, proc.stderr)
+  assert.deepEqual(JSON.parse(proc.stdout), paths.map(createIdFromPath))
+})
+
+test('validate_question_bank.py agrees with validateQuestionBeforeSave on fuzzed questions', async () => {
+  const { validateQuestionBeforeSave } = await import('../domain/question/validators/listeningChoiceValidator.ts')
+  const demo = readJson('听力demo.json')
+  const base = { ...demo, type: 'listening_choice' }
+  const rand = mulberry32(20260210)
+
+  const questions = [base, demo]
+  const expected = [validateQuestionBeforeSave(base), validateQuestionBeforeSave(demo)]
+  while (questions.length < 400) {
+    const q = mutate(base, rand)
+    let result
+    try {
+      result = validateQuestionBeforeSave(q)
+    } catch {
+      continue // the editor never saves input it crashes on; nothing to compare
+    }
+    questions.push(q)
+    expected.push(result)
+  }
+
+  const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'qbank-'))
+  try {
+    fs.writeFileSync(path.join(dir, 'bank.json'), JSON.stringify(questions))
+    const report = path.join(dir, 'report.jsonl')
+    const proc = runPython(['scripts/validate_question_bank.py', path.join(dir, 'bank.json'), '--workers', '1', '--out', report])
+    assert.ok(proc.status === 0 || proc.status === 1, proc.stderr)
+    const rows = fs.readFileSync(report, 'utf8').trim().split('\n').map((line) => JSON.parse(line))
+    assert.equal(rows.length, questions.length)
+    rows.forEach((row, i) => {
+      assert.equal(row.index, i)
+      assert.deepEqual({ ok: row.ok, errors: row.errors }, { ok: expected[i].ok, errors: expected[i].errors }, `question ${i}`)
+    })
+    assert.ok(rows.some((row) => row.ok) && rows.some((row) => !row.ok))
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true })
+  }
+})
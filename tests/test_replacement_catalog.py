@@ -0,0 +1,51 @@
+"""Loading and lookup rules of scripts/replacement_catalog.py."""
+
+import json
+import re
+
+import pytest
+
+from replacement_catalog import ReplacementCatalog
+
+
+def write_catalog(tmp_path, entries, name="c.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps({"entries": entries}, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_shipped_catalog_prefers_exact_segments_over_wildcards():
+    catalog = ReplacementCatalog()
+
+    def titles(path):
+        return [n["title"] for n in catalog.lookup(path.split("/"))]
+
+    assert titles("知识点标签/语法/小学/冠词") == ["不定冠词（a, an）", "定冠词（the）", "零冠词"]
+    assert titles("知识点标签/语法/初中/冠词") == ["不定冠词", "定冠词", "零冠词"]
+    assert titles("知识点标签/语法/高中/数词") == ["基数词", "序数词"]
+    assert catalog.lookup(["知识点标签", "语法", "初中"]) is None
+
+
+def test_later_catalog_overrides_the_same_pattern(tmp_path):
+    first = write_catalog(tmp_path, [{"path": ["a", "*"], "children": ["x"]}], "1.json")
+    second = write_catalog(tmp_path, [{"path": ["a", "*"], "children": ["y"]}], "2.json")
+    assert ReplacementCatalog([first, second]).lookup(["a", "b"]) == [{"title": "y"}]
+
+
+def test_nested_children_are_normalized(tmp_path):
+    path = write_catalog(tmp_path, [{"path": ["a"], "children": [{"title": "b", "children": ["c"]}]}])
+    assert ReplacementCatalog([path]).lookup(["a"]) == [{"title": "b", "children": [{"title": "c"}]}]
+
+
+@pytest.mark.parametrize(
+    "children, where",
+    [
+        ([{"title": "b", "children": [{"title": "c"}, {"name": "d"}]}], "entries[0] (a/b): children[0].children[1]"),
+        ([{"title": "b", "children": "c"}], "entries[0] (a/b): children[0].children"),
+        ([7], "entries[0] (a/b): children[0]"),
+    ],
+)
+def test_malformed_nested_children_fail_at_load_with_the_entry_path(tmp_path, children, where):
+    path = write_catalog(tmp_path, [{"path": ["a", "b"], "children": children}])
+    with pytest.raises(ValueError, match=re.escape(where)):
+        ReplacementCatalog([path]).entries()
@@ -0,0 +1,220 @@
+"""Equivalence and round-trip checks for the tag tree scripts in scripts/."""
+
+import copy
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import bench_tag_pipeline as bench
+import expand_knowledge_tags as ekt
+from replacement_catalog import WILDCARD, get_catalog
+from tag_search_index import TagSearchIndex
+from tag_tree_binary import TagTreeReader, encode_tree
+from tag_tree_dag import TagTreeDag, expand_dag
+from tag_tree_diff import apply_patch, diff_trees
+from tag_tree_sqlite import flatten
+
+ROOT = Path(__file__).resolve().parents[1]
+TAXONOMIES = ["交互类型.json", "题型交互条件.json", "题型交互标签.json", "题型定位标签.json", "题型知识点标签.json"]
+
+# Computed with createIdFromPath from stores/tagTree.ts.
+TS_IDS = {
+    "": "t_1505",
+    "a": "t_2b606",
+    "知识点标签": "t_d02587ee",
+    "知识点标签/语法/初中": "t_abfdd6f8",
+    "知识点标签/词汇/小学/知识/固定搭配/动词短语": "t_e53d6eea",
+    "😀 emoji/𠮷": "t_ac1f489e",
+    "x" * 1000: "t_99315ec5",
+}
+
+
+def load(name):
+    return json.loads((ROOT / name).read_text(encoding="utf-8"))
+
+
+def run_transform(fn, tree):
+    tree = copy.deepcopy(tree)
+    stats = ekt.Stats()
+    out = [fn(n, [], stats) for n in tree]
+    return out, (stats.placeholders_found, stats.placeholders_replaced, stats.placeholders_removed)
+
+
+def catalog_tree(rnd):
+    """One branch per catalog entry, each with placeholder rows under the entry's path."""
+    roots = {}
+    for key in get_catalog().entries():
+        titles = [rnd.choice(("小学", "初中", "高中")) if seg == WILDCARD else seg for seg in key]
+        level = roots.setdefault(titles[0], {"title": titles[0], "children": []})
+        for title in titles[1:]:
+            nxt = next((c for c in level["children"] if c["title"] == title), None)
+            if nxt is None:
+                nxt = {"title": title, "children": []}
+                level["children"].append(nxt)
+            level = nxt
+        level["children"].append({"title": bench.placeholder_title(rnd)})
+        level["children"].append({"title": "已有条目"})
+    return list(roots.values())
+
+
+@pytest.mark.parametrize("name", TAXONOMIES)
+def test_transform_matches_recursive_on_shipped_taxonomies(name):
+    tree = load(name)
+    assert run_transform(ekt.transform, tree) == run_transform(bench.recursive_transform, tree)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_transform_matches_recursive_on_generated_trees(seed):
+    rnd = random.Random(seed)
+    trees = [
+        catalog_tree(rnd),
+        bench.generate_tree("balanced", 0, 3, 6, 0.3, seed),
+        bench.generate_tree("wide", 300, 0, 0, 0.5, seed),
+        bench.generate_tree("deep", 200, 0, 0, 0.3, seed),
+    ]
+    for tree in trees:
+        iterative, stats = run_transform(ekt.transform, tree)
+        assert (iterative, stats) == run_transform(bench.recursive_transform, tree)
+    assert stats[0] > 0
+
+
+def test_transform_replaces_placeholders_from_the_catalog():
+    _, (found, replaced, _) = run_transform(ekt.transform, catalog_tree(random.Random(1)))
+    assert found == replaced == len(get_catalog().entries())
+
+
+def test_create_id_from_path_matches_typescript():
+    for path, expected in TS_IDS.items():
+        assert ekt.create_id_from_path(path) == expected
+
+
+def test_id_hash_continues_from_the_parent_state():
+    for path in TS_IDS:
+        head, _, tail = path.rpartition("/")
+        if not head:
+            continue
+        mul, add = ekt.id_hash_step("/" + tail)
+        parent = ekt.id_hash(head)
+        assert ekt.id_hash("/" + tail, parent) == (parent * mul + add) & 0xFFFFFFFF == ekt.id_hash(path)
+
+
+def _titles_only(nodes):
+    out = []
+    for n in nodes:
+        node = {"title": (n.get("title") or "").strip()}
+        children = [c for c in n.get("children") or [] if isinstance(c, dict)]
+        if children:
+            node["children"] = _titles_only(children)
+        out.append(node)
+    return out
+
+
+@pytest.mark.parametrize("name", TAXONOMIES)
+def test_binary_round_trip(name, tmp_path):
+    tree = load(name)
+    path = tmp_path / "tree.bin"
+    path.write_bytes(encode_tree(tree))
+    with TagTreeReader(path) as reader:
+        assert reader.to_json() == _titles_only(tree)
+
+
+@pytest.mark.parametrize("name", TAXONOMIES)
+def test_dag_round_trip(name):
+    tree = load(name)
+    dag = TagTreeDag()
+    for n in tree:
+        dag.add_root(n)
+    assert expand_dag(json.loads(json.dumps(dag.to_dict()))) == tree
+
+
+def test_dag_keeps_explicit_empty_children():
+    tree = [
+        {"title": "a", "children": []},
+        {"title": "a"},
+        {"title": "b", "children": None, "note": 1},
+        {"title": "c", "children": [{"title": "a", "children": []}, {"title": "a"}]},
+    ]
+    dag = TagTreeDag()
+    for n in tree:
+        dag.add_root(n)
+    assert expand_dag(dag.to_dict()) == tree
+
+
+def _edit(tree, rnd):
+    """Renames, moves, inserts, deletes and field edits at random places in a copy of `tree`."""
+    tree = copy.deepcopy(tree)
+    parents = []
+    stack = list(tree)
+    while stack:
+        n = stack.pop()
+        if n.get("children"):
+            parents.append(n)
+            stack.extend(n["children"])
+    for i in range(40):
+        parent = rnd.choice(parents)
+        kids = parent["children"]
+        if not kids:
+            continue
+        op = rnd.randrange(5)
+        j = rnd.randrange(len(kids))
+        if op == 0:
+            kids[j]["title"] = f"{kids[j]['title']}·改{i}"
+        elif op == 1:
+            kids.insert(rnd.randrange(len(kids) + 1), kids.pop(j))
+        elif op == 2:
+            kids.insert(j, {"title": f"新增{i}"})
+        elif op == 3 and len(kids) > 1:
+            kids.pop(j)
+        else:
+            kids[j]["note"] = i
+    return tree
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_diff_then_apply_reproduces_the_new_tree(seed):
+    old = load("题型知识点标签.json")
+    new = _edit(old, random.Random(seed))
+    patch = json.loads(json.dumps(diff_trees(old, new), ensure_ascii=False))
+    assert apply_patch(copy.deepcopy(old), patch) == new
+
+
+def test_sqlite_rows_use_create_id_from_path_and_nested_intervals():
+    tree = load("题型知识点标签.json")
+    rows = flatten(tree)
+    for i, tag_id, parent, root, depth, title, path, lft, rgt in rows:
+        assert tag_id == ekt.create_id_from_path(path)
+        assert lft == i <= rgt
+        if parent is not None:
+            p = rows[parent]
+            assert p[7] < lft and rgt <= p[8] and depth == p[4] + 1 and path == f"{p[6]}/{title}"
+
+
+def test_search_index_round_trips_through_its_artifact():
+    index = TagSearchIndex.build(load("题型知识点标签.json"))
+    loaded = TagSearchIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    for q in ("语法", "动词短语", "小学的语法", "主谓", "短"):
+        assert loaded.search(q) == index.search(q)
+        assert index.search(q) == index.search(q, max_docs=0)
+
+
+def test_profile_to_stdout_is_the_only_stdout_output(tmp_path):
+    target = tmp_path / "tree.json"
+    target.write_text(json.dumps(load("题型知识点标签.json"), ensure_ascii=False), encoding="utf-8")
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(ROOT / "scripts" / "expand_knowledge_tags.py"),
+            str(target),
+            "--profile=-",
+            f"--emit-index={tmp_path / 'index.json'}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(proc.stdout)["mode"] == "default"
+    assert "index nodes=" in proc.stderr and "placeholders found=" in proc.stderr